@@ -1,8 +1,8 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 
-const API_KEY = "953cb90f15dd29262ddbf6781e3d6c2c";
-const OPENWEATHER_API_URL = 'https://api.openweathermap.org/data/2.5/weather';
+// Weather comes through the backend's cached proxy
+const OPENWEATHER_API_URL = 'http://localhost:5000/api/weather';
 
 function ProfileMenuItem({ icon, label, onClick, className = "" }) {
   return (
@@ -268,9 +268,8 @@ const Dashboard = () => {
   const fetchWeather = (lat, lon) => {
     setWeatherLoading(true);
     setWeatherError(null);
-    const url = `${OPENWEATHER_API_URL}?lat=${lat}&lon=${lon}&exclude=minutely,hourly,alerts&appid=${API_KEY}&units=metric`;
+    const url = `${OPENWEATHER_API_URL}?lat=${lat}&lon=${lon}`;
     console.log('Weather API URL:', url);
-    console.log('Weather API Key:', API_KEY);
     fetch(url)
       .then(async res => {
         let data;
@@ -285,7 +284,7 @@ const Dashboard = () => {
         console.log('Weather API response:', data);
         if (!res.ok) {
           let errorMsg = data && data.message ? data.message : 'Unknown error';
-          if (res.status === 401) errorMsg = 'Invalid API key. Check your .env file.';
+          if (res.status === 401) errorMsg = 'Invalid API key. Check WEATHER_API_KEY on the server.';
           if (res.status === 403) errorMsg = 'Access forbidden. Your API key may be restricted.';
           if (res.status === 404) errorMsg = 'Weather data not found for your location.';
           setWeatherError(`Weather API error (${res.status}): ${errorMsg}`);
@@ -42,9 +42,13 @@ function DiseaseDetection() {
     try {
       const formData = new FormData();
       formData.append("leaf", image);
+      formData.append("explain", "1");
 
+      // Signed-in users get the prediction saved to their history
+      const token = JSON.parse(localStorage.getItem("user") || "{}").token;
       const response = await fetch("http://localhost:5000/api/detect-disease", {
         method: "POST",
+        headers: token ? { Authorization: `Bearer ${token}` } : {},
         body: formData,
       });
 
@@ -232,6 +236,18 @@ function DiseaseDetection() {
                   </div>
                 </div>
 
+                {/* Grad-CAM heatmap */}
+                {result.heatmap && (
+                  <div>
+                    <h4 className="font-medium text-gray-700 mb-2">Regions that influenced the diagnosis:</h4>
+                    <img
+                      src={result.heatmap}
+                      alt="Heatmap of the leaf regions behind the prediction"
+                      className="w-full rounded-lg border"
+                    />
+                  </div>
+                )}
+
                 {/* Disease Information */}
                 <div className="bg-gray-50 p-4 rounded-lg">
                   <h4 className="font-medium text-gray-700 mb-2">About this disease:</h4>
@@ -1,6 +1,104 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 
+const API_URL = 'http://localhost:5000';
+
+function getToken() {
+  return JSON.parse(localStorage.getItem('user') || '{}').token;
+}
+
+// Thumbnails need the auth header, so they are fetched and shown as object URLs
+function Thumbnail({ url }) {
+  const [src, setSrc] = useState(null);
+
+  useEffect(() => {
+    let objectUrl = null;
+    fetch(`${API_URL}${url}`, { headers: { Authorization: `Bearer ${getToken()}` } })
+      .then((res) => (res.ok ? res.blob() : null))
+      .then((blob) => {
+        if (blob) {
+          objectUrl = URL.createObjectURL(blob);
+          setSrc(objectUrl);
+        }
+      })
+      .catch(() => {});
+    return () => objectUrl && URL.revokeObjectURL(objectUrl);
+  }, [url]);
+
+  return src
+    ? <img src={src} alt="Uploaded leaf" className="w-12 h-12 object-cover rounded" />
+    : <div className="w-12 h-12 bg-white/10 rounded" />;
+}
+
+function RecentPredictions() {
+  const [predictions, setPredictions] = useState(null);
+
+  useEffect(() => {
+    const token = getToken();
+    if (!token) {
+      setPredictions([]);
+      return;
+    }
+    fetch(`${API_URL}/api/history?limit=10`, { headers: { Authorization: `Bearer ${token}` } })
+      .then((res) => (res.ok ? res.json() : { predictions: [] }))
+      .then((data) => setPredictions(data.predictions || []))
+      .catch(() => setPredictions([]));
+  }, []);
+
+  if (predictions === null) {
+    return <div className="mb-2 text-gray-300">Loading...</div>;
+  }
+  if (predictions.length === 0) {
+    return <div className="mb-2 text-gray-300">No recent activity</div>;
+  }
+  return (
+    <ul className="space-y-2">
+      {predictions.map((p) => (
+        <li key={`${p.image_hash}-${p.created_at}`} className="flex items-center gap-3">
+          <Thumbnail url={p.thumbnail_url} />
+          <div>
+            <div className="font-semibold">{p.disease} ({p.confidence}%)</div>
+            <div className="text-sm text-gray-300">{new Date(p.created_at + 'Z').toLocaleString()}</div>
+          </div>
+        </li>
+      ))}
+    </ul>
+  );
+}
+
+function ScanSummary() {
+  const [summary, setSummary] = useState(null);
+
+  useEffect(() => {
+    const token = getToken();
+    if (!token) return;
+    // The browser revalidates with the ETag, so unchanged stats come back as 304
+    fetch(`${API_URL}/api/stats/summary?days=30`, { headers: { Authorization: `Bearer ${token}` } })
+      .then((res) => (res.ok ? res.json() : null))
+      .then(setSummary)
+      .catch(() => {});
+  }, []);
+
+  if (!summary) {
+    return <div className="mb-2 text-gray-300">Sign in and scan leaves to see statistics</div>;
+  }
+  const { trend } = summary;
+  return (
+    <>
+      <div className="mb-2 text-gray-300">Scans (last 30 days): {summary.total}</div>
+      <div className="mb-2 text-gray-300">
+        Healthy: {summary.healthy_fraction === null ? '-' : `${Math.round(summary.healthy_fraction * 100)}%`}
+      </div>
+      <div className="mb-2 text-gray-300">Most common disease: {summary.most_common_disease || 'None'}</div>
+      <div className="mb-2 text-gray-300">
+        This week: {trend.last_7d} scans ({trend.last_7d - trend.previous_7d >= 0 ? '+' : ''}
+        {trend.last_7d - trend.previous_7d} vs last week)
+      </div>
+      <div className="mb-2 text-gray-300">All-time scans: {summary.all_time.total}</div>
+    </>
+  );
+}
+
 function FarmStatsPanel() {
   return (
     <div className="bg-white/10 p-8 rounded-2xl shadow-lg w-full max-w-md">
@@ -11,9 +109,13 @@ function FarmStatsPanel() {
         <div className="mb-2 text-gray-300">Total Yield: (coming soon)</div>
         <div className="mb-2 text-gray-300">Total Area: (coming soon)</div>
       </div>
+      <div className="mb-6">
+        <h2 className="text-lg font-bold mb-2">Disease Scans</h2>
+        <ScanSummary />
+      </div>
       <div className="mb-8">
         <h2 className="text-lg font-bold mb-2">Recent Activity</h2>
-        <div className="mb-2 text-gray-300">No recent activity (coming soon)</div>
+        <RecentPredictions />
       </div>
     </div>
   );
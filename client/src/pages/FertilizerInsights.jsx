@@ -1,33 +1,56 @@
-import React, { useState } from "react";
+import React, { useEffect, useState } from "react";
+
+const API_URL = "http://localhost:5000";
+
+const inputStyle = { width: "80px", marginRight: "15px" };
 
 const FertilizerInsights = () => {
+  const [soilTypes, setSoilTypes] = useState(["Loamy", "Sandy", "Clay"]);
+  const [crops, setCrops] = useState(["Rice", "Wheat", "Maize", "Groundnut", "Cotton", "Soybean"]);
   const [soilType, setSoilType] = useState("");
   const [plantType, setPlantType] = useState("");
-  const [recommendation, setRecommendation] = useState("");
+  const [soilTest, setSoilTest] = useState({ n: "", p2o5: "", k2o: "", ph: "" });
+  const [recommendation, setRecommendation] = useState(null);
+  const [error, setError] = useState("");
 
-  const guidelines = {
-    Loamy: {
-      Rice: "Apply 120 kg N, 60 kg P₂O₅, and 40 kg K₂O per hectare.",
-      Wheat: "Apply 100 kg N, 50 kg P₂O₅, and 30 kg K₂O per hectare.",
-    },
-    Sandy: {
-      Maize: "Apply 80 kg N, 40 kg P₂O₅, and 20 kg K₂O per hectare.",
-      Peanut: "Apply 20 kg N, 40 kg P₂O₅, and 40 kg K₂O per hectare.",
-    },
-    Clay: {
-      Cotton: "Apply 150 kg N, 75 kg P₂O₅, and 60 kg K₂O per hectare.",
-      Soybean: "Apply 20 kg N, 60 kg P₂O₅, and 40 kg K₂O per hectare.",
-    },
-  };
+  useEffect(() => {
+    fetch(`${API_URL}/api/fertilizer/options`)
+      .then((res) => (res.ok ? res.json() : null))
+      .then((data) => {
+        if (data) {
+          setSoilTypes(data.soil_types);
+          setCrops(data.crops);
+        }
+      })
+      .catch(() => {});
+  }, []);
 
-  const handleCheck = () => {
-    if (guidelines[soilType] && guidelines[soilType][plantType]) {
-      setRecommendation(guidelines[soilType][plantType]);
-    } else {
-      setRecommendation("No guideline available for this combination.");
+  const handleCheck = async () => {
+    setError("");
+    setRecommendation(null);
+    if (!soilType || !plantType) {
+      setError("Select a soil type and a plant type.");
+      return;
+    }
+    try {
+      const res = await fetch(`${API_URL}/api/fertilizer/recommend`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ soil_type: soilType, crop: plantType, ...soilTest }),
+      });
+      const data = await res.json();
+      if (res.ok) {
+        setRecommendation(data);
+      } else {
+        setError(data.error || "No guideline available for this combination.");
+      }
+    } catch (err) {
+      setError("Could not reach the server.");
     }
   };
 
+  const updateSoilTest = (key) => (e) => setSoilTest({ ...soilTest, [key]: e.target.value });
+
   return (
     <div style={{ padding: "30px", color: "#fff", backgroundColor: "#1a1a2e", minHeight: "100vh" }}>
       <h1>🌱 FAO Fertilizer Guidelines</h1>
@@ -37,9 +60,9 @@ const FertilizerInsights = () => {
         <label>Soil Type: </label>
         <select value={soilType} onChange={(e) => setSoilType(e.target.value)}>
           <option value="">-- Select --</option>
-          <option value="Loamy">Loamy</option>
-          <option value="Sandy">Sandy</option>
-          <option value="Clay">Clay</option>
+          {soilTypes.map((soil) => (
+            <option key={soil} value={soil}>{soil}</option>
+          ))}
         </select>
       </div>
 
@@ -47,23 +70,59 @@ const FertilizerInsights = () => {
         <label>Plant Type: </label>
         <select value={plantType} onChange={(e) => setPlantType(e.target.value)}>
           <option value="">-- Select --</option>
-          <option value="Rice">Rice</option>
-          <option value="Wheat">Wheat</option>
-          <option value="Maize">Maize</option>
-          <option value="Peanut">Peanut</option>
-          <option value="Cotton">Cotton</option>
-          <option value="Soybean">Soybean</option>
+          {crops.map((crop) => (
+            <option key={crop} value={crop}>{crop}</option>
+          ))}
         </select>
       </div>
 
+      <div style={{ marginBottom: "20px" }}>
+        <p>Soil test (optional, available kg/ha):</p>
+        <label>N </label>
+        <input type="number" value={soilTest.n} onChange={updateSoilTest("n")} style={inputStyle} />
+        <label>P₂O₅ </label>
+        <input type="number" value={soilTest.p2o5} onChange={updateSoilTest("p2o5")} style={inputStyle} />
+        <label>K₂O </label>
+        <input type="number" value={soilTest.k2o} onChange={updateSoilTest("k2o")} style={inputStyle} />
+        <label>pH </label>
+        <input type="number" step="0.1" value={soilTest.ph} onChange={updateSoilTest("ph")} style={inputStyle} />
+      </div>
+
       <button onClick={handleCheck} style={{ padding: "10px 20px", background: "#4caf50", border: "none", color: "#fff", borderRadius: "5px" }}>
         Get Recommendation
       </button>
 
+      {error && (
+        <div style={{ marginTop: "20px", padding: "15px", background: "#222", borderRadius: "5px" }}>
+          <p>{error}</p>
+        </div>
+      )}
+
       {recommendation && (
         <div style={{ marginTop: "20px", padding: "15px", background: "#222", borderRadius: "5px" }}>
           <h3>Recommendation:</h3>
-          <p>{recommendation}</p>
+          <p>
+            Apply {recommendation.dose_kg_ha.n} kg N, {recommendation.dose_kg_ha.p2o5} kg P₂O₅, and{" "}
+            {recommendation.dose_kg_ha.k2o} kg K₂O per hectare.
+          </p>
+          <p>
+            As fertilizers: {recommendation.products_kg_ha.urea} kg urea
+            {recommendation.products_kg_ha.dap > 0 && `, ${recommendation.products_kg_ha.dap} kg DAP`}
+            {recommendation.products_kg_ha.ssp > 0 && `, ${recommendation.products_kg_ha.ssp} kg SSP`}
+            , {recommendation.products_kg_ha.mop} kg MOP per hectare.
+          </p>
+          {recommendation.lime_t_ha > 0 && (
+            <p>Soil is too acidic for {recommendation.crop}: apply {recommendation.lime_t_ha} t/ha of lime.</p>
+          )}
+          {recommendation.gypsum_t_ha > 0 && (
+            <p>Soil is sodic: apply {recommendation.gypsum_t_ha} t/ha of gypsum.</p>
+          )}
+          {Object.keys(recommendation.soil_test).length > 0 && (
+            <p>
+              Soil test rating:{" "}
+              {Object.entries(recommendation.soil_test).map(([nutrient, rating]) => `${nutrient.toUpperCase()} ${rating}`).join(", ")}
+            </p>
+          )}
         </div>
       )}
     </div>
@@ -98,7 +98,8 @@ const LoginForm = () => {
         // Save user info to localStorage for Dashboard
         localStorage.setItem('user', JSON.stringify({
           name: data.name || data.username || email,
-          email: data.email || email
+          email: data.email || email,
+          token: data.token
         }));
         setSuccessMessage('Login successful! Redirecting to dashboard...');
         console.log('Login successful!', data);
@@ -78,6 +78,7 @@ export default function PlantRecommender() {
   const [cameraEnabled, setCameraEnabled] = useState(true);
   const [temperature, setTemperature] = useState(null);
   const [fetchingTemp, setFetchingTemp] = useState(false);
+  const [coords, setCoords] = useState(null);
   const [dropdownOpen, setDropdownOpen] = useState(false);
   const [climateZone, setClimateZone] = useState("");
   const [analysisDetails, setAnalysisDetails] = useState({});
@@ -173,9 +174,9 @@ export default function PlantRecommender() {
     setShowCamera(true);
   };
 
-  // Add geocoding helper
+  // Add geocoding helper (cached server-side proxy)
   const getCoordsFromLocation = async (locationName) => {
-    const GEOCODE_API_URL = `https://api.openweathermap.org/geo/1.0/direct?q=${encodeURIComponent(locationName)}&limit=1&appid=${WEATHER_API_KEY}`;
+    const GEOCODE_API_URL = `http://localhost:5000/api/geocode?q=${encodeURIComponent(locationName)}`;
     try {
       const res = await fetch(GEOCODE_API_URL);
       const data = await res.json();
@@ -190,8 +191,7 @@ export default function PlantRecommender() {
     }
   };
 
-  const WEATHER_API_KEY = "953cb90f15dd29262ddbf6781e3d6c2c";
-  const WEATHER_API_URL = "https://api.openweathermap.org/data/2.5/weather";
+  const WEATHER_API_URL = "http://localhost:5000/api/weather";
   const fetchTemperature = async (customLocation) => {
     setFetchingTemp(true);
     let lat, lon;
@@ -233,8 +233,9 @@ export default function PlantRecommender() {
       console.error('Geolocation not supported');
       return;
     }
+    setCoords({ lat, lon });
     try {
-      const res = await fetch(`${WEATHER_API_URL}?lat=${lat}&lon=${lon}&appid=${WEATHER_API_KEY}&units=metric`);
+      const res = await fetch(`${WEATHER_API_URL}?lat=${lat}&lon=${lon}`);
       const data = await res.json();
       console.log('Weather API response:', data); // Debug log
       if (data && data.main && typeof data.main.temp === 'number') {
@@ -343,6 +344,8 @@ export default function PlantRecommender() {
           soil_type: detectedSoilType,
           location: location || "Current Location",
           temperature: temperature,
+          lat: coords ? coords.lat : undefined,
+          lon: coords ? coords.lon : undefined,
         }),
       });
       const data = await res.json();
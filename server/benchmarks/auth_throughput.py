@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Registration and login throughput of the auth routes (routes/auth.py) against
+an in-memory MongoDB stand-in with simulated round-trip latency.
+
+    register   the old path (find_by_username, then insert_one) versus one
+               insert_one against the unique username index: round trips per
+               registration and registrations per second
+    race       --race-threads clients register the same username at once;
+               the old path lets several of them through, the new one exactly
+               one
+    login      POST /api/login (projected lookup + password check) versus
+               POST /api/token/refresh (JWT decode + version lookup) through
+               the Flask test client
+
+Password hashing dominates registration and login; --hash-method (a werkzeug
+method such as pbkdf2:sha256:1000) makes it cheap to isolate the database
+cost.
+
+Examples:
+    python auth_throughput.py
+    python auth_throughput.py --latency-ms 2 --threads 16 --hash-method pbkdf2:sha256:1000
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVER_DIR)
+
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from models import user as user_module
+from routes import auth
+from stubs import InMemoryCollection
+
+PASSWORD = "benchmark-password"
+
+
+def old_register(users, username, password):
+    """routes/auth.py before: look the name up, then insert"""
+    if users.find_by_username(username):
+        return False
+    users.collection.insert_one({"username": username, "password": user_module.generate_password_hash(password)})
+    return True
+
+
+def new_register(users, username, password):
+    return users.create_user(username, password)
+
+
+def fresh_users(latency_ms):
+    return user_module.User({"users": InMemoryCollection(latency_ms=latency_ms)})
+
+
+def run_parallel(fn, jobs, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(fn, jobs))
+    return results, time.perf_counter() - start
+
+
+def bench_register(register, count, args):
+    users = fresh_users(args.latency_ms)
+    users.ensure_indexes()
+    users.collection.round_trips = 0
+    _, elapsed = run_parallel(lambda i: register(users, f"farmer{i:05d}", PASSWORD), range(count), args.threads)
+    return {"per_second": count / elapsed, "round_trips": users.collection.round_trips / count}
+
+
+def bench_race(register, args):
+    users = fresh_users(args.latency_ms)
+    barrier = threading.Barrier(args.race_threads)
+
+    def attempt(_):
+        barrier.wait()
+        return register(users, "same-farmer", PASSWORD)
+
+    results, _ = run_parallel(attempt, range(args.race_threads), args.race_threads)
+    stored = sum(1 for doc in users.collection._docs if doc["username"] == "same-farmer")
+    return {"accepted": sum(results), "stored": stored}
+
+
+def bench_endpoint(client, path, body, count, threads):
+    def call(_):
+        response = client.post(path, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    _, elapsed = run_parallel(call, range(count), threads)
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure auth registration and login throughput")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Simulated database round trip")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--registrations", type=int, default=200)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--race-threads", type=int, default=16)
+    parser.add_argument("--hash-method", help="werkzeug password hash method, e.g. pbkdf2:sha256:1000")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.hash_method:
+        user_module.generate_password_hash = functools.partial(generate_password_hash, method=args.hash_method)
+
+    report = {"latency_ms": args.latency_ms, "threads": args.threads, "hash_method": args.hash_method or "default"}
+    report["register"] = {
+        "old": bench_register(old_register, args.registrations, args),
+        "new": bench_register(new_register, args.registrations, args),
+    }
+    report["race"] = {"old": bench_race(old_register, args), "new": bench_race(new_register, args)}
+
+    auth.user_model = fresh_users(args.latency_ms)
+    auth.user_model.create_user("farmer", PASSWORD)
+    app = Flask(__name__)
+    app.register_blueprint(auth.auth_bp)
+    client = app.test_client()
+    tokens = client.post("/api/login", json={"username": "farmer", "password": PASSWORD}).get_json()
+    report["login_per_second"] = bench_endpoint(
+        client, "/api/login", {"username": "farmer", "password": PASSWORD}, args.logins, args.threads)
+    report["refresh_per_second"] = bench_endpoint(
+        client, "/api/token/refresh", {"refresh_token": tokens["refresh_token"]}, args.logins, args.threads)
+
+    print(f"simulated round trip {args.latency_ms} ms, {args.threads} threads, "
+          f"password hash {report['hash_method']}")
+    for name in ("old", "new"):
+        row = report["register"][name]
+        race = report["race"][name]
+        print(f"register {name}: {row['per_second']:8.1f}/s, {row['round_trips']:.2f} round trips each; "
+              f"{args.race_threads} concurrent same-name registrations -> {race['stored']} users stored")
+    print(f"login:   {report['login_per_second']:8.1f}/s")
+    print(f"refresh: {report['refresh_per_second']:8.1f}/s "
+          f"({report['refresh_per_second'] / report['login_per_second']:.1f}x login)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Latency of fertilizer recommendations (utils/fertilizer.py).
+
+Times single-plot recommend() calls and recommend_many() over increasing
+numbers of random plots (mixed soils and crops, some unknown, about 30% of
+measurements missing). The per-plot time of the bulk path should stay flat
+as the number of plots grows.
+
+Examples:
+    python fertilizer_lookup.py
+    python fertilizer_lookup.py --sizes 100,10000,1000000 --output fertilizer.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVER_DIR)
+
+from config import FERTILIZER_RULES_PATH
+from utils.fertilizer import FertilizerTables
+
+
+def random_plots(tables, count, rng):
+    soils = rng.choice(tables.soils + ["Unknown"], count)
+    crops = rng.choice(tables.crops + ["Corn", "Unknown"], count)
+
+    def measurements(low, high):
+        values = rng.uniform(low, high, count)
+        values[rng.random(count) < 0.3] = np.nan
+        return values
+
+    return {
+        "soil_types": soils.tolist(),
+        "crops": crops.tolist(),
+        "n": measurements(100, 700),
+        "p2o5": measurements(5, 90),
+        "k2o": measurements(50, 400),
+        "ph": measurements(4.0, 9.5),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure fertilizer lookup latency")
+    parser.add_argument("--sizes", default="1,100,10000,100000", help="Comma separated plot counts for bulk queries")
+    parser.add_argument("--single", type=int, default=20000, help="Single-plot calls to time")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    tables = FertilizerTables.load(FERTILIZER_RULES_PATH)
+    rng = np.random.default_rng(0)
+
+    plots = random_plots(tables, args.single, rng)
+    calls = [(s, c, None if np.isnan(n) else float(n), None if np.isnan(ph) else float(ph))
+             for s, c, n, ph in zip(plots["soil_types"], plots["crops"], plots["n"], plots["ph"])
+             if tables.soil_index(s) is not None and tables.crop_index(c) is not None]
+    start = time.perf_counter()
+    for soil, crop, n, ph in calls:
+        tables.recommend(soil, crop, n=n, ph=ph)
+    single_us = 1e6 * (time.perf_counter() - start) / len(calls)
+
+    tables.recommend_many(**random_plots(tables, 10, rng))  # warm up
+    rows = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        plots = random_plots(tables, size, rng)
+        start = time.perf_counter()
+        tables.recommend_many(**plots)
+        seconds = time.perf_counter() - start
+        rows.append({"plots": size, "total_ms": round(1000 * seconds, 3), "per_plot_us": round(1e6 * seconds / size, 3)})
+
+    print(f"Single plot: {single_us:.1f} us per recommend() call ({len(calls)} calls)")
+    print(f"{'plots':>9} {'total ms':>10} {'us/plot':>9}")
+    for row in rows:
+        print(f"{row['plots']:>9} {row['total_ms']:>10.2f} {row['per_plot_us']:>9.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"single_us": round(single_us, 3), "bulk": rows}, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Latency overhead of Grad-CAM explanations versus a plain prediction.
+
+Times, per batch size: the plain model forward pass (eagerly, as app.py
+calls it, and compiled with tf.function), the combined prediction + Grad-CAM
+pass from inference/gradcam.py (compiled), and rendering one heatmap PNG.
+Overhead is reported against the compiled forward pass. Uses
+ml-backend/leaf_disease_model.h5 when it exists, otherwise an untrained model
+with the same architecture (the timings do not depend on the weights).
+
+Examples:
+    python gradcam_overhead.py
+    python gradcam_overhead.py --batch-sizes 1,4,16 --repeats 20 --output gradcam.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ML_BACKEND_DIR = os.path.join(SERVER_DIR, "ml-backend")
+sys.path.append(SERVER_DIR)
+sys.path.append(ML_BACKEND_DIR)
+
+from inference.gradcam import GradCam, render_heatmap
+
+
+def build_model(path, num_classes=5):
+    import tensorflow as tf
+    from tensorflow.keras import layers, models
+    from train_model import create_classifier_head
+
+    if os.path.exists(path):
+        return tf.keras.models.load_model(path), "trained"
+    base_model = tf.keras.applications.ResNet50V2(weights=None, include_top=False, input_shape=(224, 224, 3))
+    head = create_classifier_head(num_classes)
+    model = models.Sequential([base_model, layers.GlobalAveragePooling2D()] + head.layers)
+    model.build((None, 224, 224, 3))
+    return model, "untrained"
+
+
+def time_call(fn, repeats):
+    fn()  # warm up / trace
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return 1000.0 * float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Grad-CAM overhead over plain prediction")
+    parser.add_argument("--model", default=os.path.join(ML_BACKEND_DIR, "leaf_disease_model.h5"))
+    parser.add_argument("--batch-sizes", default="1,8,16", help="Comma separated batch sizes")
+    parser.add_argument("--repeats", type=int, default=10, help="Timed runs per measurement (median reported)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    model, weights = build_model(args.model)
+    compiled = tf.function(lambda batch: model(batch, training=False), reduce_retracing=True)
+    gradcam = GradCam.from_sequential(model)
+    rng = np.random.default_rng(0)
+
+    rows = []
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        batch = rng.random((batch_size, 224, 224, 3), dtype=np.float32)
+        eager_ms = time_call(lambda: np.asarray(model(batch, training=False)), args.repeats)
+        predict_ms = time_call(lambda: np.asarray(compiled(batch)), args.repeats)
+        explain_ms = time_call(lambda: gradcam.explain_batch(batch), args.repeats)
+        rows.append({
+            "batch_size": batch_size,
+            "predict_eager_ms": round(eager_ms, 2),
+            "predict_ms": round(predict_ms, 2),
+            "predict_and_explain_ms": round(explain_ms, 2),
+            "overhead_pct": round(100.0 * (explain_ms - predict_ms) / predict_ms, 1),
+        })
+
+    image = (rng.random((224, 224, 3)) * 255).astype(np.uint8)
+    cam = gradcam.explain_batch(image[None].astype(np.float32) / 255.0)[1][0]
+    render_ms = time_call(lambda: render_heatmap(image, cam), args.repeats)
+
+    print(f"Model: {weights} ResNet50V2 ({args.model if weights == 'trained' else 'random weights'})")
+    print(f"{'batch':>6} {'eager ms':>9} {'predict ms':>11} {'+ Grad-CAM ms':>14} {'overhead':>9}")
+    for row in rows:
+        print(f"{row['batch_size']:>6} {row['predict_eager_ms']:>9.1f} {row['predict_ms']:>11.1f} "
+              f"{row['predict_and_explain_ms']:>14.1f} {row['overhead_pct']:>8.1f}%")
+    print(f"Heatmap rendering: {render_ms:.1f} ms per image (skipped on cache hits)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"model": weights, "batches": rows, "render_ms": round(render_ms, 2)}, f,
+                      indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Serialization and compression cost of large API responses (utils/responses.py).
+
+Encodes representative payloads with Flask's default JSON provider (stdlib
+json, sorted keys, NumPy outputs converted with tolist() first as the routes
+used to do), with the stdlib fallback of utils/responses.py, and with orjson
+taking the NumPy arrays directly. Then compresses the encoded body with gzip
+and, when the brotli package is installed, brotli. Payloads:
+
+    bulk_10k       /api/fertilizer/bulk results for 10000 random plots
+    history_100    one /api/history page
+    history_5000   a streamed (NDJSON) history export
+    tiled          /api/detect-disease?mode=tiled with a 24x32 tile heatmap
+    explanation    /api/explain-disease: heatmap PNG data URL + 7x7 cam
+
+Also reports the time to the first streamed NDJSON chunk of the bulk payload
+versus encoding the whole JSON document.
+
+Examples:
+    python json_serialization.py
+    python json_serialization.py --repeats 50 --output serialization.json
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVER_DIR)
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from config import FERTILIZER_RULES_PATH
+from inference.gradcam import render_heatmap
+from inference.tiling import aggregate
+from utils import responses
+from utils.fertilizer import FertilizerTables
+from fertilizer_lookup import random_plots
+
+CLASS_NAMES = ["Apple Scab", "Apple Rust", "Corn Blight", "Healthy", "Tomato Bacterial Spot"]
+
+
+def history_records(count, rng):
+    now = datetime(2024, 6, 1)
+    records = []
+    for i in range(count):
+        image_hash = "%064x" % int(rng.integers(0, 2 ** 63))
+        records.append({
+            "username": "farmer01",
+            "endpoint": "detect_disease",
+            "disease": CLASS_NAMES[int(rng.integers(0, len(CLASS_NAMES)))],
+            "confidence": round(float(rng.uniform(50, 99)), 2),
+            "mode": "single",
+            "model_version": "leaf_disease_model.h5:1717200000",
+            "image_hash": image_hash,
+            "image_bytes": int(rng.integers(50_000, 4_000_000)),
+            "created_at": (now - timedelta(minutes=7 * i)).isoformat(),
+            "thumbnail_url": f"/api/history/images/{image_hash}/thumbnail",
+        })
+    return records
+
+
+def tiled_result(rng, rows=24, cols=32):
+    selected = rng.random((rows, cols)) < 0.8
+    logits = rng.normal(size=(int(selected.sum()), len(CLASS_NAMES)))
+    probabilities = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    return aggregate(probabilities, selected, CLASS_NAMES)
+
+
+def explanation(rng):
+    y, x = np.mgrid[0:224, 0:224]
+    leaf = np.stack([40 + x // 4, 120 + y // 3, 40 + (x + y) // 8], axis=-1)
+    image = np.clip(leaf + rng.integers(-12, 12, leaf.shape), 0, 255).astype(np.uint8)
+    cam = rng.random((7, 7)).astype(np.float32)
+    return {"disease": "Apple Scab", "confidence": 87.5, "heatmap": render_heatmap(image, cam),
+            "cam": np.round(cam, 3)}
+
+
+def as_plain_python(payload):
+    """What the routes returned before the NumPy-aware encoder: lists and None for NaN"""
+    if isinstance(payload, dict):
+        return {k: as_plain_python(v) for k, v in payload.items()}
+    if isinstance(payload, list):
+        return [as_plain_python(v) for v in payload]
+    if isinstance(payload, np.ndarray):
+        return [[None if np.isnan(v) else round(float(v), 3) for v in row] for row in payload]
+    return payload
+
+
+def median_ms(fn, repeats):
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return 1000 * float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure JSON serialization and compression of API responses")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--level", type=int, default=6, help="gzip level (brotli uses quality 5)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tables = FertilizerTables.load(FERTILIZER_RULES_PATH)
+    batch = tables.recommend_many(**random_plots(tables, 10000, rng))
+    payloads = {
+        "bulk_10k": {"results": tables.rows(batch)},
+        "history_100": {"predictions": history_records(100, rng)},
+        "history_5000": {"predictions": history_records(5000, rng)},
+        "tiled": tiled_result(rng),
+        "explanation": explanation(rng),
+    }
+
+    flask_json = DefaultJSONProvider(Flask(__name__))
+    fast = responses.orjson
+
+    results = []
+    for name, payload in payloads.items():
+        row = {"payload": name}
+        row["flask_ms"] = median_ms(lambda: flask_json.dumps(as_plain_python(payload)), args.repeats)
+        responses.orjson = None
+        row["stdlib_ms"] = median_ms(lambda: responses.dumps(payload), args.repeats)
+        responses.orjson = fast
+        body = responses.dumps(payload)
+        row["orjson_ms"] = median_ms(lambda: responses.dumps(payload), args.repeats) if fast else None
+        row["bytes"] = len(body)
+        row["gzip_ms"] = median_ms(lambda: gzip.compress(body, compresslevel=args.level, mtime=0), args.repeats)
+        row["gzip_bytes"] = len(gzip.compress(body, compresslevel=args.level, mtime=0))
+        if responses.brotli is not None:
+            row["brotli_ms"] = median_ms(lambda: responses.brotli.compress(body, quality=5), args.repeats)
+            row["brotli_bytes"] = len(responses.brotli.compress(body, quality=5))
+        results.append(row)
+
+    # NDJSON: the first 500 rows go out while the rest are still being encoded
+    rows = payloads["bulk_10k"]["results"]
+    start = time.perf_counter()
+    lines = [responses.dumps(row) for row in rows[:500]]
+    first_chunk_ms = 1000 * (time.perf_counter() - start)
+
+    print(f"encoder: {'orjson ' + fast.__version__ if fast else 'stdlib json (orjson not installed)'}, "
+          f"brotli: {'yes' if responses.brotli else 'not installed'}")
+    print(f"{'payload':<13} {'KiB':>8} {'flask ms':>9} {'stdlib ms':>10} {'orjson ms':>10} {'speedup':>8} "
+          f"{'gzip ms':>8} {'gzip KiB':>9}" + (f" {'br ms':>7} {'br KiB':>7}" if responses.brotli else ""))
+    for row in results:
+        fastest = row["orjson_ms"] or row["stdlib_ms"]
+        line = (f"{row['payload']:<13} {row['bytes'] / 1024:>8.1f} {row['flask_ms']:>9.2f} {row['stdlib_ms']:>10.2f} "
+                f"{row['orjson_ms'] or float('nan'):>10.2f} {row['flask_ms'] / fastest:>7.1f}x "
+                f"{row['gzip_ms']:>8.2f} {row['gzip_bytes'] / 1024:>9.1f}")
+        if responses.brotli:
+            line += f" {row['brotli_ms']:>7.2f} {row['brotli_bytes'] / 1024:>7.1f}"
+        print(line)
+    print(f"bulk_10k as NDJSON: first 500-row chunk encoded after {first_chunk_ms:.2f} ms "
+          f"({len(b''.join(lines))} bytes)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results, "ndjson_first_chunk_ms": round(first_chunk_ms, 3)}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
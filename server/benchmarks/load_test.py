@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the CropIQ Flask services.
+
+Starts server/app.py and server/ml-backend/app.py in-process on free local
+ports (or targets already running instances), drives the API routes with a
+configurable number of concurrent clients and reports throughput, latency
+percentiles and error rates. The JSON report is written with sorted keys and
+fixed rounding so two runs can be diffed, and --baseline flags regressions.
+
+Examples:
+    python load_test.py --stub-model --stub-db
+    python load_test.py --stub-model --concurrency 16 --requests 500 \\
+        --image-sizes 224:3,1024:1 --output report.json
+    python load_test.py --ml-url http://localhost:5001 --routes detect-disease \\
+        --baseline report.json
+"""
+
+import argparse
+import importlib.util
+import io
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from PIL import Image
+from werkzeug.serving import make_server
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVER_DIR)
+
+from stubs import InMemoryCollection, StubModel, stub_soil_classifier
+
+ML_BACKEND_DIR = os.path.join(SERVER_DIR, "ml-backend")
+
+SOIL_TYPES = ["Loamy", "Sandy", "Clay", "Silty", "Peaty", "Chalky"]
+LOCATIONS = ["Chennai, Tamil Nadu", "Florida", "Europe", "Canada", "Unknown"]
+
+LOADTEST_USER = "loadtest"
+LOADTEST_PASSWORD = "loadtest-password"
+
+
+def build_detect_disease(rng, images):
+    size, data = images.pick(rng)
+    return {"files": {"leaf": ("leaf.jpg", data, "image/jpeg")}}, size
+
+
+def build_detect_soil(rng, images):
+    size, data = images.pick(rng)
+    return {"files": {"image": ("soil.jpg", data, "image/jpeg")}}, size
+
+
+def build_recommend_plants(rng, images):
+    payload = {
+        "soil_type": rng.choice(SOIL_TYPES),
+        "location": rng.choice(LOCATIONS),
+        "temperature": rng.randint(5, 35),
+    }
+    return {"json": payload}, None
+
+
+def build_recommend(rng, images):
+    payload = {"soil_type": rng.choice(SOIL_TYPES), "pin_code": "600001"}
+    return {"json": payload}, None
+
+
+def build_login(rng, images):
+    payload = {"username": LOADTEST_USER, "password": LOADTEST_PASSWORD}
+    return {"json": payload}, None
+
+
+# route name -> (service, path, request builder)
+ROUTES = {
+    "detect-disease": ("ml", "/api/detect-disease", build_detect_disease),
+    "detect-soil": ("ml", "/api/detect-soil", build_detect_soil),
+    "recommend-plants": ("main", "/api/recommend-plants", build_recommend_plants),
+    "recommend": ("main", "/recommend", build_recommend),
+    "login": ("main", "/api/login", build_login),
+}
+
+
+class ImagePool:
+    """Pre-encoded JPEG payloads sampled according to a weighted size mix"""
+
+    def __init__(self, size_mix, seed, variants=4):
+        self.sizes = [size for size, _ in size_mix]
+        self.weights = [weight for _, weight in size_mix]
+        rng = np.random.default_rng(seed)
+        self.payloads = {}
+        for size in self.sizes:
+            encoded = []
+            for _ in range(variants):
+                pixels = rng.integers(0, 256, size=(size, size, 3), dtype=np.uint8)
+                buffer = io.BytesIO()
+                Image.fromarray(pixels).save(buffer, format="JPEG", quality=85)
+                encoded.append(buffer.getvalue())
+            self.payloads[size] = encoded
+
+    def pick(self, rng):
+        size = rng.choices(self.sizes, weights=self.weights)[0]
+        return size, rng.choice(self.payloads[size])
+
+
+def parse_size_mix(spec):
+    """Parse '224:3,1024:1' into [(224, 3.0), (1024, 1.0)]"""
+    mix = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        size, _, weight = part.partition(":")
+        mix.append((int(size), float(weight) if weight else 1.0))
+    if not mix:
+        raise argparse.ArgumentTypeError("image size mix must not be empty")
+    return mix
+
+
+def load_module(name, path):
+    """Import a Flask app module from a file path under a unique module name"""
+    module_dir = os.path.dirname(path)
+    if module_dir not in sys.path:
+        sys.path.insert(0, module_dir)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    previous_cwd = os.getcwd()
+    os.chdir(module_dir)  # the apps resolve model files relative to cwd
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        os.chdir(previous_cwd)
+    return module
+
+
+class InProcessServer:
+    """Serve a WSGI app from a daemon thread on a free localhost port"""
+
+    def __init__(self, app):
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def start_services(args, services):
+    """Start the requested services in-process unless a URL was given"""
+    urls = {"main": args.main_url, "ml": args.ml_url}
+    servers = []
+
+    # the gateway (server/app.py) mounts the inference routes of this same
+    # module, so the model stubs apply to both services
+    if any(service in services and not urls[service] for service in ("main", "ml")):
+        ml_app = load_module("ml_backend_app", os.path.join(ML_BACKEND_DIR, "app.py"))
+        if args.stub_model:
+            ml_app.model = StubModel(num_classes=5, latency_ms=args.stub_latency_ms)
+            ml_app.class_names = ["Apple Scab", "Apple Rust", "Corn Blight", "Healthy", "Tomato Bacterial Spot"]
+            ml_app.model_loaded = True
+            ml_app.soil_model = stub_soil_classifier()
+            ml_app.soil_model_loaded = True
+        elif not ml_app.model_loaded:
+            print("⚠️  ml-backend model not loaded; use --stub-model to benchmark without one")
+
+    if "ml" in services and not urls["ml"]:
+        server = InProcessServer(ml_app.create_app()).start()
+        servers.append(server)
+        urls["ml"] = server.url
+
+    if "main" in services and not urls["main"]:
+        main_app = load_module("cropiq_main_app", os.path.join(SERVER_DIR, "app.py"))
+        if args.stub_db:
+            auth = sys.modules["routes.auth"]
+            auth.user_model.collection = InMemoryCollection()
+            auth.user_model.create_user(LOADTEST_USER, LOADTEST_PASSWORD)
+        server = InProcessServer(main_app.app).start()
+        servers.append(server)
+        urls["main"] = server.url
+
+    return urls, servers
+
+
+def run_route(route, base_url, args, images):
+    """Drive a single route and return its raw samples and wall time"""
+    service, path, builder = ROUTES[route]
+    url = base_url + path
+    counter = itertools.count()
+    total = args.warmup + args.requests
+    samples = []
+    samples_lock = threading.Lock()
+    local = threading.local()
+
+    def next_job():
+        index = next(counter)
+        if index >= total:
+            return None
+        return index, random.Random(args.seed * 1000003 + index)
+
+    def worker():
+        local.session = requests.Session()
+        results = []
+        while True:
+            job = next_job()
+            if job is None:
+                break
+            index, job_rng = job
+            kwargs, size = builder(job_rng, images)
+            start = time.perf_counter()
+            try:
+                response = local.session.post(url, timeout=args.timeout, **kwargs)
+                status = response.status_code
+            except requests.RequestException:
+                status = 0
+            latency = time.perf_counter() - start
+            if index >= args.warmup:
+                results.append((status, latency, size, start))
+        with samples_lock:
+            samples.extend(results)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(worker) for _ in range(args.concurrency)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    # measure throughput from the first recorded request so warmup is excluded
+    if samples:
+        first = min(sample[3] for sample in samples)
+        elapsed = max(started + elapsed - first, 1e-9)
+    return samples, elapsed
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(np.ceil(pct / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample[1] * 1000.0 for sample in samples)
+    errors = sum(1 for sample in samples if sample[0] == 0 or sample[0] >= 400)
+    count = len(samples)
+    statuses = {}
+    for sample in samples:
+        key = str(sample[0])
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "status_codes": statuses,
+        "latency_ms": {
+            "mean": round(sum(latencies) / count, 2) if count else 0.0,
+            "p50": round(percentile(latencies, 50), 2),
+            "p90": round(percentile(latencies, 90), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+    }
+
+
+def build_report(args, results):
+    report = {
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "image_sizes": {str(size): weight for size, weight in args.image_sizes},
+            "seed": args.seed,
+            "stub_model": args.stub_model,
+            "stub_latency_ms": args.stub_latency_ms,
+        },
+        "routes": {},
+    }
+    for route, (samples, elapsed) in results.items():
+        summary = summarize(samples, elapsed)
+        by_size = {}
+        for size in sorted({sample[2] for sample in samples if sample[2] is not None}):
+            subset = [sample for sample in samples if sample[2] == size]
+            by_size[str(size)] = summarize(subset, elapsed)["latency_ms"]
+        if by_size:
+            summary["latency_ms_by_image_size"] = by_size
+        report["routes"][route] = summary
+    return report
+
+
+def print_report(report):
+    print(f"\n{'Route':<18} {'Req':>6} {'Err%':>6} {'RPS':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    print("-" * 78)
+    for route, summary in report["routes"].items():
+        latency = summary["latency_ms"]
+        print(f"{route:<18} {summary['requests']:>6} {summary['error_rate'] * 100:>5.1f}% "
+              f"{summary['throughput_rps']:>9.1f} {latency['p50']:>8.1f} {latency['p95']:>8.1f} "
+              f"{latency['p99']:>8.1f} {latency['max']:>8.1f}")
+        for size, size_latency in summary.get("latency_ms_by_image_size", {}).items():
+            print(f"  {size + 'px':<16} {'':>6} {'':>6} {'':>9} {size_latency['p50']:>8.1f} "
+                  f"{size_latency['p95']:>8.1f} {size_latency['p99']:>8.1f} {size_latency['max']:>8.1f}")
+    print("(latencies in ms)")
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """Return a list of human readable regressions against a previous report"""
+    regressions = []
+    for route, summary in report["routes"].items():
+        previous = baseline.get("routes", {}).get(route)
+        if not previous:
+            continue
+        old_rps, new_rps = previous["throughput_rps"], summary["throughput_rps"]
+        if old_rps and new_rps < old_rps * (1 - tolerance):
+            regressions.append(f"{route}: throughput {old_rps} -> {new_rps} rps")
+        for key in ("p50", "p95", "p99"):
+            old_lat, new_lat = previous["latency_ms"][key], summary["latency_ms"][key]
+            if old_lat and new_lat > old_lat * (1 + tolerance):
+                regressions.append(f"{route}: {key} {old_lat} -> {new_lat} ms")
+        if summary["error_rate"] > previous["error_rate"] + 0.01:
+            regressions.append(f"{route}: error rate {previous['error_rate']} -> {summary['error_rate']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the CropIQ Flask services")
+    parser.add_argument("--routes", default=",".join(ROUTES),
+                        help=f"Comma separated routes to drive (default: all of {', '.join(ROUTES)})")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients per route")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per route")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured warmup requests per route")
+    parser.add_argument("--image-sizes", type=parse_size_mix, default=parse_size_mix("224:1"),
+                        help="Weighted image size mix, e.g. 224:3,1024:1")
+    parser.add_argument("--seed", type=int, default=1234, help="Seed for payload generation")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--main-url", help="Use a running main server instead of starting server/app.py")
+    parser.add_argument("--ml-url", help="Use a running ml-backend instead of starting ml-backend/app.py")
+    parser.add_argument("--stub-model", action="store_true",
+                        help="Replace the disease and soil models with stubs")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Simulated stub model latency")
+    parser.add_argument("--stub-db", action="store_true", help="Replace MongoDB with an in-memory collection")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    routes = [route.strip() for route in args.routes.split(",") if route.strip()]
+    unknown = [route for route in routes if route not in ROUTES]
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(unknown)}")
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    images = ImagePool(args.image_sizes, args.seed)
+    urls, servers = start_services(args, {ROUTES[route][0] for route in routes})
+
+    results = {}
+    try:
+        for route in routes:
+            service = ROUTES[route][0]
+            print(f"🚀 {route}: {args.requests} requests x {args.concurrency} clients -> {urls[service]}")
+            results[route] = run_route(route, urls[service], args, images)
+    finally:
+        for server in servers:
+            server.stop()
+
+    report = build_report(args, results)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
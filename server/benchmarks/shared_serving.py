@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Memory and throughput of local versus shared-memory model serving.
+
+Starts --workers web worker processes, each with the BatchingRuntime and
+--threads client threads sending single 224x224 images, as app.py serves
+them:
+
+    local   every worker loads its own copy of the disease model
+    shared  one inference process loads it (inference/shm_ring.py); the
+            workers never import TensorFlow and forward images over the ring
+
+For each mode it reports every process's RSS and PSS (proportional set size,
+which splits shared pages between the processes mapping them, so the PSS
+column adds up to the real total) from /proc, and the aggregate images/s.
+Uses ml-backend/leaf_disease_model.h5 when it exists, otherwise an untrained
+model with the same architecture.
+
+Examples:
+    python shared_serving.py --workers 4
+    python shared_serving.py --workers 2 --threads 8 --seconds 20 --output shared.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import get_context
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ML_BACKEND_DIR = os.path.join(SERVER_DIR, "ml-backend")
+sys.path.append(SERVER_DIR)
+sys.path.append(ML_BACKEND_DIR)
+
+from inference.runtime import BatchingRuntime
+from inference.shm_ring import Ring, RingClient, serve
+
+MODEL_PATH = os.path.join(ML_BACKEND_DIR, "leaf_disease_model.h5")
+
+
+def save_untrained(path):
+    import tensorflow as tf
+    from tensorflow.keras import layers, models
+    from train_model import create_classifier_head
+
+    base_model = tf.keras.applications.ResNet50V2(weights=None, include_top=False, input_shape=(224, 224, 3))
+    model = models.Sequential([base_model, layers.GlobalAveragePooling2D()] + create_classifier_head(5).layers)
+    model.build((None, 224, 224, 3))
+    model.save(path)
+
+
+def memory(pid="self"):
+    """RSS and PSS of a process in MiB"""
+    values = {}
+    for name, key in (("status", "VmRSS:"), ("smaps_rollup", "Pss:")):
+        with open(f"/proc/{pid}/{name}") as f:
+            for line in f:
+                if line.startswith(key):
+                    values[key] = int(line.split()[1]) / 1024
+                    break
+    return {"rss_mib": round(values["VmRSS:"], 1), "pss_mib": round(values["Pss:"], 1)}
+
+
+def run_worker(rank, mode, args, ring, barrier, results):
+    if mode == "local":
+        import tensorflow as tf
+
+        model = tf.keras.models.load_model(args.model)
+        predict = lambda batch: np.asarray(model(batch, training=False))
+    else:
+        client = RingClient(ring)
+        predict = lambda batch: client.predict_many("disease", batch)
+
+    runtime = BatchingRuntime(workers=1, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+    runtime.register("disease", predict)
+    image = np.random.default_rng(rank).random((224, 224, 3), dtype=np.float32)
+    for _ in range(3):
+        runtime.predict("disease", image)
+
+    counts = [0] * args.threads
+    stop = threading.Event()
+
+    def client_thread(i):
+        while not stop.is_set():
+            runtime.predict("disease", image)
+            counts[i] += 1
+
+    barrier.wait()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client_thread, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    results.put((rank, sum(counts), elapsed, memory()))
+    barrier.wait()  # stay alive until the parent has read the owner's memory
+    runtime.close()
+
+
+def run_mode(mode, args):
+    context = get_context("spawn")
+    ring = owner = None
+    if mode == "shared":
+        ring = Ring(slots=max(64, args.workers * args.threads), lanes=["disease"], context=context)
+        owner = context.Process(target=serve, args=(ring, {"disease": {"path": args.model}},
+                                                    args.max_batch, args.max_wait_ms))
+        owner.start()
+        ring.ready.wait()
+
+    barrier = context.Barrier(args.workers + 1)
+    results = context.Queue()
+    workers = [context.Process(target=run_worker, args=(rank, mode, args, ring, barrier, results))
+               for rank in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    rows = sorted(results.get() for _ in workers)
+    owner_memory = memory(owner.pid) if owner is not None else None
+    barrier.wait()
+    for worker in workers:
+        worker.join()
+    if owner is not None:
+        ring.stopping.set()
+        owner.join()
+        ring.close(unlink=True)
+
+    images = sum(count for _, count, _, _ in rows)
+    elapsed = max(seconds for _, _, seconds, _ in rows)
+    worker_memory = [mem for _, _, _, mem in rows]
+    processes = worker_memory + ([owner_memory] if owner_memory else [])
+    return {
+        "mode": mode,
+        "workers": args.workers,
+        "throughput_ips": round(images / elapsed, 2),
+        "worker_memory": worker_memory,
+        "owner_memory": owner_memory,
+        "mean_worker_rss_mib": round(float(np.mean([m["rss_mib"] for m in worker_memory])), 1),
+        "total_pss_mib": round(sum(m["pss_mib"] for m in processes), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-worker memory and throughput of local and shared serving")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent client threads per worker")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--modes", default="local,shared")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not os.path.exists(args.model):
+            print(f"'{args.model}' not found; using an untrained model of the same architecture")
+            args.model = os.path.join(tmp, "untrained.h5")
+            process = get_context("spawn").Process(target=save_untrained, args=(args.model,))
+            process.start()
+            process.join()
+
+        reports = [run_mode(mode, args) for mode in args.modes.split(",")]
+
+    print(f"{'mode':>7} {'img/s':>8} {'worker RSS MiB':>15} {'owner RSS MiB':>14} {'total PSS MiB':>14}")
+    for report in reports:
+        owner_rss = report["owner_memory"]["rss_mib"] if report["owner_memory"] else 0.0
+        print(f"{report['mode']:>7} {report['throughput_ips']:>8.1f} {report['mean_worker_rss_mib']:>15.1f} "
+              f"{owner_rss:>14.1f} {report['total_pss_mib']:>14.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Stand-ins used by the benchmark scripts so they can run without a trained
+model or a MongoDB server.
+"""
+
+import threading
+import time
+
+import numpy as np
+from pymongo.errors import DuplicateKeyError
+
+from inference.soil import SOIL_FEATURES, SoilClassifier
+
+
+class StubModel:
+    """
+    Deterministic replacement for the Keras leaf disease model.
+
+    Returns a softmax-shaped array derived from the mean pixel value of each
+    image, optionally sleeping to simulate the cost of a real forward pass.
+    """
+
+    def __init__(self, num_classes=5, latency_ms=0.0):
+        self.num_classes = num_classes
+        self.latency_ms = latency_ms
+
+    def predict(self, batch, verbose=0, training=False):
+        batch = np.asarray(batch, dtype=np.float32)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        means = batch.reshape(len(batch), -1).mean(axis=1)
+        logits = np.outer(means, np.arange(1, self.num_classes + 1, dtype=np.float32))
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    __call__ = predict
+
+
+def stub_soil_classifier(classes=("Loamy", "Sandy", "Clay", "Silty", "Peaty", "Chalky"), seed=0):
+    """Soil classifier with random weights; exercises the real feature path"""
+    rng = np.random.default_rng(seed)
+    return SoilClassifier(
+        weights=rng.normal(size=(len(classes), SOIL_FEATURES)),
+        bias=np.zeros(len(classes)),
+        mean=np.zeros(SOIL_FEATURES),
+        scale=np.ones(SOIL_FEATURES),
+        classes=classes,
+    )
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class UpdateResult:
+    def __init__(self, matched_count, modified_count):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+
+
+class InMemoryCollection:
+    """
+    Minimal thread-safe stand-in for a pymongo collection.
+
+    Supports the handful of calls the auth routes make: create_index (a
+    unique single-field index raises DuplicateKeyError like MongoDB),
+    find_one with an equality filter and optional projection, insert_one and
+    update_one with $set/$inc. latency_ms sleeps on every call to simulate
+    the network round trip to a real server; round_trips counts the calls.
+    """
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+        self.round_trips = 0
+        self._docs = []
+        self._unique = {}  # field -> {value: document}
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def create_index(self, keys, unique=False, **kwargs):
+        self._round_trip()
+        field = keys if isinstance(keys, str) else keys[0][0]
+        if unique:
+            with self._lock:
+                self._unique.setdefault(field, {doc[field]: doc for doc in self._docs if field in doc})
+        return f"{field}_1"
+
+    def insert_one(self, document):
+        self._round_trip()
+        with self._lock:
+            document = dict(document)
+            for field, index in self._unique.items():
+                if document.get(field) in index:
+                    raise DuplicateKeyError(f"E11000 duplicate key error: {field} {document.get(field)!r}")
+            document.setdefault("_id", self._next_id)
+            self._next_id += 1
+            self._docs.append(document)
+            for field, index in self._unique.items():
+                index[document.get(field)] = document
+            return InsertOneResult(document["_id"])
+
+    def _find(self, filter):
+        # Same lock must be held by the caller
+        for field, index in self._unique.items():
+            if field in filter:
+                doc = index.get(filter[field])
+                return doc if doc is not None and _matches(doc, filter) else None
+        for doc in self._docs:
+            if _matches(doc, filter):
+                return doc
+        return None
+
+    def find_one(self, filter=None, projection=None):
+        self._round_trip()
+        with self._lock:
+            doc = self._find(filter or {})
+            return None if doc is None else _project(doc, projection)
+
+    def update_one(self, filter, update):
+        self._round_trip()
+        with self._lock:
+            doc = self._find(filter or {})
+            if doc is None:
+                return UpdateResult(0, 0)
+            for field, value in update.get("$set", {}).items():
+                doc[field] = value
+            for field, amount in update.get("$inc", {}).items():
+                doc[field] = doc.get(field, 0) + amount
+            return UpdateResult(1, 1)
+
+
+def _matches(doc, filter):
+    return all(doc.get(k) == v for k, v in filter.items())
+
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    include_id = projection.get("_id", 1)
+    result = {k: v for k, v in doc.items() if k != "_id" and projection.get(k)}
+    if include_id and "_id" in doc:
+        result["_id"] = doc["_id"]
+    return result
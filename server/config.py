@@ -5,4 +5,49 @@ load_dotenv()
 
 MONGO_URI=os.getenv("MONGO_URI")
 JWT_SECRET=os.getenv("JWT_SECRET", "yoursecretkey")
-DB_NAME=os.getenv("DB_NAME", "cropiq")
\ No newline at end of file
+# Refresh tokens from /api/login stay valid this long (access tokens: 1 hour)
+REFRESH_TOKEN_DAYS=int(os.getenv("REFRESH_TOKEN_DAYS", "30"))
+DB_NAME=os.getenv("DB_NAME", "cropiq")
+SOIL_MODEL_PATH=os.getenv("SOIL_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ml-backend", "soil_model.npz"))
+
+# Weather proxy (routes/weather.py); point WEATHER_API_URL at a stub server in tests.
+# There is no default key: without WEATHER_API_KEY the proxy answers 503
+WEATHER_API_URL=os.getenv("WEATHER_API_URL", "https://api.openweathermap.org")
+WEATHER_API_KEY=os.getenv("WEATHER_API_KEY")
+WEATHER_CACHE_TTL=int(os.getenv("WEATHER_CACHE_TTL", "600"))
+WEATHER_STALE_TTL=int(os.getenv("WEATHER_STALE_TTL", "3600"))
+GEOCODE_CACHE_TTL=int(os.getenv("GEOCODE_CACHE_TTL", "86400"))
+
+# Monthly climatology grid built with `python -m utils.climatology` (optional)
+CLIMATOLOGY_PATH=os.getenv("CLIMATOLOGY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "climatology.bin"))
+
+# Place name -> coordinates/climate zone table (routes/places.py)
+GAZETTEER_PATH=os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.tsv"))
+
+# Prediction history (routes/history.py): uploaded images in a content-addressed
+# store, history documents in MongoDB
+HISTORY_ENABLED=os.getenv("HISTORY_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+BLOB_STORE_PATH=os.getenv("BLOB_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "blobs"))
+HISTORY_RETENTION_DAYS=int(os.getenv("HISTORY_RETENTION_DAYS", "365"))
+# upload bytes waiting to be written to the blob store before predictions are dropped
+HISTORY_MAX_PENDING_MB=int(os.getenv("HISTORY_MAX_PENDING_MB", "64"))
+
+# Soil x crop fertilizer dose rules compiled by utils/fertilizer.py
+FERTILIZER_RULES_PATH=os.getenv("FERTILIZER_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fertilizer.json"))
+
+# Uncertain disease predictions kept for labeling (utils/active_learning.py)
+ACTIVE_LEARNING_ENABLED=os.getenv("ACTIVE_LEARNING_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+ACTIVE_LEARNING_PATH=os.getenv("ACTIVE_LEARNING_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "active_learning"))
+ACTIVE_LEARNING_CAPACITY=int(os.getenv("ACTIVE_LEARNING_CAPACITY", "1000"))
+ACTIVE_LEARNING_STRATEGY=os.getenv("ACTIVE_LEARNING_STRATEGY", "margin")
+ACTIVE_LEARNING_MIN_SCORE=float(os.getenv("ACTIVE_LEARNING_MIN_SCORE", "0.3"))
+
+# Origins allowed to call the API from a browser (comma separated)
+CORS_ORIGINS=[origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",") if origin.strip()]
+
+# Separately started inference service (ml-backend/app.py) for the gateway in
+# app.py, e.g. unix:///tmp/cropiq-inference.sock or http://127.0.0.1:5001;
+# unset runs the models in the gateway process
+INFERENCE_URL=os.getenv("INFERENCE_URL", "")
+INFERENCE_POOL_SIZE=int(os.getenv("INFERENCE_POOL_SIZE", "16"))
+INFERENCE_TIMEOUT=float(os.getenv("INFERENCE_TIMEOUT", "60"))
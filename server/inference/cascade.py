@@ -0,0 +1,59 @@
+"""
+Two-stage classifier cascade: a small distilled model answers first and only
+images it is unsure about are escalated to the large model.
+
+The same routing is used for single requests in the serving path and for
+whole validation batches in ml-backend/train_student.py, so the accuracy
+and latency reported at training time are those of the deployed cascade.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from utils.metrics import REGISTRY
+
+CASCADE_DECISIONS = REGISTRY.counter(
+    "cascade_decisions_total", "Images answered by each stage of the disease cascade", ("stage",))
+
+DEFAULT_THRESHOLD = 0.9
+
+
+def cascade_batch(fast_fn, full_fn, batch, threshold):
+    """
+    Run fast_fn over the batch and full_fn over the rows whose top fast
+    probability is below threshold. Returns (probabilities, escalated mask).
+    """
+    probabilities = np.array(fast_fn(batch), dtype=np.float32)
+    escalated = probabilities.max(axis=1) < threshold
+    if escalated.any():
+        probabilities[escalated] = full_fn(batch[escalated])
+    return probabilities, escalated
+
+
+class Cascade:
+    def __init__(self, fast_fn, full_fn, threshold=DEFAULT_THRESHOLD):
+        """fast_fn and full_fn map one preprocessed image to class probabilities"""
+        self.fast_fn = fast_fn
+        self.full_fn = full_fn
+        self.threshold = threshold
+        self._fast = CASCADE_DECISIONS.labels("fast")
+        self._full = CASCADE_DECISIONS.labels("full")
+
+    def predict(self, image):
+        """Return (probabilities, stage) where stage is 'fast' or 'full'"""
+        probabilities = self.fast_fn(image)
+        if np.max(probabilities) >= self.threshold:
+            self._fast.inc()
+            return probabilities, "fast"
+        self._full.inc()
+        return self.full_fn(image), "full"
+
+
+def load_threshold(report_path, default=DEFAULT_THRESHOLD):
+    """Threshold chosen by train_student.py, or default if there is no report"""
+    if not os.path.exists(report_path):
+        return default
+    with open(report_path) as f:
+        return float(json.load(f).get("threshold", default))
@@ -0,0 +1,95 @@
+"""
+Batched Grad-CAM for the ResNet50V2 disease classifiers.
+
+Both the single-head model (Sequential: ResNet50V2 -> pooling -> dense head)
+and the multi-head model put every trainable weight after the last
+convolutional feature map. The model is therefore split there: one forward
+pass through the convolutional part gives the 7x7x2048 activations, and the
+class gradients only have to be backpropagated through the small head. A
+batch explains every image in it, and the same pass also yields the
+prediction, so explaining while predicting costs one backbone pass.
+"""
+
+import base64
+import io
+
+import numpy as np
+from PIL import Image
+
+
+class GradCam:
+    def __init__(self, conv_model, head_fn):
+        """
+        conv_model maps images to the last convolutional feature map;
+        head_fn maps that feature map to class probabilities
+        """
+        import tensorflow as tf
+
+        self.conv_model = conv_model
+        self.head_fn = head_fn
+
+        @tf.function(reduce_retracing=True)
+        def explain(images):
+            features = conv_model(images, training=False)
+            with tf.GradientTape() as tape:
+                tape.watch(features)
+                probabilities = head_fn(features)
+                top = tf.argmax(probabilities, axis=1)
+                # images are independent, so the gradient of the summed top
+                # scores is each image's own gradient
+                scores = tf.gather(probabilities, top, axis=1, batch_dims=1)
+            grads = tape.gradient(scores, features)
+            weights = tf.reduce_mean(grads, axis=(1, 2))
+            cams = tf.nn.relu(tf.einsum("nhwc,nc->nhw", features, weights))
+            cams /= tf.reduce_max(cams, axis=(1, 2), keepdims=True) + 1e-8
+            return probabilities, cams
+
+        self._explain = explain
+
+    @classmethod
+    def from_sequential(cls, model):
+        """For the train_model.create_model layout: ResNet50V2 then head layers"""
+        conv_model, head_layers = model.layers[0], model.layers[1:]
+
+        def head_fn(features):
+            for layer in head_layers:
+                features = layer(features, training=False)
+            return features
+
+        return cls(conv_model, head_fn)
+
+    @classmethod
+    def from_multi_head(cls, multi_head, head="disease"):
+        """For a MultiHeadModel; explains one of its heads"""
+        import tensorflow as tf
+
+        model = multi_head.model
+        pooling = model.get_layer("features")
+        conv_model = tf.keras.Model(model.inputs[0], pooling.input)
+        classifier = multi_head.heads[head]
+        return cls(conv_model, lambda features: classifier(pooling(features), training=False))
+
+    def explain_batch(self, images):
+        """Return (probabilities [n, classes], cams [n, h, w] scaled to [0, 1])"""
+        probabilities, cams = self._explain(np.asarray(images, dtype=np.float32))
+        return probabilities.numpy(), cams.numpy()
+
+
+def _jet(values):
+    """Jet colormap for values in [0, 1] -> uint8 RGB"""
+    x = values[..., None] * 4.0
+    rgb = np.clip(1.5 - np.abs(x - np.array([3.0, 2.0, 1.0])), 0.0, 1.0)
+    return (rgb * 255).astype(np.uint8)
+
+
+def render_heatmap(image, cam, alpha=0.45):
+    """
+    Overlay cam (any resolution, [0, 1]) on image (uint8 RGB) and return
+    a PNG data URL
+    """
+    height, width = image.shape[:2]
+    cam = np.asarray(Image.fromarray(cam.astype(np.float32), mode="F").resize((width, height), Image.BILINEAR))
+    overlay = (1 - alpha) * image + alpha * _jet(np.clip(cam, 0.0, 1.0))
+    buffer = io.BytesIO()
+    Image.fromarray(overlay.astype(np.uint8)).save(buffer, format="PNG", optimize=False)
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
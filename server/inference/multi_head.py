@@ -0,0 +1,53 @@
+"""
+Serving side of the multi-head model built by ml-backend/train_multi_head.py.
+
+The Keras model is split into its shared backbone (input -> pooled 'features')
+and one classifier per 'head_<name>' layer. A batch may mix requests for
+different heads: the backbone runs once over all images and each head only
+sees the feature rows of its own requests.
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+class MultiHeadModel:
+    def __init__(self, model, class_names):
+        import tensorflow as tf
+
+        self._tf = tf
+        self.model = model
+        self.backbone = tf.keras.Model(model.inputs[0], model.get_layer("features").output)
+        self.heads = {name: model.get_layer(f"head_{name}") for name in class_names}
+        self.class_names = class_names
+
+    @classmethod
+    def load(cls, path):
+        """Load the model and the <path>.json sidecar with per-head class names"""
+        import tensorflow as tf
+
+        with open(os.path.splitext(path)[0] + ".json") as f:
+            class_names = json.load(f)
+        return cls(tf.keras.models.load_model(path), class_names)
+
+    def predict_batch(self, items):
+        """
+        items is a list of (head name, preprocessed image) pairs; returns the
+        class probabilities of each item from its own head
+        """
+        images = np.stack([image for _, image in items])
+        features = self.backbone(images, training=False)
+
+        rows_by_head = {}
+        for row, (head, _) in enumerate(items):
+            rows_by_head.setdefault(head, []).append(row)
+
+        outputs = [None] * len(items)
+        for head, rows in rows_by_head.items():
+            head_features = features if len(rows) == len(items) else self._tf.gather(features, rows)
+            probabilities = np.asarray(self.heads[head](head_features, training=False))
+            for row, probs in zip(rows, probabilities):
+                outputs[row] = probs
+        return outputs
@@ -0,0 +1,102 @@
+"""
+HTTP client for an inference service running in another process.
+
+The gateway (server/app.py) forwards the disease and soil routes to
+ml-backend/app.py started on its own, reached at a unix:///path/to.sock or
+http://host:port URL. Requests reuse HTTP/1.1 keep-alive connections from a
+small pool instead of connecting per request. The service may close an idle
+connection at any time; a request that fails on a reused connection before
+any response arrived is retried once on a new one, after dropping the idle
+pool.
+
+inference_upstream_connections_total{result} counts opened vs reused
+connections on /metrics.
+"""
+
+import http.client
+import socket
+import threading
+from urllib.parse import urlsplit
+
+from utils.metrics import REGISTRY
+
+UPSTREAM_CONNECTIONS = REGISTRY.counter(
+    "inference_upstream_connections_total", "Connections to the inference service, newly opened or reused",
+    ("result",))
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class InferenceClient:
+    def __init__(self, url, pool_size=16, timeout=60.0):
+        parts = urlsplit(url)
+        if parts.scheme == "unix":
+            self._connect = lambda: UnixHTTPConnection(parts.path, timeout)
+        elif parts.scheme == "http":
+            self._connect = lambda: http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+        else:
+            raise ValueError(f"Inference URL must be unix:///path or http://host:port, got {url!r}")
+        self.url = url
+        self.pool_size = pool_size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                UPSTREAM_CONNECTIONS.labels("reused").inc()
+                return self._idle.pop(), True
+        UPSTREAM_CONNECTIONS.labels("opened").inc()
+        return self._connect(), False
+
+    def _release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def request(self, method, path, body=None, headers=None):
+        """Return (status, header list, body bytes) of one request"""
+        while True:
+            connection, reused = self._acquire()
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                data = response.read()
+            except (ConnectionResetError, BrokenPipeError, http.client.RemoteDisconnected):
+                # RemoteDisconnected: closed without answering, i.e. the
+                # service dropped the idle connection before reading
+                connection.close()
+                if reused:
+                    self.close()  # the others are likely stale too, e.g. after a restart
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            return response.status, response.getheaders(), data
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
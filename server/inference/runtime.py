@@ -0,0 +1,127 @@
+"""
+Micro-batching inference runtime shared by all models in a process.
+
+Each registered model gets its own lane of pending requests, but all lanes are
+drained by one shared pool of worker threads. A worker picks the lane whose
+oldest request has waited longest, collects up to max_batch_size requests
+(waiting at most max_wait_ms for more to arrive) and runs them through the
+model as a single batch.
+"""
+
+import collections
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from utils.metrics import REGISTRY
+
+BATCH_SIZE = REGISTRY.histogram(
+    "inference_batch_size", "Requests per executed inference batch", ("model",),
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+QUEUE_SECONDS = REGISTRY.histogram(
+    "inference_queue_wait_seconds", "Time a request waited before its batch ran", ("model",))
+
+
+class _Lane:
+    def __init__(self, name, predict_fn, max_batch_size, max_wait, collate):
+        self.name = name
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.collate = collate
+        self.pending = collections.deque()
+        self.batch_size = BATCH_SIZE.labels(name)
+        self.queue_wait = QUEUE_SECONDS.labels(name)
+
+
+class BatchingRuntime:
+    def __init__(self, workers=2, max_batch_size=16, max_wait_ms=5.0):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._lanes = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def register(self, name, predict_fn, max_batch_size=None, max_wait_ms=None, collate=np.stack):
+        """
+        Register a model lane. predict_fn receives collate(items) and must return
+        one output row per item; collate defaults to stacking numpy arrays.
+        """
+        max_wait = self.max_wait if max_wait_ms is None else max_wait_ms / 1000.0
+        with self._cond:
+            self._lanes[name] = _Lane(name, predict_fn, max_batch_size or self.max_batch_size,
+                                      max_wait, collate)
+
+    def submit(self, name, item):
+        """Queue a single input for the named model and return a Future"""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Inference runtime is closed")
+            self._lanes[name].pending.append((item, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def predict(self, name, item, timeout=None):
+        """Run a single input through the named model, batched with its neighbours"""
+        return self.submit(name, item).result(timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _next_batch(self):
+        """Wait for and remove the next batch; returns (lane, entries) or None"""
+        with self._cond:
+            while True:
+                lane = None
+                for candidate in self._lanes.values():
+                    if candidate.pending and (lane is None or candidate.pending[0][2] < lane.pending[0][2]):
+                        lane = candidate
+                if lane is None:
+                    if self._closed:
+                        return None
+                    self._cond.wait()
+                    continue
+                remaining = lane.pending[0][2] + lane.max_wait - time.perf_counter()
+                if len(lane.pending) >= lane.max_batch_size or remaining <= 0 or self._closed:
+                    count = min(len(lane.pending), lane.max_batch_size)
+                    entries = [lane.pending.popleft() for _ in range(count)]
+                    if any(other.pending for other in self._lanes.values()):
+                        self._cond.notify()  # let another worker pick up the rest
+                    return lane, entries
+                self._cond.wait(remaining)
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            lane, entries = batch
+            started = time.perf_counter()
+            for _, _, enqueued in entries:
+                lane.queue_wait.observe(started - enqueued)
+            lane.batch_size.observe(len(entries))
+            try:
+                outputs = lane.predict_fn(lane.collate([item for item, _, _ in entries]))
+                if len(outputs) != len(entries):
+                    # zip() would leave the extra futures unresolved forever
+                    raise RuntimeError(f"Model {lane.name!r} returned {len(outputs)} outputs "
+                                       f"for a batch of {len(entries)}")
+            except Exception as e:
+                for _, future, _ in entries:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), output in zip(entries, outputs):
+                future.set_result(output)
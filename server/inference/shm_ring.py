@@ -0,0 +1,398 @@
+"""
+Single-owner inference over shared-memory ring buffers.
+
+One inference process loads the Keras models once; the web worker processes
+do not load TensorFlow at all. Workers write each preprocessed 224x224x3
+uint8 image into a slot of a ring of fixed-size slots in one
+multiprocessing.shared_memory block and read the class probabilities back
+from the same slot. Only the slot index crosses process boundaries (via
+semaphores); the pixels are copied once into shared memory and read in place
+by the owner.
+
+Slot life cycle, with state changes made under one shared lock:
+
+    FREE -> CLAIMED (worker writes the image) -> REQUEST -> RUNNING (owner
+    batches it) -> DONE (owner wrote the output) -> FREE (worker read it)
+
+A DONE slot with an output size of 0 means the model raised in the owner or
+returned outputs of the wrong shape; the worker raises instead of returning
+a prediction.
+
+A worker that times out marks its slot ABANDONED; the owner frees it when the
+batch finishes instead of signalling DONE, so a late result never leaks into
+the next request using that slot. While waiting, workers check every
+LIVENESS_INTERVAL seconds that the owner process still exists and raise
+instead of waiting out the timeout once it is gone.
+
+Semaphores are inherited, so the ring must be created (start_owner) before
+the web workers are forked, e.g. in the gunicorn master (gunicorn.conf.py).
+"""
+
+import json
+import os
+import threading
+import time
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+IMAGE_SHAPE = (224, 224, 3)
+MAX_OUTPUTS = 64
+LIVENESS_INTERVAL = 0.5
+
+FREE, CLAIMED, REQUEST, RUNNING, DONE, ABANDONED = range(6)
+
+
+class RingLayout:
+    """Views of the slot arrays inside one shared memory block"""
+
+    def __init__(self, buffer, slots):
+        image_bytes = slots * int(np.prod(IMAGE_SHAPE))
+        output_bytes = slots * MAX_OUTPUTS * 4
+        offset = 0
+        self.images = np.ndarray((slots,) + IMAGE_SHAPE, dtype=np.uint8, buffer=buffer, offset=offset)
+        offset += image_bytes
+        self.outputs = np.ndarray((slots, MAX_OUTPUTS), dtype=np.float32, buffer=buffer, offset=offset)
+        offset += output_bytes
+        self.output_sizes = np.ndarray((slots,), dtype=np.int32, buffer=buffer, offset=offset)
+        offset += slots * 4
+        self.lanes = np.ndarray((slots,), dtype=np.uint8, buffer=buffer, offset=offset)
+        offset += slots
+        self.states = np.ndarray((slots,), dtype=np.uint8, buffer=buffer, offset=offset)
+
+    @staticmethod
+    def size(slots):
+        return slots * (int(np.prod(IMAGE_SHAPE)) + MAX_OUTPUTS * 4 + 4 + 1 + 1)
+
+
+class Ring:
+    """Shared memory plus the semaphores guarding it; picklable to spawned processes"""
+
+    def __init__(self, slots=32, lanes=(), context=None):
+        context = context or get_context("spawn")
+        self.slots = slots
+        self.lane_names = list(lanes)
+        self.shm = SharedMemory(create=True, size=RingLayout.size(slots))
+        self.name = self.shm.name
+        self.lock = context.Lock()
+        self.free = context.Semaphore(slots)
+        self.requests = context.Semaphore(0)
+        self.done = [context.Semaphore(0) for _ in range(slots)]
+        self.ready = context.Event()
+        self.stopping = context.Event()
+        self._layout = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["shm"] = None
+        state["_layout"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    @property
+    def layout(self):
+        if self._layout is None:
+            if self.shm is None:
+                # attach in a spawned process; the creator unlinks the block
+                self.shm = SharedMemory(name=self.name)
+            self._layout = RingLayout(self.shm.buf, self.slots)
+        return self._layout
+
+    def close(self, unlink=False):
+        self._layout = None
+        if self.shm is not None:
+            self.shm.close()
+            if unlink:
+                self.shm.unlink()
+
+
+class RingClient:
+    """Worker side: submit images to the owner process and wait for outputs"""
+
+    def __init__(self, ring, timeout=30.0, alive=None):
+        self.ring = ring
+        self.timeout = timeout
+        self.alive = alive  # callable: False once the owner process is gone
+        self._lane_ids = {name: i for i, name in enumerate(ring.lane_names)}
+
+    def predict_many(self, lane, images):
+        """
+        Class probabilities for each image (float [0, 1] or uint8 HxWx3) of a
+        batch; all images are in the ring at once so the owner can batch them
+        """
+        ring, layout = self.ring, self.ring.layout
+        lane_id = self._lane_ids[lane]
+        images = np.asarray(images)
+        if images.dtype != np.uint8:
+            # the server normalizes uint8 pixels to /255, so this round-trips exactly
+            images = np.rint(np.clip(images, 0.0, 1.0) * 255.0).astype(np.uint8)
+
+        self._check_alive()
+        slots = []
+        try:
+            for image in images:
+                if not self._acquire(ring.free, self.timeout):
+                    raise RuntimeError("Inference ring is full")
+                with ring.lock:
+                    slot = int(np.flatnonzero(layout.states == FREE)[0])
+                    layout.states[slot] = CLAIMED
+                slots.append(slot)
+                layout.images[slot] = image
+                layout.lanes[slot] = lane_id
+                with ring.lock:
+                    layout.states[slot] = REQUEST
+                ring.requests.release()
+
+            outputs = []
+            failed = False
+            deadline = time.monotonic() + self.timeout
+            for slot in list(slots):
+                if not self._acquire(ring.done[slot], deadline - time.monotonic()):
+                    raise TimeoutError("Inference process did not answer")
+                size = layout.output_sizes[slot]
+                if size == 0:
+                    failed = True
+                else:
+                    outputs.append(layout.outputs[slot, :size].copy())
+                self._release(slot)
+                slots.remove(slot)
+            if failed:
+                raise RuntimeError(f"Inference lane {lane!r} failed in the inference process")
+            return np.stack(outputs)
+        finally:
+            for slot in slots:
+                self._abandon(slot)
+
+    def predict(self, lane, image):
+        return self.predict_many(lane, image[None])[0]
+
+    def _check_alive(self):
+        if self.alive is not None and not self.alive():
+            raise RuntimeError("Inference process is not running")
+
+    def _acquire(self, semaphore, timeout):
+        """semaphore.acquire(timeout=timeout), checking on the owner every LIVENESS_INTERVAL"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if semaphore.acquire(timeout=max(min(remaining, LIVENESS_INTERVAL), 0.0)):
+                return True
+            if remaining <= LIVENESS_INTERVAL:
+                return False
+            self._check_alive()
+
+    def _release(self, slot):
+        with self.ring.lock:
+            self.ring.layout.states[slot] = FREE
+        self.ring.free.release()
+
+    def _abandon(self, slot):
+        ring, layout = self.ring, self.ring.layout
+        with ring.lock:
+            state = layout.states[slot]
+            if state in (CLAIMED, DONE):
+                # never submitted, or finished just now: free it here
+                if state == DONE:
+                    ring.done[slot].acquire()
+                layout.states[slot] = FREE
+                ring.free.release()
+            else:
+                # REQUEST or RUNNING: the owner frees it when it gets to it
+                layout.states[slot] = ABANDONED
+
+
+class RemoteModel:
+    """Stands in for a Keras model in a worker: model(batch) runs in the owner process"""
+
+    def __init__(self, lane):
+        self.lane = lane
+
+    def __call__(self, batch, training=False):
+        return shared_client().predict_many(self.lane, batch)
+
+
+class RemoteMultiHead:
+    """MultiHeadModel.predict_batch over the ring; each head is its own lane"""
+
+    def __init__(self, class_names):
+        self.class_names = class_names
+
+    def predict_batch(self, items):
+        outputs = [None] * len(items)
+        for head in {head for head, _ in items}:
+            rows = [i for i, (name, _) in enumerate(items) if name == head]
+            images = [items[i][1] for i in rows]
+            for i, output in zip(rows, shared_client().predict_many(f"multi_head.{head}", images)):
+                outputs[i] = output
+        return outputs
+
+
+def model_lanes(model_path=None, student_path=None, multi_head_path=None):
+    """Lane specs for the model files that exist, as app.py would load them"""
+    if multi_head_path and os.path.exists(multi_head_path):
+        with open(os.path.splitext(multi_head_path)[0] + ".json") as f:
+            heads = json.load(f)
+        lanes = {f"multi_head.{head}": {"path": multi_head_path, "head": head} for head in heads}
+    elif model_path and os.path.exists(model_path):
+        lanes = {"disease": {"path": model_path}}
+    else:
+        return {}
+    if student_path and os.path.exists(student_path):
+        lanes["disease_student"] = {"path": student_path}
+    return lanes
+
+
+def load_lanes(lanes):
+    """
+    Batch predict functions per lane from {lane: {"path": model file}} or,
+    for a head of a multi-head model, {lane: {"path": ..., "head": name}}
+    """
+    import tensorflow as tf
+    from inference.multi_head import MultiHeadModel
+
+    models = {}
+    predict = {}
+    for lane, spec in lanes.items():
+        path, head = spec["path"], spec.get("head")
+        if path not in models:
+            models[path] = MultiHeadModel.load(path) if head else tf.keras.models.load_model(path)
+        model = models[path]
+        if head:
+            predict[lane] = lambda batch, model=model, head=head: np.stack(
+                model.predict_batch([(head, image) for image in batch]))
+        else:
+            predict[lane] = lambda batch, model=model: np.asarray(model(batch, training=False))
+    return predict
+
+
+def serve(ring, lanes, max_batch_size=16, max_wait_ms=5.0, threads=None):
+    """Owner process main loop: batch pending slots per lane and write results back"""
+    if threads:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads[0])
+        tf.config.threading.set_inter_op_parallelism_threads(threads[1])
+    predict = load_lanes(lanes)
+    predict_by_id = [predict[name] for name in ring.lane_names]
+    layout = ring.layout
+    max_wait = max_wait_ms / 1000.0
+    ring.ready.set()
+
+    while not ring.stopping.is_set():
+        if not ring.requests.acquire(timeout=0.5):
+            continue
+        taken = 1
+        deadline = time.monotonic() + max_wait
+        while taken < max_batch_size and ring.requests.acquire(timeout=max(deadline - time.monotonic(), 0.0)):
+            taken += 1
+
+        with ring.lock:
+            # no batch is running here, so abandoned slots were never taken;
+            # their request counts just wake this loop once more
+            for slot in np.flatnonzero(layout.states == ABANDONED):
+                layout.states[slot] = FREE
+                ring.free.release()
+            pending = np.flatnonzero(layout.states == REQUEST)[:taken]
+            layout.states[pending] = RUNNING
+
+        for lane_id in np.unique(layout.lanes[pending]):
+            rows = pending[layout.lanes[pending] == lane_id]
+            try:
+                outputs = np.asarray(predict_by_id[lane_id](layout.images[rows].astype(np.float32) / 255.0),
+                                     dtype=np.float32)
+                if outputs.ndim != 2 or len(outputs) != len(rows) or not 0 < outputs.shape[1] <= MAX_OUTPUTS:
+                    raise ValueError(f"expected ({len(rows)}, 1..{MAX_OUTPUTS}) outputs, got {outputs.shape}")
+            except Exception as e:
+                print(f"Inference lane {ring.lane_names[lane_id]!r} failed: {e}")
+                outputs = np.zeros((len(rows), 0), dtype=np.float32)  # size 0: failed
+            layout.outputs[rows, :outputs.shape[1]] = outputs
+            layout.output_sizes[rows] = outputs.shape[1]
+            with ring.lock:
+                for slot in rows:
+                    if layout.states[slot] == ABANDONED:
+                        layout.states[slot] = FREE
+                        ring.free.release()
+                    else:
+                        layout.states[slot] = DONE
+                        ring.done[slot].release()
+
+
+class OwnerHandle:
+    def __init__(self, ring, process):
+        self.ring = ring
+        self.process = process
+
+    def client(self, timeout=30.0):
+        return RingClient(self.ring, timeout, alive=self.alive)
+
+    def alive(self):
+        """
+        Whether the inference process still runs; works in forked workers,
+        which cannot use Process.is_alive() on their parent's child
+        """
+        return _pid_alive(self.process.pid)
+
+    def wait_ready(self, timeout=None):
+        return self.ring.ready.wait(timeout)
+
+    def stop(self, timeout=10.0):
+        self.ring.stopping.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close(unlink=True)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        # exited but not yet reaped by its parent
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return True
+
+
+_owner = None
+_owner_lock = threading.Lock()
+_client = None
+
+
+def start_owner(lanes, slots=32, max_batch_size=16, max_wait_ms=5.0, threads=None):
+    """
+    Create the ring and spawn the inference process (once per process tree).
+    lanes is passed to load_lanes; the process starts with a fresh
+    interpreter, so the caller never initializes TensorFlow itself.
+    """
+    global _owner
+    with _owner_lock:
+        if _owner is None:
+            context = get_context("spawn")
+            ring = Ring(slots=slots, lanes=list(lanes), context=context)
+            process = context.Process(target=serve, args=(ring, lanes, max_batch_size, max_wait_ms, threads),
+                                      name="inference-owner", daemon=True)
+            process.start()
+            _owner = OwnerHandle(ring, process)
+        return _owner
+
+
+def current_owner():
+    """The owner started in this process or inherited from the parent that forked it"""
+    return _owner
+
+
+def shared_client():
+    """RingClient of this process for the current owner"""
+    global _client
+    if _client is None:
+        if _owner is None:
+            raise RuntimeError("No inference process; start it with start_owner() before forking workers")
+        _client = _owner.client(float(os.getenv("SHARED_INFERENCE_TIMEOUT", "30")))
+    return _client
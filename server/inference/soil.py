@@ -0,0 +1,122 @@
+"""
+Lightweight soil type classifier.
+
+Soil photos are described by vectorized colour and texture statistics
+(RGB/HSV moments and histograms, gradient and Laplacian texture measures) and
+classified with a softmax regression exported by
+ml-backend/train_soil_model.py. Everything runs in NumPy on whole batches, so
+a 128x128 image costs about a millisecond on CPU.
+"""
+
+import numpy as np
+from PIL import Image
+
+IMAGE_SIZE = 128
+HUE_BINS = 12
+VALUE_BINS = 8
+GRADIENT_BINS = 8
+BLOCK = 8
+GRADIENT_RANGE = 0.25  # gradient magnitudes above this share the last bin
+SOIL_FEATURES = 6 + HUE_BINS + VALUE_BINS + 4 + 5 + GRADIENT_BINS
+
+
+def preprocess(img):
+    """Convert a PIL image into the uint8 RGB array the classifier expects"""
+    img = img.convert("RGB").resize((IMAGE_SIZE, IMAGE_SIZE), Image.BILINEAR)
+    return np.asarray(img, dtype=np.uint8)
+
+
+def _histogram(indices, bins, weights=None):
+    """Per-image histogram of integer bin indices with shape (N, pixels)"""
+    n = indices.shape[0]
+    offsets = (np.arange(n) * bins)[:, None]
+    flat = (indices + offsets).ravel()
+    counts = np.bincount(flat, weights=None if weights is None else weights.ravel(), minlength=n * bins)
+    counts = counts.reshape(n, bins)
+    totals = counts.sum(axis=1, keepdims=True)
+    return counts / np.maximum(totals, 1e-6)
+
+
+def _rgb_to_hsv(r, g, b):
+    """HSV channels in [0, 1] from separate contiguous R, G, B planes"""
+    maxc = np.maximum(np.maximum(r, g), b)
+    minc = np.minimum(np.minimum(r, g), b)
+    delta = maxc - minc
+    inv_delta = 1.0 / np.maximum(delta, 1e-6)
+    hue = np.where(maxc == r, (g - b) * inv_delta,
+                   np.where(maxc == g, (b - r) * inv_delta + 2.0, (r - g) * inv_delta + 4.0))
+    hue *= 1.0 / 6.0
+    hue[hue < 0] += 1.0
+    hue[delta <= 0] = 0.0
+    saturation = delta / np.maximum(maxc, 1e-6)
+    return hue, saturation, maxc
+
+
+def extract_features(images):
+    """
+    Colour and texture features for a batch of uint8 RGB images with shape
+    (N, IMAGE_SIZE, IMAGE_SIZE, 3). Returns a float32 array (N, features).
+    """
+    images = np.asarray(images)
+    n = images.shape[0]
+    # channel-first planes keep every reduction below contiguous
+    planes = np.ascontiguousarray(images.reshape(n, -1, 3).transpose(0, 2, 1), dtype=np.float32)
+    planes *= 1.0 / 255.0
+    r, g, b = planes[:, 0], planes[:, 1], planes[:, 2]
+
+    features = [planes.mean(axis=2), planes.std(axis=2)]
+
+    hue, saturation, value = _rgb_to_hsv(r, g, b)
+    hue_idx = np.minimum((hue * HUE_BINS).astype(np.intp), HUE_BINS - 1)
+    value_idx = np.minimum((value * VALUE_BINS).astype(np.intp), VALUE_BINS - 1)
+    features += [
+        _histogram(hue_idx, HUE_BINS, weights=saturation),
+        _histogram(value_idx, VALUE_BINS),
+        np.stack([saturation.mean(axis=1), saturation.std(axis=1),
+                  value.mean(axis=1), value.std(axis=1)], axis=1),
+    ]
+
+    gray = (0.299 * r + 0.587 * g + 0.114 * b).reshape(n, IMAGE_SIZE, IMAGE_SIZE)
+    gx = gray[:, :-1, 1:] - gray[:, :-1, :-1]
+    gy = gray[:, 1:, :-1] - gray[:, :-1, :-1]
+    magnitude = np.sqrt(gx * gx + gy * gy).reshape(n, -1)
+    laplacian = (gray[:, 1:-1, :-2] + gray[:, 1:-1, 2:] + gray[:, :-2, 1:-1]
+                 + gray[:, 2:, 1:-1] - 4.0 * gray[:, 1:-1, 1:-1])
+    blocks = gray.reshape(n, IMAGE_SIZE // BLOCK, BLOCK, IMAGE_SIZE // BLOCK, BLOCK)
+    block_std = blocks.std(axis=(2, 4)).reshape(n, -1)
+    gradient_idx = np.minimum((magnitude * (GRADIENT_BINS / GRADIENT_RANGE)).astype(np.intp), GRADIENT_BINS - 1)
+    features += [
+        np.stack([magnitude.mean(axis=1), magnitude.std(axis=1),
+                  laplacian.reshape(n, -1).var(axis=1),
+                  block_std.mean(axis=1), block_std.std(axis=1)], axis=1),
+        _histogram(gradient_idx, GRADIENT_BINS),
+    ]
+    return np.concatenate(features, axis=1).astype(np.float32)
+
+
+class SoilClassifier:
+    """Standardize features and apply a softmax regression"""
+
+    def __init__(self, weights, bias, mean, scale, classes):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.classes = [str(c) for c in classes]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["weights"], data["bias"], data["mean"], data["scale"], data["classes"])
+
+    def save(self, path):
+        np.savez(path, weights=self.weights, bias=self.bias, mean=self.mean,
+                 scale=self.scale, classes=np.array(self.classes))
+
+    def predict(self, images):
+        """Class probabilities for a batch of preprocessed images"""
+        features = (extract_features(images) - self.mean) / self.scale
+        logits = features @ self.weights.T + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
@@ -0,0 +1,135 @@
+"""
+Tiled inference for whole-plant and field photos.
+
+Instead of squashing the photo to 224x224, the image is covered by
+overlapping tile x tile windows. The windows are strided views into the
+decoded uint8 image (np.lib.stride_tricks.sliding_window_view), so nothing is
+copied until a chunk of tiles is converted to float32 for the model. Tiles
+with too little leaf (green) area are skipped using a vectorized excess-green
+mask and a summed-area table, which gives every tile's green fraction in O(1).
+
+Memory is bounded by max_side (the photo is decoded at most that large) and
+chunk_size (tiles converted to float32 at once).
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+TILE = 224
+STRIDE = 168          # 25% overlap
+MAX_SIDE = 1792       # at most 10 x 10 tiles
+MIN_GREEN = 0.15
+EXCESS_GREEN = 20     # 2G - R - B above this counts as leaf
+
+
+def load_image(img, max_side=MAX_SIDE, tile=TILE):
+    """
+    RGB uint8 array of a PIL image, downscaled to at most max_side and
+    upscaled so both sides are at least one tile. JPEGs are decoded at
+    reduced size straight away via draft mode.
+    """
+    img.draft("RGB", (max_side, max_side))
+    img = img.convert("RGB")
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side))
+    if min(img.size) < tile:
+        scale = tile / min(img.size)
+        img = img.resize((max(tile, round(img.width * scale)), max(tile, round(img.height * scale))))
+    return np.asarray(img)
+
+
+def tile_grid(image, tile=TILE, stride=STRIDE):
+    """
+    Zero-copy (rows, cols, tile, tile, 3) view of overlapping tiles, plus
+    the (top, left) offset of the first tile. The grid is centred so the
+    pixels it cannot cover (less than one stride) are split between the edges.
+    """
+    height, width = image.shape[:2]
+    rows = (height - tile) // stride + 1
+    cols = (width - tile) // stride + 1
+    top = (height - (tile + (rows - 1) * stride)) // 2
+    left = (width - (tile + (cols - 1) * stride)) // 2
+    windows = sliding_window_view(image, (tile, tile), axis=(0, 1))
+    # (rows, cols, 3, tile, tile) -> (rows, cols, tile, tile, 3), still a view
+    grid = windows[top::stride, left::stride][:rows, :cols].transpose(0, 1, 3, 4, 2)
+    return grid, (top, left)
+
+
+def green_fractions(image, grid_shape, offset, tile=TILE, stride=STRIDE, threshold=EXCESS_GREEN):
+    """Fraction of leaf-coloured pixels in every tile of the grid"""
+    green = 2 * image[..., 1].astype(np.int16)
+    green -= image[..., 0]
+    green -= image[..., 2]
+    mask = green > threshold
+    # summed-area table with a zero row/column in front
+    table = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int32)
+    np.cumsum(mask, axis=1, dtype=np.int32, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=0, out=table[1:, 1:])
+    rows, cols = grid_shape
+    top = offset[0] + stride * np.arange(rows)[:, None]
+    left = offset[1] + stride * np.arange(cols)[None, :]
+    counts = (table[top + tile, left + tile] - table[top, left + tile]
+              - table[top + tile, left] + table[top, left])
+    return counts / float(tile * tile)
+
+
+def predict_tiles(image, predict_fn, tile=TILE, stride=STRIDE, min_green=MIN_GREEN, chunk_size=16):
+    """
+    Run predict_fn (float32 [n, tile, tile, 3] in [0, 1] -> probabilities)
+    over the leafy tiles of image in chunks. Returns (probabilities per
+    selected tile, boolean (rows, cols) selection mask, green fractions).
+    """
+    grid, offset = tile_grid(image, tile, stride)
+    rows, cols = grid.shape[:2]
+    green = green_fractions(image, (rows, cols), offset, tile, stride)
+    selected = green >= min_green
+    if not selected.any():
+        # no obvious leaf area (e.g. a close-up of a brown lesion): use every tile
+        selected[:] = True
+
+    positions = np.argwhere(selected)
+    outputs = []
+    for start in range(0, len(positions), chunk_size):
+        chunk = positions[start:start + chunk_size]
+        batch = grid[chunk[:, 0], chunk[:, 1]].astype(np.float32) / 255.0
+        outputs.append(np.asarray(predict_fn(batch)))
+    return np.concatenate(outputs), selected, green
+
+
+def aggregate(probabilities, selected, class_names, healthy_class="Healthy", min_affected=0.05):
+    """
+    Per-image result from per-tile probabilities: the most common disease
+    among tiles not classified healthy (healthy if fewer than min_affected
+    of the tiles are diseased, so one noisy tile does not flag a plant), the
+    share of leaf tiles affected, and a (rows, cols) heatmap of disease
+    probability with NaN (null in the JSON response) for skipped tiles.
+    """
+    labels = probabilities.argmax(axis=1)
+    healthy_index = class_names.index(healthy_class) if healthy_class in class_names else None
+
+    heatmap = np.full(selected.shape, np.nan)
+    if healthy_index is not None:
+        heatmap[selected] = 1.0 - probabilities[:, healthy_index]
+        diseased = labels != healthy_index
+    else:
+        heatmap[selected] = probabilities.max(axis=1)
+        diseased = np.ones(len(labels), dtype=bool)
+
+    if diseased.any() and (healthy_index is None or diseased.mean() >= min_affected):
+        counts = np.bincount(labels[diseased], minlength=len(class_names))
+        scores = probabilities[diseased].sum(axis=0)
+        # most tiles first, summed probability breaks ties
+        index = int(np.lexsort((scores, counts))[-1])
+        confidence = probabilities[labels == index, index].mean()
+    else:
+        index = healthy_index
+        confidence = probabilities[:, index].mean()
+
+    return {
+        "disease": class_names[index],
+        "confidence": round(float(100 * confidence), 2),
+        "tiles": int(len(labels)),
+        "affected_fraction": round(float(diseased.mean()) if healthy_index is not None else 0.0, 3),
+        "tile_counts": {class_names[i]: int(n) for i, n in enumerate(np.bincount(labels, minlength=len(class_names))) if n},
+        "heatmap": np.round(heatmap, 3),
+    }
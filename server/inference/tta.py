@@ -0,0 +1,59 @@
+"""
+Test-time augmentation (TTA) for single leaf photos.
+
+The photo is decoded once at 224x224 (exactly what a normal prediction sees)
+and once at 256x256. Every augmented view is a NumPy view of one of these two
+arrays: flips are negative-stride views, crops are slices. The only copy is
+np.stack of the requested views into one uint8 batch, which is then run
+through the model as a single batch. The softmax outputs are averaged.
+
+Views in order of use, so tta=2 adds the horizontal flip:
+    full, full_hflip, center, top_left, top_right, bottom_left, bottom_right, full_vflip
+"""
+
+import numpy as np
+
+TILE = 224
+CROP_SOURCE = 256
+
+VIEW_NAMES = ("full", "full_hflip", "center", "top_left", "top_right", "bottom_left", "bottom_right",
+              "full_vflip")
+MAX_VIEWS = len(VIEW_NAMES)
+
+
+def views(img, count=MAX_VIEWS, tile=TILE, crop_source=CROP_SOURCE):
+    """(count, tile, tile, 3) uint8 batch of augmented views of a PIL image"""
+    rgb = img.convert("RGB")
+    full = np.asarray(rgb.resize((tile, tile)))
+    if count <= 2:
+        large = None
+    else:
+        large = np.asarray(rgb.resize((crop_source, crop_source)))
+    edge = crop_source - tile
+    middle = edge // 2
+
+    def view(name):
+        if name == "full":
+            return full
+        if name == "full_hflip":
+            return full[:, ::-1]
+        if name == "full_vflip":
+            return full[::-1]
+        top, left = {
+            "center": (middle, middle),
+            "top_left": (0, 0),
+            "top_right": (0, edge),
+            "bottom_left": (edge, 0),
+            "bottom_right": (edge, edge),
+        }[name]
+        return large[top:top + tile, left:left + tile]
+
+    return np.stack([view(name) for name in VIEW_NAMES[:count]])
+
+
+def average(probabilities):
+    """Mean class probabilities over the views, and how many views agree with the result"""
+    probabilities = np.asarray(probabilities)
+    mean = probabilities.mean(axis=0)
+    agreeing = int(np.sum(np.argmax(probabilities, axis=1) == np.argmax(mean)))
+    return mean, agreeing
@@ -1,115 +1,463 @@
-from flask import Flask, request, jsonify, make_response
+from flask import Blueprint, Flask, current_app, request, jsonify
 from flask_cors import CORS
 import numpy as np
 from PIL import Image
+import hashlib
 import io
-import tensorflow as tf
+import json
+import os
+import sys
 
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+# Share the server/utils package with the main API
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.metrics import init_metrics, stage_timer
+from utils.profiling import annotate_request, init_profiling
+from utils.admission import init_admission
+from utils.responses import init_errors, init_responses
+from utils.singleflight import SingleFlight, content_key
+from inference.runtime import BatchingRuntime
+from inference.soil import SoilClassifier, preprocess as preprocess_soil
+from inference.multi_head import MultiHeadModel
+from inference.cascade import Cascade, cascade_batch, load_threshold
+from inference.tiling import aggregate, load_image, predict_tiles
+from inference.gradcam import GradCam, render_heatmap
+from inference import tta
+from inference.shm_ring import RemoteModel, RemoteMultiHead, model_lanes, start_owner
+from utils.cache import FRESH, TTLCache
+from routes.history import current_username, history, history_bp
+from routes.stats import stats_bp
+from routes.active_learning import active_learning, active_learning_bp
+
+# Disease and soil routes; the gateway (server/app.py) mounts this blueprint
+# directly or forwards to this app started on its own
+inference_bp = Blueprint("inference", __name__)
+
+# Model files live next to this file, whichever directory the app starts in
+ML_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(ML_BACKEND_DIR, "leaf_disease_model.h5")
+SOIL_MODEL_PATH = os.path.join(ML_BACKEND_DIR, "soil_model.npz")
+MULTI_HEAD_MODEL_PATH = os.path.join(ML_BACKEND_DIR, "multi_head_model.h5")
+STUDENT_MODEL_PATH = os.path.join(ML_BACKEND_DIR, "student_model.h5")
+CASCADE_REPORT_PATH = os.path.join(ML_BACKEND_DIR, "cascade_report.json")
+SERVING_PROFILE_PATH = os.path.join(ML_BACKEND_DIR, "serving_profile.json")
+# "shared": one inference process holds the weights for all workers (see
+# gunicorn.conf.py); "local": every process loads its own copy
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "local")
+shared_inference = INFERENCE_MODE == "shared"
+
+
+def load_serving_profile(path):
+    """Settings chosen by autotune.py for this machine, or {} when not tuned"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading serving profile: {e}")
+        return {}
+
+def serving_setting(env_name, profile_key, default):
+    """Environment variable, then serving profile, then default"""
+    if os.getenv(env_name):
+        return os.getenv(env_name)
+    return serving_profile.get(profile_key, default)
+
+serving_profile = load_serving_profile(SERVING_PROFILE_PATH)
+# TensorFlow's thread pools are fixed once it initializes, so set them before
+# any model is loaded
+intra_op_threads = int(serving_setting("TF_INTRA_OP_THREADS", "intra_op_threads", 0))
+inter_op_threads = int(serving_setting("TF_INTER_OP_THREADS", "inter_op_threads", 0))
+if (intra_op_threads or inter_op_threads) and not shared_inference:
+    try:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except Exception as e:
+        print(f"Error applying TensorFlow thread settings: {e}")
+
+
+def get_model_version(path):
+    """Short content hash of the model file, used to tag predictions"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+shared_lanes = model_lanes(MODEL_PATH, STUDENT_MODEL_PATH, MULTI_HEAD_MODEL_PATH) if shared_inference else {}
+
+def load_keras_model(path, lane):
+    """The Keras model, or in shared mode its stand-in forwarding to the inference process"""
+    if shared_inference:
+        if lane not in shared_lanes:
+            raise FileNotFoundError(path)
+        return RemoteModel(lane)
+    import tensorflow as tf
+    return tf.keras.models.load_model(path)
+
+# Prefer the multi-head model: one backbone pass serves both disease and soil
+multi_head = None
+if shared_inference and any(lane.startswith("multi_head.") for lane in shared_lanes):
+    with open(os.path.splitext(MULTI_HEAD_MODEL_PATH)[0] + ".json") as f:
+        multi_head = RemoteMultiHead(json.load(f))
+elif not shared_inference and os.path.exists(MULTI_HEAD_MODEL_PATH):
+    try:
+        multi_head = MultiHeadModel.load(MULTI_HEAD_MODEL_PATH)
+    except Exception as e:
+        print(f"Error loading multi-head model: {e}")
 
 # Load your trained model
-try:
-    model = tf.keras.models.load_model("leaf_disease_model.h5")
-    class_names = ["Apple Scab", "Apple Rust", "Corn Blight", "Healthy", "Tomato Bacterial Spot"]
-    model_loaded = True
-except Exception as e:
-    print(f"Error loading model: {e}")
+if multi_head is not None:
     model = None
-    class_names = []
-    model_loaded = False
+    class_names = multi_head.class_names["disease"]
+    model_version = get_model_version(MULTI_HEAD_MODEL_PATH)
+    model_loaded = True
+    soil_model = None
+    soil_model_loaded = True
+else:
+    try:
+        model = load_keras_model(MODEL_PATH, "disease")
+        class_names = ["Apple Scab", "Apple Rust", "Corn Blight", "Healthy", "Tomato Bacterial Spot"]
+        model_version = get_model_version(MODEL_PATH)
+        model_loaded = True
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        model = None
+        class_names = []
+        model_version = None
+        model_loaded = False
 
-def add_cors_headers(response):
-    response.headers["Access-Control-Allow-Origin"] = "*"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS, PUT, DELETE"
-    response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    return response
+    try:
+        soil_model = SoilClassifier.load(SOIL_MODEL_PATH)
+        soil_model_loaded = True
+    except Exception as e:
+        print(f"Error loading soil model: {e}")
+        soil_model = None
+        soil_model_loaded = False
+
+# Small distilled model (train_student.py) answering confident cases first
+student_model = None
+if model_loaded and os.path.exists(STUDENT_MODEL_PATH):
+    try:
+        student_model = load_keras_model(STUDENT_MODEL_PATH, "disease_student")
+        model_version = f"{model_version}+{get_model_version(STUDENT_MODEL_PATH)}"
+    except Exception as e:
+        print(f"Error loading student model: {e}")
+
+# All models share one pool of inference threads; concurrent requests are
+# micro-batched per model
+runtime = BatchingRuntime(
+    workers=int(os.getenv("INFERENCE_WORKERS", "2")),
+    max_batch_size=int(serving_setting("INFERENCE_MAX_BATCH", "max_batch_size", 16)),
+    max_wait_ms=float(serving_setting("INFERENCE_MAX_WAIT_MS", "max_wait_ms", 5)),
+)
+
+def predict_disease_batch(batch):
+    return np.asarray(model(batch, training=False))
+
+def predict_soil_batch(batch):
+    return soil_model.predict(batch)
+
+def predict_student_batch(batch):
+    return np.asarray(student_model(batch, training=False))
+
+runtime.register("disease", predict_disease_batch)
+runtime.register("soil", predict_soil_batch)
+runtime.register("disease_student", predict_student_batch)
+if multi_head is not None:
+    # disease and soil requests are batched together through the backbone
+    runtime.register("multi_head", multi_head.predict_batch, collate=list)
+
+# Grad-CAM for the large model; the explain lane returns the prediction and
+# the activation map from the same backbone pass
+gradcam = None
+if model_loaded and not shared_inference:
+    try:
+        gradcam = GradCam.from_multi_head(multi_head) if multi_head is not None else GradCam.from_sequential(model)
+    except Exception as e:
+        print(f"Grad-CAM unavailable: {e}")
 
-@app.route('/api/detect-disease', methods=['POST', 'OPTIONS'])
+def explain_disease_batch(batch):
+    probabilities, cams = gradcam.explain_batch(batch)
+    return list(zip(probabilities, cams))
+
+runtime.register("disease_explain", explain_disease_batch)
+explanation_cache = TTLCache(
+    float(os.getenv("EXPLAIN_CACHE_TTL", "86400")),
+    max_entries=int(os.getenv("EXPLAIN_CACHE_ENTRIES", "256")),
+)
+
+def predict_disease_full(img_array):
+    if multi_head is not None:
+        return runtime.predict("multi_head", ("disease", img_array))
+    return runtime.predict("disease", img_array)
+
+cascade = None
+if student_model is not None:
+    cascade = Cascade(
+        lambda img_array: runtime.predict("disease_student", img_array),
+        predict_disease_full,
+        float(os.getenv("CASCADE_THRESHOLD", load_threshold(CASCADE_REPORT_PATH))),
+    )
+
+def predict_disease(img_array):
+    """Disease class probabilities for one normalized 224x224 RGB image"""
+    if cascade is None:
+        return predict_disease_full(img_array)
+    predictions, stage = cascade.predict(img_array)
+    annotate_request(cascade_stage=stage)
+    return predictions
+
+def predict_soil(img):
+    """Return (soil class names, probabilities) for a PIL image"""
+    if multi_head is not None:
+        img_array = np.asarray(img.convert('RGB').resize((224, 224)), dtype=np.float32) / 255.0
+        return multi_head.class_names["soil"], runtime.predict("multi_head", ("soil", img_array))
+    return soil_model.classes, runtime.predict("soil", preprocess_soil(img))
+
+# Above this admission load (requests per slot) tta=N requests get one view
+TTA_MAX_LOAD = float(os.getenv("TTA_MAX_LOAD", "0.5"))
+
+# Identical uploads in flight at the same time (e.g. a class photographing the
+# same demo leaf) share one decode and forward pass
+disease_flight = SingleFlight("detect_disease")
+
+def classify_leaf(data):
+    """Return (disease, confidence %) for raw image bytes"""
+    with stage_timer('detect_disease', 'decode'):
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    annotate_request(image_size=img.size, image_mode=img.mode)
+    with stage_timer('detect_disease', 'resize'):
+        img = img.convert('RGB').resize((224, 224))
+    with stage_timer('detect_disease', 'normalize'):
+        img_array = np.asarray(img, dtype=np.float32) / 255.0
+    with stage_timer('detect_disease', 'predict'):
+        predictions = predict_disease(img_array)
+    queue_for_labeling(data, predictions)
+    class_index = int(np.argmax(predictions))
+    return class_names[class_index], round(float(100 * np.max(predictions)), 2)
+
+def predict_disease_many(batch):
+    """Disease probabilities for a batch of images (tiles, TTA views), queued through the runtime together"""
+    def submit_all(lane, rows, head=None):
+        futures = [runtime.submit(lane, (head, row) if head else row) for row in rows]
+        return np.stack([future.result() for future in futures])
+
+    def full(rows):
+        if multi_head is not None:
+            return submit_all("multi_head", rows, head="disease")
+        return submit_all("disease", rows)
+
+    if cascade is None:
+        return full(batch)
+    return cascade_batch(lambda rows: submit_all("disease_student", rows), full, batch, cascade.threshold)[0]
+
+def tta_view_count(requested):
+    """Views to use for ?tta=N (1 = off); TTA is skipped while detect-disease is busy"""
+    try:
+        count = min(max(int(requested or 1), 1), tta.MAX_VIEWS)
+    except ValueError:
+        count = 1
+    limiter = current_app.extensions.get("admission", {}).get("/api/detect-disease")
+    if count > 1 and limiter is not None and limiter.load() > TTA_MAX_LOAD:
+        annotate_request(tta_skipped="load")
+        return 1
+    return count
+
+def classify_leaf_tta(data, count):
+    """Return (disease, confidence %, views agreeing) averaged over count augmented views"""
+    with stage_timer('detect_disease_tta', 'decode'):
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    annotate_request(image_size=img.size, image_mode=img.mode, tta=count)
+    with stage_timer('detect_disease_tta', 'views'):
+        batch = tta.views(img, count).astype(np.float32) / 255.0
+    with stage_timer('detect_disease_tta', 'predict'):
+        predictions, agreeing = tta.average(predict_disease_many(batch))
+    queue_for_labeling(data, predictions)
+    class_index = int(np.argmax(predictions))
+    return class_names[class_index], round(float(100 * predictions[class_index]), 2), agreeing
+
+def classify_leaf_tiled(data):
+    """Per-image disease, tile counts and heatmap for a high-resolution photo"""
+    with stage_timer('detect_disease_tiled', 'decode'):
+        img = Image.open(io.BytesIO(data))
+        annotate_request(image_size=img.size, image_mode=img.mode)
+        image = load_image(img)
+    with stage_timer('detect_disease_tiled', 'predict'):
+        probabilities, selected, _ = predict_tiles(image, predict_disease_many)
+    return aggregate(probabilities, selected, class_names)
+
+def explain_leaf(data):
+    """Prediction plus Grad-CAM heatmap for raw image bytes"""
+    with stage_timer('explain_disease', 'decode'):
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    annotate_request(image_size=img.size, image_mode=img.mode)
+    with stage_timer('explain_disease', 'resize'):
+        image = np.asarray(img.convert('RGB').resize((224, 224)))
+    with stage_timer('explain_disease', 'predict'):
+        probabilities, cam = runtime.predict("disease_explain", image.astype(np.float32) / 255.0)
+    queue_for_labeling(data, probabilities)
+    with stage_timer('explain_disease', 'render'):
+        heatmap = render_heatmap(image, cam)
+    class_index = int(np.argmax(probabilities))
+    return {
+        "disease": class_names[class_index],
+        "confidence": round(float(100 * probabilities[class_index]), 2),
+        "heatmap": heatmap,
+        "cam": np.round(cam, 3),
+    }
+
+def get_explanation(data):
+    """Return (explanation, cached), cached per image content and model version"""
+    key = (content_key(data), model_version)
+    explanation, state = explanation_cache.get(key)
+    if state == FRESH:
+        return explanation, True
+
+    def compute():
+        explanation = explain_leaf(data)
+        explanation_cache.set(key, explanation)
+        return explanation
+
+    return disease_flight.do(("explain",) + key, compute)[0], False
+
+def record_prediction(data, endpoint, result, mode="single"):
+    """Keep the upload and result for history and retraining, off the request path"""
+    if history is not None:
+        history.record(data, current_username(), endpoint, dict(result, mode=mode), model_version)
+
+def queue_for_labeling(data, probabilities):
+    """Offer an uncertain prediction to the active-learning queue; only appends to a buffer"""
+    if active_learning is not None:
+        active_learning.offer(data, probabilities, class_names, model_version, current_username())
+
+@inference_bp.route('/api/detect-disease', methods=['POST'])
 def detect_disease():
-    if request.method == 'OPTIONS':
-        return add_cors_headers(make_response('', 200))
-    
     if not model_loaded:
-        return add_cors_headers(jsonify({'error': 'Model not loaded'})), 500
+        return jsonify({'error': 'Model not loaded'}), 500
     
     if 'leaf' not in request.files:
-        return add_cors_headers(jsonify({'error': 'No leaf image uploaded'})), 400
+        return jsonify({'error': 'No leaf image uploaded'}), 400
     
     try:
         file = request.files['leaf']
-        img = Image.open(file.stream).resize((224, 224))
-        img_array = np.expand_dims(np.array(img)/255.0, axis=0)
-        predictions = model.predict(img_array)
-        class_index = np.argmax(predictions)
-        confidence = round(100 * np.max(predictions), 2)
-
-        return add_cors_headers(jsonify({
-            "disease": class_names[class_index],
-            "confidence": confidence
-        }))
+        with stage_timer('detect_disease', 'upload_read'):
+            data = file.read()
+        # mode=tiled: overlapping 224px tiles for whole-plant and field photos
+        mode = request.form.get('mode') or request.args.get('mode') or 'single'
+        # tta=N: average N flipped/cropped views, run as one batch
+        views = tta_view_count(request.values.get('tta')) if mode == 'single' else 1
+        with stage_timer('detect_disease', 'hash'):
+            key = content_key(model_version, mode, data) if views == 1 else content_key(model_version, 'tta', views, data)
+        # explain=1: answer from the Grad-CAM pass, which includes the prediction
+        if request.values.get('explain') in ('1', 'true') and mode != 'tiled' and gradcam is not None:
+            explanation, cached = get_explanation(data)
+            annotate_request(upload_bytes=len(data), model_version=model_version, explained=True)
+            record_prediction(data, 'detect_disease', explanation)
+            return jsonify(dict(explanation, cached=cached))
+        if mode == 'tiled':
+            result, coalesced = disease_flight.do(key, classify_leaf_tiled, data)
+            annotate_request(upload_bytes=len(data), model_version=model_version, coalesced=coalesced, mode=mode)
+            record_prediction(data, 'detect_disease', result, mode)
+            return jsonify(result)
+        if views > 1:
+            (disease, confidence, agreeing), coalesced = disease_flight.do(key, classify_leaf_tta, data, views)
+            annotate_request(upload_bytes=len(data), model_version=model_version, coalesced=coalesced)
+            result = {"disease": disease, "confidence": confidence, "tta": views, "tta_agreement": agreeing}
+            record_prediction(data, 'detect_disease', result, 'tta')
+            return jsonify(result)
+        (disease, confidence), coalesced = disease_flight.do(key, classify_leaf, data)
+        annotate_request(upload_bytes=len(data), model_version=model_version, coalesced=coalesced)
+        record_prediction(data, 'detect_disease', {"disease": disease, "confidence": confidence})
+
+        with stage_timer('detect_disease', 'serialize'):
+            response = jsonify({
+                "disease": disease,
+                "confidence": confidence
+            })
+        return response
     except Exception as e:
         import traceback
         print(f"Error in disease detection: {e}")
         traceback.print_exc()
-        return add_cors_headers(jsonify({'error': f'Error processing image: {str(e)}'})), 500
+        return jsonify({'error': f'Error processing image: {str(e)}'}), 500
+
+@inference_bp.route('/api/explain-disease', methods=['POST'])
+def explain_disease():
+    if gradcam is None:
+        return jsonify({'error': 'Explanations not available'}), 500
+    if 'leaf' not in request.files:
+        return jsonify({'error': 'No leaf image uploaded'}), 400
+    try:
+        data = request.files['leaf'].read()
+        explanation, cached = get_explanation(data)
+        annotate_request(upload_bytes=len(data), model_version=model_version, cached=cached)
+        record_prediction(data, 'explain_disease', explanation)
+        return jsonify(dict(explanation, cached=cached))
+    except Exception as e:
+        import traceback
+        print(f"Error in disease explanation: {e}")
+        traceback.print_exc()
+        return jsonify({'error': f'Error processing image: {str(e)}'}), 500
 
-@app.route('/api/detect-soil', methods=['POST', 'OPTIONS'])
+@inference_bp.route('/api/detect-soil', methods=['POST'])
 def detect_soil():
-    if request.method == 'OPTIONS':
-        return add_cors_headers(make_response('', 200))
+    if not soil_model_loaded:
+        return jsonify({'error': 'Soil model not loaded'}), 500
     if 'image' not in request.files:
-        return add_cors_headers(jsonify({'error': 'No image uploaded'})), 400
-    image = request.files['image']
-    soil_type = "Loamy"
-    return add_cors_headers(jsonify({'soil_type': soil_type}))
-
-@app.route('/api/recommend-plants', methods=['POST', 'OPTIONS'])
-def recommend_plants():
-    if request.method == 'OPTIONS':
-        return add_cors_headers(make_response('', 200))
+        return jsonify({'error': 'No image uploaded'}), 400
     try:
-        data = request.get_json(force=True, silent=True) or {}
-        soil_type = data.get('soil_type') or 'Loamy'
-        location = data.get('location', '')
-        temperature = data.get('temperature')
-        try:
-            temperature = int(temperature)
-        except (TypeError, ValueError):
-            temperature = 25
-        plant_map = {
-            "Sandy": [("Carrot", (15, 25)), ("Potato", (15, 20)), ("Peanut", (20, 30))],
-            "Clay": [("Rice", (20, 30)), ("Broccoli", (15, 25)), ("Cabbage", (15, 20))],
-            "Silty": [("Tomato", (20, 30)), ("Pea", (13, 18)), ("Soybean", (20, 30))],
-            "Peaty": [("Cranberry", (10, 20)), ("Blueberry", (13, 21))],
-            "Chalky": [("Spinach", (10, 20)), ("Beetroot", (15, 25))],
-            "Loamy": [("Wheat", (12, 25)), ("Maize", (18, 27)), ("Sugarcane", (20, 30))],
-            "Red Soil": [("Millet", (20, 30)), ("Groundnut", (20, 30)), ("Cotton", (21, 30))],
-            "Black Soil": [("Cotton", (21, 30)), ("Sorghum", (20, 30)), ("Soybean", (20, 30))],
-            "Alluvial Soil": [("Paddy", (20, 30)), ("Sugarcane", (20, 30)), ("Jute", (24, 35))],
-            "Laterite Soil": [("Cashew", (20, 30)), ("Pineapple", (20, 30)), ("Tea", (18, 25))],
-            "Saline Soil": [("Barley", (12, 25)), ("Cotton", (21, 30))],
-            "Alkaline Soil": [("Rice", (20, 30)), ("Wheat", (12, 25))],
-            "Coastal Alluvium": [("Coconut", (20, 30)), ("Paddy", (20, 30))],
-            "Deltaic Alluvium": [("Paddy", (20, 30)), ("Banana", (20, 30))],
-            "Mixed Red and Black Soil": [("Cotton", (21, 30)), ("Groundnut", (20, 30))],
-            "Forest Soil": [("Tea", (18, 25)), ("Coffee", (15, 25))],
-            "Calcareous Soil": [("Sugarcane", (20, 30)), ("Wheat", (12, 25))],
-        }
-        recommendations = []
-        if soil_type in plant_map and temperature is not None:
-            for plant, (t_min, t_max) in plant_map[soil_type]:
-                if t_min <= temperature <= t_max:
-                    recommendations.append(plant)
-            if not recommendations:
-                recommendations = [f"No suitable plant found for {soil_type} at {temperature}°C"]
-        else:
-            recommendations = ["No recommendation found"]
-        return add_cors_headers(jsonify({'recommendations': recommendations}))
+        with stage_timer('detect_soil', 'decode'):
+            img = Image.open(request.files['image'].stream)
+            img.load()
+        with stage_timer('detect_soil', 'predict'):
+            soil_classes, probabilities = predict_soil(img)
+        soil_index = int(np.argmax(probabilities))
+        return jsonify({
+            'soil_type': soil_classes[soil_index],
+            'confidence': round(float(100 * probabilities[soil_index]), 2)
+        })
     except Exception as e:
-        print("Error in recommend_plants:", e)
-        return add_cors_headers(jsonify({'recommendations': ["No recommendation found (error)"]})), 200
+        import traceback
+        print(f"Error in soil detection: {e}")
+        traceback.print_exc()
+        return jsonify({'error': f'Error processing image: {str(e)}'}), 500
+
+def create_app():
+    """
+    The inference service on its own (python app.py / gunicorn 'app:create_app()');
+    the frontend reaches it through the gateway in server/app.py. The gateway
+    only mounts inference_bp, so importing this module does not build this
+    app, its admission limiters or a second profiler.
+    """
+    app = Flask(__name__)
+    CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+    init_metrics(app)
+    init_profiling(app)
+    # Bound concurrent model calls
+    init_admission(app, {"/api/detect-disease": 4, "/api/explain-disease": 4, "/api/detect-soil": 8})
+    init_responses(app)  # orjson (NumPy-aware) for jsonify, gzip/brotli for large bodies
+    init_errors(app)
+    app.register_blueprint(inference_bp)  # /api/detect-disease, /api/explain-disease, /api/detect-soil
+    app.register_blueprint(history_bp)  # /api/history for signed-in users
+    app.register_blueprint(stats_bp)  # /api/stats/summary from the prediction rollups
+    app.register_blueprint(active_learning_bp)  # /admin/active-learning labeling queue
+    return app
 
 if __name__ == '__main__':
-    app.run(port=5000, debug=False)
+    app = create_app()
+    if shared_inference:
+        # under gunicorn the master starts it before forking the workers
+        start_owner(shared_lanes, max_batch_size=runtime.max_batch_size, max_wait_ms=1000 * runtime.max_wait,
+                    threads=(intra_op_threads, inter_op_threads)).wait_ready()
+    # BIND is host:port or unix:/path/to.sock (as for gunicorn); the gateway owns :5000
+    bind = os.getenv("BIND", "127.0.0.1:5001")
+    if bind.startswith("unix:"):
+        app.run(host="unix://" + bind[len("unix:"):], debug=False)
+    else:
+        host, port = bind.rsplit(":", 1)
+        app.run(host=host, port=int(port), debug=False)
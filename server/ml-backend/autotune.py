@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Find the serving configuration with the highest throughput on this machine.
+
+Benchmarks the disease model over a grid of TensorFlow intra-op/inter-op
+thread counts, batch sizes and worker process counts, and writes the best
+configuration whose p99 request latency fits the budget to
+serving_profile.json, which app.py reads at startup.
+
+Every (processes, intra, inter) combination runs in freshly spawned
+processes, because TensorFlow's thread pools cannot be resized once it is
+initialized. All processes of a trial run the same batch size at the same
+time (synchronized by a barrier), each calling the model the way app.py
+does. A trial's p99 is the batch latency p99 plus the runtime's max wait,
+the worst a request can queue before its batch starts. Inputs come from a
+fixed seed, combinations run in a fixed order and each cell is the median of
+--repeats timed rounds, so reruns on the same machine give the same choice.
+
+Examples:
+    python autotune.py                      # uses leaf_disease_model.h5
+    python autotune.py --p99-ms 300 --batch-sizes 1,4,8,16 --processes 1,2,4
+    python autotune.py --untrained          # no trained model: time the architecture
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import platform
+import time
+from datetime import datetime
+
+import numpy as np
+
+MODEL_PATH = 'leaf_disease_model.h5'
+PROFILE_PATH = 'serving_profile.json'
+
+
+def load_model(path, untrained):
+    import tensorflow as tf
+
+    if not untrained:
+        return tf.keras.models.load_model(path)
+    from tensorflow.keras import layers, models
+    from train_model import create_classifier_head
+
+    base_model = tf.keras.applications.ResNet50V2(weights=None, include_top=False, input_shape=(224, 224, 3))
+    model = models.Sequential([base_model, layers.GlobalAveragePooling2D()] + create_classifier_head(5).layers)
+    model.build((None, 224, 224, 3))
+    return model
+
+
+def run_worker(rank, intra, inter, args, barrier, results):
+    """One serving process of a trial: time every batch size in lockstep with the others"""
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(intra)
+    tf.config.threading.set_inter_op_parallelism_threads(inter)
+    model = load_model(args.model, args.untrained)
+    rng = np.random.default_rng(args.seed + rank)
+
+    timings = {}
+    for batch_size in args.batch_sizes:
+        batch = rng.random((batch_size, 224, 224, 3), dtype=np.float32)
+        for _ in range(args.warmup):
+            np.asarray(model(batch, training=False))
+        rounds = []
+        for _ in range(args.repeats):
+            barrier.wait()
+            latencies = []
+            start = time.perf_counter()
+            while time.perf_counter() - start < args.seconds:
+                call_start = time.perf_counter()
+                np.asarray(model(batch, training=False))
+                latencies.append(time.perf_counter() - call_start)
+            rounds.append((time.perf_counter() - start, latencies))
+        timings[batch_size] = rounds
+    results.put((rank, timings))
+
+
+def run_trial(processes, intra, inter, args):
+    """Spawn the processes of one (processes, intra, inter) combination; returns rows per batch size"""
+    context = mp.get_context('spawn')
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    workers = [context.Process(target=run_worker, args=(rank, intra, inter, args, barrier, results))
+               for rank in range(processes)]
+    for worker in workers:
+        worker.start()
+    timings = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    rows = []
+    for batch_size in args.batch_sizes:
+        throughputs, p50s, p99s = [], [], []
+        for round_index in range(args.repeats):
+            elapsed, latencies = 0.0, []
+            images = 0
+            for _, worker_timings in timings:
+                seconds, round_latencies = worker_timings[batch_size][round_index]
+                elapsed = max(elapsed, seconds)
+                images += batch_size * len(round_latencies)
+                latencies.extend(round_latencies)
+            throughputs.append(images / elapsed)
+            p50s.append(np.percentile(latencies, 50))
+            p99s.append(np.percentile(latencies, 99))
+        batch_p99_ms = 1000 * float(np.median(p99s))
+        rows.append({
+            'processes': processes,
+            'intra_op_threads': intra,
+            'inter_op_threads': inter,
+            'batch_size': batch_size,
+            'throughput_ips': round(float(np.median(throughputs)), 2),
+            'batch_p50_ms': round(1000 * float(np.median(p50s)), 2),
+            'batch_p99_ms': round(batch_p99_ms, 2),
+            'p99_ms': round(batch_p99_ms + args.max_wait_ms, 2),
+        })
+    return rows
+
+
+def thread_options(cpus):
+    options = {1, 2, 4, cpus // 2, cpus}
+    return sorted(n for n in options if 1 <= n <= cpus)
+
+
+def model_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def parse_ints(spec):
+    return [int(part) for part in spec.split(',') if part.strip()]
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Benchmark serving configurations and write serving_profile.json")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--untrained', action='store_true', help="Time an untrained model of the same architecture")
+    parser.add_argument('--batch-sizes', type=parse_ints, default=[1, 4, 8, 16])
+    parser.add_argument('--processes', type=parse_ints, default=sorted({1, 2, max(1, cpus // 4), max(1, cpus // 2)}))
+    parser.add_argument('--intra-op', type=parse_ints, default=thread_options(cpus))
+    parser.add_argument('--inter-op', type=parse_ints, default=[1, 2])
+    parser.add_argument('--p99-ms', type=float, default=500.0, help="Latency budget for the 99th percentile")
+    parser.add_argument('--max-wait-ms', type=float, default=float(os.getenv("INFERENCE_MAX_WAIT_MS", "5")),
+                        help="Batching wait added to every request (INFERENCE_MAX_WAIT_MS)")
+    parser.add_argument('--seconds', type=float, default=3.0, help="Duration of each timed round")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed rounds per cell (median reported)")
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--oversubscribe', action='store_true',
+                        help="Also try processes x intra-op threads above the CPU count")
+    parser.add_argument('--output', default=PROFILE_PATH)
+    args = parser.parse_args()
+
+    if not args.untrained and not os.path.exists(args.model):
+        print(f"Model '{args.model}' not found. Train it first, or pass --untrained to time the architecture.")
+        exit(1)
+
+    combinations = [(p, intra, inter) for p, intra, inter in itertools.product(args.processes, args.intra_op, args.inter_op)
+                    if args.oversubscribe or p * intra <= cpus]
+    print(f"{cpus} CPUs, {len(combinations)} thread/process combinations x {len(args.batch_sizes)} batch sizes")
+
+    rows = []
+    for processes, intra, inter in combinations:
+        print(f"  processes={processes} intra={intra} inter={inter} ...", flush=True)
+        rows.extend(run_trial(processes, intra, inter, args))
+
+    within_budget = [row for row in rows if row['p99_ms'] <= args.p99_ms]
+    # highest throughput; fewer processes, threads and smaller batches break ties
+    rank = lambda row: (-row['throughput_ips'], row['processes'], row['intra_op_threads'],
+                        row['inter_op_threads'], row['batch_size'])
+    best = min(within_budget, key=rank) if within_budget else None
+
+    print(f"\n{'proc':>5} {'intra':>6} {'inter':>6} {'batch':>6} {'img/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in rows:
+        marker = '  <- best' if row is best else ('' if row['p99_ms'] <= args.p99_ms else '  (over budget)')
+        print(f"{row['processes']:>5} {row['intra_op_threads']:>6} {row['inter_op_threads']:>6} "
+              f"{row['batch_size']:>6} {row['throughput_ips']:>8.1f} {row['batch_p50_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f}{marker}")
+
+    if best is None:
+        print(f"\nNo configuration meets p99 <= {args.p99_ms} ms; profile not written")
+        exit(1)
+
+    import tensorflow as tf
+    profile = {
+        'processes': best['processes'],
+        'intra_op_threads': best['intra_op_threads'],
+        'inter_op_threads': best['inter_op_threads'],
+        'max_batch_size': best['batch_size'],
+        'max_wait_ms': args.max_wait_ms,
+        'expected_throughput_ips': best['throughput_ips'],
+        'expected_p99_ms': best['p99_ms'],
+        'p99_budget_ms': args.p99_ms,
+        'machine': {'cpus': cpus, 'platform': platform.platform(), 'processor': platform.processor(),
+                    'tensorflow': tf.__version__},
+        'model': 'untrained' if args.untrained else model_digest(args.model),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'trials': rows,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(profile, f, indent=2)
+    print(f"\nBest: {best['processes']} process(es), intra-op {best['intra_op_threads']}, "
+          f"inter-op {best['inter_op_threads']}, batch {best['batch_size']}: "
+          f"{best['throughput_ips']:.1f} images/s, p99 {best['p99_ms']:.0f} ms")
+    print(f"Profile saved as '{args.output}'; app.py applies it at startup")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@ import os
 import shutil
 from PIL import Image
 import argparse
+import sys
+from datetime import datetime
 
 def create_directory_structure():
     """
@@ -174,6 +176,40 @@ For training a disease detection model with 90%+ accuracy, you'll need:
     
     print("Created data_preparation_guide.txt with detailed information")
 
+def export_history(data_dir, since=None, min_confidence=0.0):
+    """
+    Add field images from the prediction history to the training data,
+    labelled with the model's prediction (review low-confidence ones first)
+    """
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from routes.history import history
+
+    if history is None:
+        print("Prediction history is disabled (set MONGO_URI, HISTORY_ENABLED=1)")
+        return
+    if since:
+        since = datetime.fromisoformat(since)
+    counts = history.export(data_dir, since=since, min_confidence=min_confidence)
+    print(f"Exported {counts['exported']} images to {data_dir}/ "
+          f"({counts['skipped']} already present, {counts['missing']} missing from the blob store)")
+    print(f"Labels and confidences: {os.path.join(data_dir, 'history_manifest.csv')}")
+
+def export_active_learning(data_dir):
+    """
+    Move the images labeled in the active-learning queue (/admin/active-learning)
+    into the training data
+    """
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from routes.active_learning import active_learning
+
+    if active_learning is None:
+        print("Active learning is disabled (ACTIVE_LEARNING_ENABLED=0)")
+        return
+    counts = active_learning.export(data_dir)
+    print(f"Exported {counts['exported']} labeled images to {data_dir}/ "
+          f"({counts['skipped']} already present, {counts['missing']} missing)")
+    print(f"Labels and scores: {os.path.join(data_dir, 'active_learning_manifest.csv')}")
+
 def main():
     parser = argparse.ArgumentParser(description="Prepare training data for disease detection model")
     parser.add_argument("--create-dirs", action="store_true", help="Create directory structure")
@@ -181,6 +217,12 @@ def main():
     parser.add_argument("--resize", action="store_true", help="Resize images to 224x224")
     parser.add_argument("--info", action="store_true", help="Create data preparation guide")
     parser.add_argument("--all", action="store_true", help="Run all preparation steps")
+    parser.add_argument("--export-history", action="store_true", help="Export uploaded images from the prediction history")
+    parser.add_argument("--since", help="With --export-history: only predictions after this ISO date")
+    parser.add_argument("--min-confidence", type=float, default=90.0,
+                        help="With --export-history: minimum prediction confidence in %% (default 90)")
+    parser.add_argument("--export-active-learning", action="store_true",
+                        help="Export images labeled in the active-learning queue")
     
     args = parser.parse_args()
     
@@ -205,7 +247,14 @@ def main():
     if args.all or args.info:
         create_sample_data_info()
     
-    if not any([args.create_dirs, args.validate, args.resize, args.info, args.all]):
+    if args.export_history:
+        export_history("data", since=args.since, min_confidence=args.min_confidence)
+
+    if args.export_active_learning:
+        export_active_learning("data")
+
+    if not any([args.create_dirs, args.validate, args.resize, args.info, args.all, args.export_history,
+                args.export_active_learning]):
         print("No action specified. Use --help for options.")
         print("Recommended: python collect_data.py --all")
 
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Compress the leaf disease model for CPU-only edge machines.
+
+1. Distill leaf_disease_model.h5 (ResNet50V2) into the MobileNetV2 student
+   from train_student.py, on the data generators from train_model.py.
+2. Structured channel pruning of the student: in every inverted residual
+   block, drop the expansion channels whose BatchNorm scale (|gamma|) is
+   smallest. These channels live only inside the block (expand conv ->
+   depthwise conv -> project conv), so removing them shrinks all three
+   convolutions without touching the residual connections. Pruning is done
+   in --prune-steps rounds, each followed by distillation fine-tuning.
+3. Write the compact model and a model card with FLOPs, parameter count,
+   single-image CPU latency and validation accuracy next to the teacher's.
+
+The compact model takes the same [0, 1] 224x224 input as the teacher; save
+it as student_model.h5 to use it as the first stage of the serving cascade.
+
+Examples:
+    python compress.py                                  # writes compact_model.h5 + model card
+    python compress.py --prune-ratio 0.6 --prune-steps 3 --output student_model.h5
+"""
+
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, models
+
+from train_model import create_data_generators
+from train_student import create_student_model, distill, evaluate_accuracy
+
+TEACHER_MODEL_PATH = 'leaf_disease_model.h5'
+OUTPUT_PATH = 'compact_model.h5'
+
+
+def all_layers(model):
+    """Layers of a model, descending into nested models"""
+    for layer in model.layers:
+        if isinstance(layer, models.Model):
+            yield from all_layers(layer)
+        else:
+            yield layer
+
+
+def expansion_blocks(model):
+    """Names of the inverted residual blocks with an expansion conv, e.g. 'block_3'"""
+    names = {layer.name for layer in all_layers(model)}
+    return sorted((name[:-len('_expand')] for name in names if name.endswith('_expand')),
+                  key=lambda block: int(block.split('_')[1]))
+
+
+def pruning_plan(model, keep_fraction, multiple=8):
+    """Expansion channels to keep per block: the largest |gamma|, rounded to a multiple of 8"""
+    layers_by_name = {layer.name: layer for layer in all_layers(model)}
+    plan = {}
+    for block in expansion_blocks(model):
+        gamma = np.abs(layers_by_name[f'{block}_expand_BN'].get_weights()[0])
+        keep = max(multiple, int(round(len(gamma) * keep_fraction / multiple)) * multiple)
+        plan[block] = np.sort(np.argsort(-gamma)[:min(keep, len(gamma))])
+    return plan
+
+
+def prune(model, plan):
+    """Copy of model with only the planned expansion channels of each block"""
+    widths = {f'{block}_expand': len(keep) for block, keep in plan.items()}
+
+    def clone_layer(layer):
+        if isinstance(layer, models.Model):
+            return models.clone_model(layer, clone_function=clone_layer)
+        config = layer.get_config()
+        if layer.name in widths:
+            config['filters'] = widths[layer.name]
+        return layer.__class__.from_config(config)
+
+    pruned = models.clone_model(model, clone_function=clone_layer)
+    pruned.build((None, 224, 224, 3))
+
+    originals = {layer.name: layer for layer in all_layers(model)}
+    for layer in all_layers(pruned):
+        if not layer.weights:
+            continue
+        weights = originals[layer.name].get_weights()
+        block = layer.name.split('_expand')[0].split('_depthwise')[0].split('_project')[0]
+        keep = plan.get(block)
+        if keep is not None:
+            if layer.name in (f'{block}_expand', f'{block}_expand_BN', f'{block}_depthwise_BN'):
+                # output channels are the last axis of the kernel and of every BN vector
+                weights = [w[..., keep] for w in weights]
+            elif layer.name in (f'{block}_depthwise', f'{block}_project'):
+                # input channels are axis 2 of depthwise and 1x1 conv kernels
+                weights = [weights[0][:, :, keep, :]] + weights[1:]
+        layer.set_weights(weights)
+    return pruned
+
+
+def count_flops(model):
+    """Multiply-adds x 2 of the convolutions and dense layers for one image"""
+    macs = 0
+    for layer in all_layers(model):
+        if isinstance(layer, (layers.Conv2D, layers.DepthwiseConv2D, layers.Dense)):
+            in_channels = layer.input.shape[-1]
+            kernel = layer.get_weights()[0]
+            if isinstance(layer, layers.Dense):
+                macs += kernel.size
+                continue
+            out_h, out_w = layer.output.shape[1:3]
+            if isinstance(layer, layers.DepthwiseConv2D):
+                macs += out_h * out_w * kernel.size
+            else:
+                macs += out_h * out_w * kernel.shape[0] * kernel.shape[1] * in_channels * layer.filters
+    return 2 * int(macs)
+
+
+def cpu_latency_ms(model, repeats=50):
+    """Median single-image latency, called the way app.py calls the model"""
+    image = np.random.default_rng(0).random((1, 224, 224, 3), dtype=np.float32)
+    for _ in range(5):
+        np.asarray(model(image, training=False))
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        np.asarray(model(image, training=False))
+        timings.append(time.perf_counter() - start)
+    return 1000 * float(np.median(timings))
+
+
+def agreement(model, teacher, generator):
+    """Fraction of validation images where model and teacher pick the same class"""
+    same = total = 0
+    for step in range(len(generator)):
+        x, _ = generator[step]
+        same += int(np.sum(np.argmax(np.asarray(model(x, training=False)), axis=1)
+                           == np.argmax(np.asarray(teacher(x, training=False)), axis=1)))
+        total += len(x)
+    return same / max(total, 1)
+
+
+def describe(name, model, teacher, val_generator):
+    return {
+        'name': name,
+        'parameters': int(model.count_params()),
+        'flops': count_flops(model),
+        'cpu_latency_ms': round(cpu_latency_ms(model), 2),
+        'val_accuracy': round(evaluate_accuracy(model, val_generator), 4),
+        'teacher_agreement': round(agreement(model, teacher, val_generator), 4) if model is not teacher else 1.0,
+    }
+
+
+def write_model_card(path, rows, args, class_names, plan):
+    teacher = rows[0]
+    card = {
+        'model': os.path.basename(args.output),
+        'teacher': os.path.basename(args.teacher),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'input': '224x224 RGB, values in [0, 1]',
+        'classes': class_names,
+        'compression': {
+            'student_alpha': args.alpha,
+            'distill_epochs': args.distill_epochs,
+            'prune_ratio': args.prune_ratio,
+            'prune_steps': args.prune_steps,
+            'finetune_epochs': args.finetune_epochs,
+            'expansion_channels': {block: len(keep) for block, keep in plan.items()},
+        },
+        'machine': {'cpus': os.cpu_count(), 'platform': platform.platform(), 'tensorflow': tf.__version__},
+        'models': rows,
+    }
+    with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+        json.dump(card, f, indent=2)
+
+    lines = [
+        f"# Model card: {card['model']}",
+        "",
+        f"Compact leaf disease classifier distilled from `{card['teacher']}` (ResNet50V2) into a "
+        f"MobileNetV2 (alpha {args.alpha}) and channel-pruned by {args.prune_ratio:.0%} in "
+        f"{args.prune_steps} step(s) with distillation fine-tuning.",
+        "",
+        f"- Input: {card['input']}",
+        f"- Classes: {', '.join(class_names)}",
+        f"- Measured on: {card['machine']['cpus']} CPU(s), {card['machine']['platform']}, "
+        f"TensorFlow {card['machine']['tensorflow']}",
+        "",
+        "| model | parameters | GFLOPs | CPU ms/image | val accuracy | agreement with teacher |",
+        "|-------|-----------:|-------:|-------------:|-------------:|-----------------------:|",
+    ]
+    for row in rows:
+        lines.append(f"| {row['name']} | {row['parameters']:,} | {row['flops'] / 1e9:.3f} | "
+                     f"{row['cpu_latency_ms']:.1f} | {row['val_accuracy']:.2%} | {row['teacher_agreement']:.2%} |")
+    lines += ["", f"Accuracy change vs. teacher: {rows[-1]['val_accuracy'] - teacher['val_accuracy']:+.2%}; "
+                  f"{teacher['cpu_latency_ms'] / rows[-1]['cpu_latency_ms']:.1f}x faster, "
+                  f"{teacher['flops'] / rows[-1]['flops']:.1f}x fewer FLOPs."]
+    with open(path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill and prune the leaf disease model")
+    parser.add_argument('--teacher', default=TEACHER_MODEL_PATH)
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--alpha', type=float, default=0.35, help="MobileNetV2 width multiplier of the student")
+    parser.add_argument('--distill-epochs', type=int, default=15)
+    parser.add_argument('--prune-ratio', type=float, default=0.5, help="Fraction of expansion channels removed")
+    parser.add_argument('--prune-steps', type=int, default=2)
+    parser.add_argument('--finetune-epochs', type=int, default=5, help="Distillation epochs after each pruning step")
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.teacher) or not os.path.exists(args.data_dir):
+        print(f"Need '{args.teacher}' and '{args.data_dir}/'. Train the large model first with:")
+        print("  python train_model.py")
+        exit(1)
+
+    print("Loading teacher model...")
+    teacher = tf.keras.models.load_model(args.teacher)
+    train_generator, val_generator = create_data_generators(args.data_dir, args.batch_size)
+    class_names = sorted(train_generator.class_indices, key=train_generator.class_indices.get)
+
+    print("Distilling student model...")
+    student = create_student_model(num_classes=len(class_names), alpha=args.alpha)
+    student, _ = distill(teacher, student, train_generator, val_generator, epochs=args.distill_epochs)
+    rows = [describe('teacher (ResNet50V2)', teacher, teacher, val_generator),
+            describe(f'student (MobileNetV2 {args.alpha})', student, teacher, val_generator)]
+
+    compact, plan = student, {}
+    keep_fraction = (1.0 - args.prune_ratio) ** (1.0 / max(args.prune_steps, 1))
+    for step in range(args.prune_steps):
+        plan = pruning_plan(compact, keep_fraction)
+        compact = prune(compact, plan)
+        print(f"Pruning step {step + 1}/{args.prune_steps}: {compact.count_params():,} parameters, fine-tuning...")
+        compact, _ = distill(teacher, compact, train_generator, val_generator,
+                             epochs=args.finetune_epochs, learning_rate=0.0003)
+    if args.prune_steps:
+        rows.append(describe(f'pruned student ({args.prune_ratio:.0%} channels removed)', compact, teacher,
+                             val_generator))
+
+    compact.save(args.output)
+    card_path = os.path.splitext(args.output)[0] + '_card.md'
+    write_model_card(card_path, rows, args, class_names, plan)
+
+    print(f"\n{'model':<40} {'params':>11} {'GFLOPs':>7} {'ms':>7} {'accuracy':>9}")
+    for row in rows:
+        print(f"{row['name']:<40} {row['parameters']:>11,} {row['flops'] / 1e9:>7.3f} "
+              f"{row['cpu_latency_ms']:>7.1f} {row['val_accuracy']:>9.2%}")
+    print(f"\nCompact model saved as '{args.output}', model card as '{card_path}'")
+
+
+if __name__ == '__main__':
+    main()
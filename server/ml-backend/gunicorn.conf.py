@@ -0,0 +1,76 @@
+"""
+gunicorn settings for the ML backend:  gunicorn 'app:create_app()'
+
+Binds BIND (default 0.0.0.0:5001); e.g. BIND=unix:/tmp/cropiq-inference.sock
+for the gateway in server/app.py started with
+INFERENCE_URL=unix:///tmp/cropiq-inference.sock.
+
+Workers default to the serving profile's process count (autotune.py). With
+INFERENCE_MODE=shared the master starts one inference process holding the
+model weights before forking the workers; the workers never load TensorFlow
+and send images to it over shared memory (server/inference/shm_ring.py).
+The workers only know the ring they were forked with, so if the inference
+process dies the master shuts down (for systemd or the container runtime to
+restart) rather than keep serving errors.
+"""
+
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+# Same paths as app.py, so master and workers agree on lanes and profile
+# whatever directory gunicorn starts in
+ML_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(ML_BACKEND_DIR))
+from inference.shm_ring import current_owner, model_lanes, start_owner
+
+SERVING_PROFILE_PATH = os.path.join(ML_BACKEND_DIR, "serving_profile.json")
+profile = {}
+if os.path.exists(SERVING_PROFILE_PATH):
+    with open(SERVING_PROFILE_PATH) as f:
+        profile = json.load(f)
+
+bind = os.getenv("BIND", "0.0.0.0:5001")
+workers = int(os.getenv("WEB_CONCURRENCY", profile.get("processes", 2)))
+# requests wait on the model, not the CPU; a few threads keep each worker's batches full
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+# the gateway keeps its connections open between requests
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+timeout = 120
+# how often the master checks that the inference process is still running
+owner_check_seconds = float(os.getenv("INFERENCE_OWNER_CHECK_SECONDS", "5"))
+
+
+def watch_owner(server, owner):
+    while owner.alive():
+        time.sleep(owner_check_seconds)
+    if not owner.ring.stopping.is_set():
+        server.log.error(f"Inference process {owner.process.pid} exited; shutting down")
+        os.kill(os.getpid(), signal.SIGTERM)
+
+
+def on_starting(server):
+    if os.getenv("INFERENCE_MODE") != "shared":
+        return
+    lanes = model_lanes(*(os.path.join(ML_BACKEND_DIR, name)
+                          for name in ("leaf_disease_model.h5", "student_model.h5", "multi_head_model.h5")))
+    owner = start_owner(
+        lanes,
+        slots=int(os.getenv("SHARED_INFERENCE_SLOTS", "64")),
+        max_batch_size=int(os.getenv("INFERENCE_MAX_BATCH", profile.get("max_batch_size", 16))),
+        max_wait_ms=float(os.getenv("INFERENCE_MAX_WAIT_MS", profile.get("max_wait_ms", 5))),
+        threads=(int(os.getenv("TF_INTRA_OP_THREADS", profile.get("intra_op_threads", 0))),
+                 int(os.getenv("TF_INTER_OP_THREADS", profile.get("inter_op_threads", 0)))),
+    )
+    server.log.info(f"Inference process {owner.process.pid} loading {sorted(lanes)}")
+    if not owner.wait_ready(timeout=300):
+        server.log.warning("Inference process is not ready yet; early requests will wait for it")
+    threading.Thread(target=watch_owner, args=(server, owner), name="inference-owner-watch", daemon=True).start()
+
+
+def on_exit(server):
+    if current_owner() is not None:
+        current_owner().stop()
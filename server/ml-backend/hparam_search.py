@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Hyperband search over the hyperparameters of train_model.py.
+
+Searches the head learning rate, the three dropout rates, how many backbone
+layers to unfreeze for fine-tuning and the fine-tuning learning rate, and
+writes the best configuration to best_hparams.json, which train_model.py
+uses instead of its defaults.
+
+- Frozen backbone computed once: the pooled ResNet50V2 features of the
+  validation set and of --augment-passes augmented passes over the training
+  set are cached as .npy files. Head training (the first phase of
+  train_model.py) then runs on the cached features in every trial, epoch e
+  using augmented pass e % passes, without running the backbone again.
+  Workers memory-map the cache, so the page cache holds a single copy.
+- Hyperband scheduler: brackets of successive halving over head epochs
+  (--max-epochs, --eta). Only the trials that reach a bracket's last rung
+  are fine-tuned (--fine-tune-epochs on images, with their fine_tune_layers
+  unfrozen), since that phase cannot reuse the cached features.
+- Parallel: the trials of a rung run in --workers spawned processes, each
+  limited to its share of the CPU threads. A promoted trial continues from
+  its checkpointed head weights instead of starting over.
+- Persistent and resumable: trials and results are stored in SQLite in
+  --search-dir. Trial configurations come from --seed, so re-running the
+  same command skips finished work and resumes an interrupted search.
+
+Examples:
+    python hparam_search.py --workers 4                  # writes best_hparams.json
+    python hparam_search.py --max-epochs 27 --eta 3 --fine-tune-epochs 3
+    python hparam_search.py --report                     # leaderboard of a stored search
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing as mp
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
+
+from train_model import HPARAMS_PATH
+
+SEARCH_DIR = 'hparam_search'
+FINE_TUNE_LAYER_CHOICES = [0, 10, 20, 30, 50, 80]
+
+
+def sample_config(seed, bracket, index):
+    """Trial configuration, the same for the same (seed, bracket, index) on every run"""
+    rng = np.random.default_rng([seed, bracket, index])
+    return {
+        'learning_rate': round(float(10 ** rng.uniform(-4, -2)), 6),
+        'dropout_rates': [round(float(rng.uniform(0.1, 0.6)), 2) for _ in range(3)],
+        'fine_tune_layers': int(rng.choice(FINE_TUNE_LAYER_CHOICES)),
+        'fine_tune_learning_rate': round(float(10 ** rng.uniform(-5, -3)), 7),
+    }
+
+
+def hyperband_brackets(max_epochs, eta):
+    """(bracket, trials, epochs of the first rung) from the most to the least aggressive"""
+    s_max = int(math.log(max_epochs) / math.log(eta) + 1e-9)
+    return [(s, math.ceil((s_max + 1) / (s + 1) * eta ** s), max_epochs / eta ** s)
+            for s in range(s_max, -1, -1)]
+
+
+def dataset_key(data_dir, passes):
+    """Hash of the image listing, so the feature cache is rebuilt when the data changes"""
+    digest = hashlib.sha256(str(passes).encode())
+    for root, _, files in sorted(os.walk(data_dir)):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            digest.update(f"{os.path.relpath(os.path.join(root, name), data_dir)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+
+def cache_features(data_dir, batch_size, passes, cache_dir):
+    """Pooled backbone features of the training passes and of the validation set"""
+    if os.path.exists(os.path.join(cache_dir, 'meta.json')):
+        return cache_dir
+    import tensorflow as tf
+    from train_model import create_backbone, create_data_generators
+
+    print(f"Caching backbone features ({passes} augmented training passes)...")
+    backbone = tf.keras.Sequential([create_backbone(), tf.keras.layers.GlobalAveragePooling2D()])
+    train_generator, val_generator = create_data_generators(data_dir, batch_size)
+
+    def run(generator):
+        features, labels = [], []
+        for step in range(len(generator)):
+            x, y = generator[step]
+            features.append(np.asarray(backbone(x, training=False), dtype=np.float32))
+            labels.append(y.astype(np.float32))
+        generator.on_epoch_end()
+        return np.concatenate(features), np.concatenate(labels)
+
+    train = [run(train_generator) for _ in range(passes)]
+    val_features, val_labels = run(val_generator)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(os.path.join(cache_dir, 'train_features.npy'), np.stack([f for f, _ in train]))
+    np.save(os.path.join(cache_dir, 'train_labels.npy'), np.stack([l for _, l in train]))
+    np.save(os.path.join(cache_dir, 'val_features.npy'), val_features)
+    np.save(os.path.join(cache_dir, 'val_labels.npy'), val_labels)
+    with open(os.path.join(cache_dir, 'meta.json'), 'w') as f:
+        json.dump({'class_indices': train_generator.class_indices, 'passes': passes}, f)
+    return cache_dir
+
+
+class TrialStore:
+    """SQLite record of a search: its settings, trial configurations and rung results"""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS trials (id TEXT PRIMARY KEY, bracket INTEGER, config TEXT);
+            CREATE TABLE IF NOT EXISTS results (
+                trial_id TEXT, epochs INTEGER, fine_tuned INTEGER, val_accuracy REAL, val_loss REAL,
+                seconds REAL, finished_at TEXT, PRIMARY KEY (trial_id, epochs));
+        """)
+
+    def check_settings(self, settings):
+        """Store settings for a new search; return the differences from a stored one"""
+        stored = dict(self.db.execute("SELECT key, value FROM settings"))
+        if not stored:
+            with self.db:
+                self.db.executemany("INSERT INTO settings VALUES (?, ?)",
+                                    [(k, json.dumps(v)) for k, v in settings.items()])
+            return {}
+        return {k: (json.loads(stored[k]), v) for k, v in settings.items()
+                if k not in stored or json.loads(stored[k]) != v}
+
+    def add_trial(self, trial_id, bracket, config):
+        with self.db:
+            self.db.execute("INSERT OR IGNORE INTO trials VALUES (?, ?, ?)", (trial_id, bracket, json.dumps(config)))
+
+    def result(self, trial_id, epochs):
+        row = self.db.execute("SELECT val_accuracy, val_loss FROM results WHERE trial_id = ? AND epochs = ?",
+                              (trial_id, epochs)).fetchone()
+        return None if row is None else {'val_accuracy': row[0], 'val_loss': row[1]}
+
+    def add_result(self, result):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)", (
+                result['trial_id'], result['epochs'], int(result['fine_tuned']), result['val_accuracy'],
+                result['val_loss'], result['seconds'], datetime.now().isoformat(timespec='seconds')))
+
+    def leaderboard(self, epochs, limit=10):
+        rows = self.db.execute("""
+            SELECT r.trial_id, r.val_accuracy, r.val_loss, r.fine_tuned, t.config FROM results r
+            JOIN trials t ON t.id = r.trial_id WHERE r.epochs = ?
+            ORDER BY r.val_accuracy DESC, r.val_loss ASC, r.trial_id LIMIT ?""", (epochs, limit)).fetchall()
+        return [{'trial_id': r[0], 'val_accuracy': r[1], 'val_loss': r[2], 'fine_tuned': bool(r[3]),
+                 'config': json.loads(r[4])} for r in rows]
+
+    def counts(self):
+        return self.db.execute("SELECT COUNT(DISTINCT trial_id), COUNT(*), COALESCE(SUM(seconds), 0) "
+                               "FROM results").fetchone()
+
+
+_worker = {}
+
+
+def init_worker(cache_dir, args, threads):
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    load = lambda name: np.load(os.path.join(cache_dir, name), mmap_mode='r')
+    _worker.update(
+        args=args,
+        train_features=load('train_features.npy'),
+        train_labels=load('train_labels.npy'),
+        val_features=load('val_features.npy'),
+        val_labels=load('val_labels.npy'),
+    )
+
+
+def run_job(job):
+    """Train one trial's head up to the rung's epochs (and fine-tune it on the last rung)"""
+    import tensorflow as tf
+    from tensorflow.keras.optimizers import Adam
+    from train_model import create_classifier_head
+
+    trial_id, config, epochs, fine_tune = job
+    args = _worker['args']
+    start = time.perf_counter()
+    tf.keras.utils.set_random_seed(args.seed)
+    num_classes = _worker['train_labels'].shape[-1]
+    head = create_classifier_head(num_classes, dropout_rates=config['dropout_rates'])
+    head.build((None, _worker['train_features'].shape[-1]))
+    head.compile(optimizer=Adam(learning_rate=config['learning_rate']),
+                 loss='categorical_crossentropy', metrics=['accuracy'])
+
+    # continue from the epochs trained in the previous rung
+    checkpoint = os.path.join(args.search_dir, 'checkpoints', f'{trial_id}.npz')
+    done = 0
+    if os.path.exists(checkpoint):
+        saved = np.load(checkpoint)
+        if int(saved['epochs']) <= epochs:
+            done = int(saved['epochs'])
+            head.set_weights([saved[f'w{i}'] for i in range(len(head.get_weights()))])
+    passes = _worker['train_features'].shape[0]
+    for epoch in range(done, epochs):
+        head.fit(np.asarray(_worker['train_features'][epoch % passes]),
+                 np.asarray(_worker['train_labels'][epoch % passes]),
+                 batch_size=args.batch_size, epochs=1, shuffle=True, verbose=0)
+    os.makedirs(os.path.dirname(checkpoint), exist_ok=True)
+    np.savez(checkpoint, epochs=epochs, **{f'w{i}': w for i, w in enumerate(head.get_weights())})
+
+    val_loss, val_accuracy = head.evaluate(np.asarray(_worker['val_features']), np.asarray(_worker['val_labels']),
+                                           batch_size=256, verbose=0)
+    fine_tuned = fine_tune and config['fine_tune_layers'] > 0 and args.fine_tune_epochs > 0
+    if fine_tuned:
+        val_loss, val_accuracy = fine_tune_trial(head, config, args)
+    return {'trial_id': trial_id, 'epochs': epochs, 'fine_tuned': fine_tuned, 'val_accuracy': float(val_accuracy),
+            'val_loss': float(val_loss), 'seconds': time.perf_counter() - start}
+
+
+def fine_tune_trial(head, config, args):
+    """Second phase of train_model.py on images, starting from the trained head"""
+    from tensorflow.keras import layers
+    from tensorflow.keras.optimizers import Adam
+    from train_model import create_data_generators, create_model
+
+    train_generator, val_generator = create_data_generators(args.data_dir, args.batch_size)
+    model = create_model(len(train_generator.class_indices), dropout_rates=config['dropout_rates'])
+    dense = [layer for layer in model.layers if isinstance(layer, layers.Dense)]
+    for target, source in zip(dense, [layer for layer in head.layers if isinstance(layer, layers.Dense)]):
+        target.set_weights(source.get_weights())
+
+    base_model = model.layers[0]
+    base_model.trainable = True
+    for layer in base_model.layers[:len(base_model.layers) - config['fine_tune_layers']]:
+        layer.trainable = False
+    model.compile(optimizer=Adam(learning_rate=config['fine_tune_learning_rate']),
+                  loss='categorical_crossentropy', metrics=['accuracy'])
+    model.fit(train_generator, epochs=args.fine_tune_epochs, verbose=0)
+    return model.evaluate(val_generator, verbose=0)
+
+
+def run_bracket(store, pool, bracket, trials, first_epochs, args):
+    """Successive halving: train every trial, keep the best 1/eta for the next rung"""
+    survivors = []
+    for index in range(trials):
+        trial_id = f'b{bracket}-{index:03d}'
+        config = sample_config(args.seed, bracket, index)
+        store.add_trial(trial_id, bracket, config)
+        survivors.append((trial_id, config))
+
+    for rung in range(bracket + 1):
+        epochs = max(1, int(round(first_epochs * args.eta ** rung)))
+        last = rung == bracket
+        jobs = [(trial_id, config, epochs, last) for trial_id, config in survivors
+                if store.result(trial_id, epochs) is None]
+        print(f"Bracket {bracket}, rung {rung}: {len(survivors)} trials x {epochs} epochs"
+              f"{' + fine-tuning' if last and args.fine_tune_epochs else ''}"
+              f" ({len(survivors) - len(jobs)} already done)", flush=True)
+        for result in pool.imap_unordered(run_job, jobs):
+            store.add_result(result)
+            print(f"  {result['trial_id']}: val_accuracy {result['val_accuracy']:.4f} "
+                  f"({result['seconds']:.0f}s)", flush=True)
+
+        if not last:
+            ranked = sorted(survivors, key=lambda trial: (-store.result(trial[0], epochs)['val_accuracy'],
+                                                          store.result(trial[0], epochs)['val_loss'], trial[0]))
+            survivors = ranked[:max(1, len(survivors) // args.eta)]
+
+
+def print_leaderboard(store, max_epochs):
+    rows = store.leaderboard(max_epochs)
+    print(f"\n{'trial':>8} {'val acc':>8} {'lr':>9} {'dropout':>15} {'ft layers':>9} {'ft lr':>9}")
+    for row in rows:
+        config = row['config']
+        print(f"{row['trial_id']:>8} {row['val_accuracy']:>8.4f} {config['learning_rate']:>9.2e} "
+              f"{str(config['dropout_rates']):>15} {config['fine_tune_layers']:>9} "
+              f"{config['fine_tune_learning_rate']:>9.2e}")
+    return rows
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Hyperband search over train_model.py hyperparameters")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--search-dir', default=SEARCH_DIR, help="Trial database, feature cache and checkpoints")
+    parser.add_argument('--workers', type=int, default=max(1, cpus // 2), help="Parallel trial processes")
+    parser.add_argument('--max-epochs', type=int, default=27, help="Head epochs in the last rung")
+    parser.add_argument('--eta', type=int, default=3, help="Keep 1/eta of the trials per rung")
+    parser.add_argument('--fine-tune-epochs', type=int, default=3, help="Fine-tuning epochs of last-rung trials")
+    parser.add_argument('--augment-passes', type=int, default=5, help="Cached augmented passes over the training set")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', action='store_true', help="Only print the results of the stored search")
+    parser.add_argument('--output', default=HPARAMS_PATH)
+    args = parser.parse_args()
+
+    os.makedirs(args.search_dir, exist_ok=True)
+    store = TrialStore(os.path.join(args.search_dir, 'search.db'))
+    if args.report:
+        print_leaderboard(store, args.max_epochs)
+        return
+
+    if not os.path.exists(args.data_dir):
+        print(f"Data directory '{args.data_dir}' not found!")
+        exit(1)
+
+    key = dataset_key(args.data_dir, args.augment_passes)
+    changed = store.check_settings({'dataset': key, 'max_epochs': args.max_epochs, 'eta': args.eta,
+                                    'fine_tune_epochs': args.fine_tune_epochs, 'batch_size': args.batch_size,
+                                    'seed': args.seed})
+    if changed:
+        print(f"'{args.search_dir}' holds a search with different settings: {changed}")
+        print("Re-run with the same settings to resume it, or pass another --search-dir")
+        exit(1)
+
+    # the backbone runs once here; the worker processes only train heads
+    context = mp.get_context('spawn')
+    cache_process = context.Process(target=cache_features, args=(
+        args.data_dir, args.batch_size, args.augment_passes, os.path.join(args.search_dir, f'features_{key}')))
+    cache_process.start()
+    cache_process.join()
+    cache_dir = os.path.join(args.search_dir, f'features_{key}')
+    if not os.path.exists(os.path.join(cache_dir, 'meta.json')):
+        print("Caching backbone features failed")
+        exit(1)
+
+    brackets = hyperband_brackets(args.max_epochs, args.eta)
+    print(f"Hyperband: {sum(n for _, n, _ in brackets)} trials in {len(brackets)} brackets, "
+          f"{args.workers} worker(s)")
+    threads = max(1, cpus // args.workers)
+    with context.Pool(args.workers, initializer=init_worker, initargs=(cache_dir, args, threads)) as pool:
+        for bracket, trials, first_epochs in brackets:
+            run_bracket(store, pool, bracket, trials, first_epochs, args)
+
+    rows = print_leaderboard(store, args.max_epochs)
+    trials, results, seconds = store.counts()
+    print(f"\n{trials} trials, {results} rung results, {seconds / 60:.1f} trial-minutes")
+    best = rows[0]
+    with open(args.output, 'w') as f:
+        json.dump({'hparams': best['config'], 'val_accuracy': best['val_accuracy'], 'trial': best['trial_id'],
+                   'fine_tuned': best['fine_tuned'], 'searched_at': datetime.now().isoformat(timespec='seconds')},
+                  f, indent=2)
+    print(f"Best trial {best['trial_id']} (val accuracy {best['val_accuracy']:.4f}) saved as '{args.output}'; "
+          f"train_model.py uses it")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,14 +5,34 @@ from tensorflow.keras.applications import ResNet50V2
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
 import numpy as np
+import json
 import os
 import matplotlib.pyplot as plt
 from sklearn.metrics import classification_report, confusion_matrix
 import seaborn as sns
 
-def create_model(num_classes=5):
+HPARAMS_PATH = 'best_hparams.json'
+
+# Defaults used unless hparam_search.py has written best_hparams.json
+DEFAULT_HPARAMS = {
+    'learning_rate': 0.001,
+    'dropout_rates': [0.5, 0.3, 0.2],
+    'fine_tune_layers': 30,
+    'fine_tune_learning_rate': 0.0001,
+    'fine_tune_epochs': 20,
+}
+
+def load_hparams(path=HPARAMS_PATH):
+    """DEFAULT_HPARAMS updated with the searched values in path, if it exists"""
+    hparams = dict(DEFAULT_HPARAMS)
+    if os.path.exists(path):
+        with open(path) as f:
+            hparams.update(json.load(f)['hparams'])
+    return hparams
+
+def create_backbone():
     """
-    Create a transfer learning model using ResNet50V2 as base
+    Load the frozen ResNet50V2 feature extractor shared by all classifiers
     """
     # Load pre-trained ResNet50V2 model
     base_model = ResNet50V2(
@@ -24,20 +44,61 @@ def create_model(num_classes=5):
     # Freeze the base model layers
     base_model.trainable = False
     
+    return base_model
+
+def create_classifier_head(num_classes, name=None, dropout_rates=(0.5, 0.3, 0.2)):
+    """
+    Dense classifier applied on top of the pooled backbone features
+    """
+    return models.Sequential([
+        layers.Dropout(dropout_rates[0]),
+        layers.Dense(512, activation='relu'),
+        layers.Dropout(dropout_rates[1]),
+        layers.Dense(256, activation='relu'),
+        layers.Dropout(dropout_rates[2]),
+        layers.Dense(num_classes, activation='softmax')
+    ], name=name)
+
+def create_model(num_classes=5, dropout_rates=(0.5, 0.3, 0.2)):
+    """
+    Create a transfer learning model using ResNet50V2 as base
+    """
+    base_model = create_backbone()
+    
     # Create the model
     model = models.Sequential([
         base_model,
         layers.GlobalAveragePooling2D(),
-        layers.Dropout(0.5),
+        layers.Dropout(dropout_rates[0]),
         layers.Dense(512, activation='relu'),
-        layers.Dropout(0.3),
+        layers.Dropout(dropout_rates[1]),
         layers.Dense(256, activation='relu'),
-        layers.Dropout(0.2),
+        layers.Dropout(dropout_rates[2]),
         layers.Dense(num_classes, activation='softmax')
     ])
     
     return model
 
+def create_multi_head_model(head_classes, base_model=None):
+    """
+    Create a model where one backbone pass feeds several classifier heads.
+
+    head_classes maps a head name to its number of classes, e.g.
+    {'disease': 5, 'soil': 6}. The pooled features layer is named 'features'
+    and each head 'head_<name>' so the serving code can split the model into
+    a backbone and per-head classifiers.
+    """
+    if base_model is None:
+        base_model = create_backbone()
+    
+    inputs = layers.Input(shape=(224, 224, 3))
+    features = layers.GlobalAveragePooling2D(name='features')(base_model(inputs))
+    outputs = {
+        name: create_classifier_head(num_classes, name=f'head_{name}')(features)
+        for name, num_classes in head_classes.items()
+    }
+    return models.Model(inputs, outputs)
+
 def create_data_generators(data_dir, batch_size=32):
     """
     Create data generators for training and validation
@@ -81,19 +142,20 @@ def create_data_generators(data_dir, batch_size=32):
     
     return train_generator, val_generator
 
-def train_model(data_dir, epochs=50, batch_size=32):
+def train_model(data_dir, epochs=50, batch_size=32, hparams=None):
     """
     Train the disease detection model
     """
+    hparams = hparams or DEFAULT_HPARAMS
     print("Creating data generators...")
     train_generator, val_generator = create_data_generators(data_dir, batch_size)
     
     print("Creating model...")
-    model = create_model(num_classes=len(train_generator.class_indices))
+    model = create_model(num_classes=len(train_generator.class_indices), dropout_rates=hparams['dropout_rates'])
     
     # Compile the model
     model.compile(
-        optimizer=Adam(learning_rate=0.001),
+        optimizer=Adam(learning_rate=hparams['learning_rate']),
         loss='categorical_crossentropy',
         metrics=['accuracy']
     )
@@ -119,12 +181,12 @@ def train_model(data_dir, epochs=50, batch_size=32):
     base_model = model.layers[0]
     base_model.trainable = True
     
-    # Freeze all layers except the last 30
-    for layer in base_model.layers[:-30]:
+    # Freeze all layers except the last fine_tune_layers (30 by default)
+    for layer in base_model.layers[:len(base_model.layers) - hparams['fine_tune_layers']]:
         layer.trainable = False
     
     model.compile(
-        optimizer=Adam(learning_rate=0.0001),
+        optimizer=Adam(learning_rate=hparams['fine_tune_learning_rate']),
         loss='categorical_crossentropy',
         metrics=['accuracy']
     )
@@ -132,7 +194,7 @@ def train_model(data_dir, epochs=50, batch_size=32):
     # Continue training
     history_fine = model.fit(
         train_generator,
-        epochs=20,
+        epochs=hparams['fine_tune_epochs'],
         validation_data=val_generator,
         callbacks=callbacks,
         verbose=1
@@ -236,7 +298,10 @@ if __name__ == "__main__":
         exit(1)
     
     print("Starting model training...")
-    model, history, history_fine, train_generator, val_generator = train_model(data_dir)
+    hparams = load_hparams()
+    if os.path.exists(HPARAMS_PATH):
+        print(f"Using hyperparameters from '{HPARAMS_PATH}': {hparams}")
+    model, history, history_fine, train_generator, val_generator = train_model(data_dir, hparams=hparams)
     
     print("Evaluating model...")
     accuracy = evaluate_model(model, val_generator)
@@ -0,0 +1,109 @@
+import tensorflow as tf
+from tensorflow.keras import models
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+import json
+import os
+from train_model import create_multi_head_model, create_data_generators
+
+# Class names of the existing leaf_disease_model.h5, in the order app.py reports them
+DISEASE_CLASS_NAMES = ["Apple Scab", "Apple Rust", "Corn Blight", "Healthy", "Tomato Bacterial Spot"]
+
+def build_from_disease_model(disease_model_path, soil_classes):
+    """
+    Reuse the backbone and classifier of a trained single-head disease model
+    and attach a new, untrained soil head
+    """
+    disease_model = tf.keras.models.load_model(disease_model_path)
+    base_model = disease_model.layers[0]
+    base_model.trainable = False
+
+    model = create_multi_head_model(
+        {'disease': disease_model.output_shape[-1], 'soil': soil_classes},
+        base_model=base_model
+    )
+    # layers[2:] are the Dropout/Dense stack after GlobalAveragePooling2D
+    model.get_layer('head_disease').set_weights(
+        [w for layer in disease_model.layers[2:] for w in layer.get_weights()]
+    )
+    return model
+
+def train_head(model, head_name, data_dir, epochs=20, batch_size=32):
+    """
+    Train one head on data_dir/<class>/ images with the backbone and all
+    other heads frozen
+    """
+    train_generator, val_generator = create_data_generators(data_dir, batch_size)
+
+    for layer in model.layers:
+        layer.trainable = layer.name == f'head_{head_name}'
+    head_model = models.Model(model.inputs, model.get_layer(f'head_{head_name}').output)
+
+    head_model.compile(
+        optimizer=Adam(learning_rate=0.001),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    callbacks = [
+        EarlyStopping(patience=5, restore_best_weights=True),
+        ReduceLROnPlateau(factor=0.2, patience=3, min_lr=1e-7)
+    ]
+    history = head_model.fit(
+        train_generator,
+        epochs=epochs,
+        validation_data=val_generator,
+        callbacks=callbacks,
+        verbose=1
+    )
+    class_names = sorted(train_generator.class_indices, key=train_generator.class_indices.get)
+    return history, class_names
+
+def save_multi_head_model(model, class_names, path='multi_head_model.h5'):
+    """
+    Save the model and a sidecar JSON with the class names of every head
+    """
+    model.save(path)
+    with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+        json.dump(class_names, f, indent=2)
+
+if __name__ == "__main__":
+    # Builds a model that answers both /api/detect-disease and /api/detect-soil
+    # from a single ResNet50V2 pass. Expects:
+    #   leaf_disease_model.h5  (from train_model.py) or data/<disease>/
+    #   soil_data/<Soil Type>/
+    disease_model_path = "leaf_disease_model.h5"
+    disease_data_dir = "data"
+    soil_data_dir = "soil_data"
+
+    if not os.path.exists(soil_data_dir):
+        print(f"Soil data directory '{soil_data_dir}' not found!")
+        print("Create one folder per soil type, e.g. soil_data/Loamy/, soil_data/Clay/")
+        exit(1)
+
+    soil_classes = len([
+        d for d in os.listdir(soil_data_dir) if os.path.isdir(os.path.join(soil_data_dir, d))
+    ])
+    class_names = {}
+
+    if os.path.exists(disease_model_path):
+        print(f"Reusing backbone and disease head from {disease_model_path}...")
+        model = build_from_disease_model(disease_model_path, soil_classes)
+        class_names['disease'] = DISEASE_CLASS_NAMES
+    elif os.path.exists(disease_data_dir):
+        disease_classes = len([
+            d for d in os.listdir(disease_data_dir) if os.path.isdir(os.path.join(disease_data_dir, d))
+        ])
+        model = create_multi_head_model({'disease': disease_classes, 'soil': soil_classes})
+        print("Training disease head...")
+        _, class_names['disease'] = train_head(model, 'disease', disease_data_dir)
+    else:
+        print(f"Neither '{disease_model_path}' nor '{disease_data_dir}/' found!")
+        print("Train the disease model first with: python train_model.py")
+        exit(1)
+
+    print("Training soil head...")
+    _, class_names['soil'] = train_head(model, 'soil', soil_data_dir)
+
+    save_multi_head_model(model, class_names)
+    print("\nTraining completed! Model saved as 'multi_head_model.h5'")
+    print("Restart app.py to serve both endpoints from the shared backbone")
@@ -0,0 +1,176 @@
+import numpy as np
+import os
+import sys
+import time
+import matplotlib.pyplot as plt
+from PIL import Image
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+import seaborn as sns
+
+# The feature extractor and classifier are shared with the serving code
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference.soil import SoilClassifier, extract_features, preprocess
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+
+
+def load_dataset(data_dir):
+    """
+    Load soil images from data_dir/<soil type>/ into preprocessed arrays
+    """
+    class_names = sorted(
+        d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))
+    )
+    images, labels = [], []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(data_dir, class_name)
+        for img_file in sorted(os.listdir(class_dir)):
+            if not img_file.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            try:
+                with Image.open(os.path.join(class_dir, img_file)) as img:
+                    images.append(preprocess(img))
+                labels.append(label)
+            except Exception as e:
+                print(f"Skipping {img_file}: {e}")
+    return np.stack(images), np.array(labels), class_names
+
+
+def augment(images):
+    """
+    Flip and rotate copies of the training images; colour and texture
+    statistics of soil are orientation independent
+    """
+    return np.concatenate([
+        images,
+        images[:, :, ::-1],
+        images[:, ::-1, :],
+        np.rot90(images, k=1, axes=(1, 2)),
+    ])
+
+
+def train_model(data_dir, test_size=0.2, C=1.0):
+    """
+    Train the soil classifier on colour/texture features
+    """
+    print("Loading images...")
+    images, labels, class_names = load_dataset(data_dir)
+    print(f"Loaded {len(images)} images in {len(class_names)} classes")
+
+    train_images, val_images, train_labels, val_labels = train_test_split(
+        images, labels, test_size=test_size, stratify=labels, random_state=42
+    )
+
+    print("Extracting features...")
+    train_features = extract_features(augment(train_images))
+    train_labels = np.tile(train_labels, 4)
+
+    scaler = StandardScaler().fit(train_features)
+
+    print("Training classifier...")
+    clf = LogisticRegression(C=C, max_iter=2000)
+    clf.fit(scaler.transform(train_features), train_labels)
+
+    weights, bias = clf.coef_, clf.intercept_
+    if len(class_names) == 2:
+        # binary logistic regression -> equivalent two-class softmax
+        weights = np.vstack([np.zeros_like(weights), weights])
+        bias = np.concatenate([[0.0], bias])
+
+    classifier = SoilClassifier(weights, bias, scaler.mean_, scaler.scale_, class_names)
+    classifier.save('soil_model.npz')
+
+    return classifier, val_images, val_labels
+
+
+def evaluate_model(classifier, val_images, val_labels):
+    """
+    Evaluate the trained soil classifier
+    """
+    print("Evaluating model...")
+    predictions = classifier.predict(val_images)
+    predicted_classes = np.argmax(predictions, axis=1)
+
+    accuracy = np.mean(predicted_classes == val_labels)
+    print(f"Model Accuracy: {accuracy:.4f} ({accuracy*100:.2f}%)")
+
+    labels = list(range(len(classifier.classes)))
+    print("\nClassification Report:")
+    print(classification_report(val_labels, predicted_classes, labels=labels,
+                                target_names=classifier.classes, zero_division=0))
+
+    cm = confusion_matrix(val_labels, predicted_classes, labels=labels)
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Oranges',
+                xticklabels=classifier.classes, yticklabels=classifier.classes)
+    plt.title('Soil Confusion Matrix')
+    plt.ylabel('True Label')
+    plt.xlabel('Predicted Label')
+    plt.tight_layout()
+    plt.savefig('soil_confusion_matrix.png')
+
+    return accuracy
+
+
+def benchmark_latency(classifier, images, runs=200):
+    """
+    Measure single-image and batched CPU latency including feature extraction
+    """
+    single = []
+    for i in range(runs):
+        start = time.perf_counter()
+        classifier.predict(images[i % len(images)][None])
+        single.append((time.perf_counter() - start) * 1000)
+    batch = images[:32]
+    start = time.perf_counter()
+    classifier.predict(batch)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    single.sort()
+    p50 = single[len(single) // 2]
+    p99 = single[int(len(single) * 0.99) - 1]
+    print(f"Single image latency: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    print(f"Batch of {len(batch)}: {batch_ms:.2f} ms ({batch_ms / len(batch):.2f} ms/image)")
+    return p50, p99
+
+
+if __name__ == "__main__":
+    # Data directory structure should be one folder per soil type, named
+    # exactly as the API should report it:
+    # soil_data/
+    #   Clay/
+    #   Loamy/
+    #   Sandy/
+    #   ...
+
+    data_dir = "soil_data"  # Change this to your data directory
+
+    if not os.path.exists(data_dir):
+        print(f"Data directory '{data_dir}' not found!")
+        print("Please create one folder per soil type, e.g.:")
+        print("soil_data/")
+        print("  Clay/")
+        print("  Loamy/")
+        print("  Sandy/")
+        print("  Silty/")
+        print("  Peaty/")
+        print("  Chalky/")
+        exit(1)
+
+    print("Starting soil model training...")
+    classifier, val_images, val_labels = train_model(data_dir)
+
+    accuracy = evaluate_model(classifier, val_images, val_labels)
+
+    print("\nBenchmarking latency...")
+    p50, p99 = benchmark_latency(classifier, val_images)
+
+    print(f"\nTraining completed! Model saved as 'soil_model.npz'")
+    print(f"Final accuracy: {accuracy*100:.2f}%")
+    if p99 < 50:
+        print("✅ Latency is within the 50 ms per image target")
+    else:
+        print("⚠️ Latency is above the 50 ms per image target")
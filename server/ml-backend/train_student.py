@@ -0,0 +1,192 @@
+import tensorflow as tf
+from tensorflow.keras import layers, models
+from tensorflow.keras.applications import MobileNetV2
+from tensorflow.keras.optimizers import Adam
+import numpy as np
+import json
+import os
+import sys
+import time
+from train_model import create_data_generators
+
+# Serving-side cascade logic, shared so the report matches production
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference.cascade import cascade_batch
+
+TEACHER_MODEL_PATH = 'leaf_disease_model.h5'
+STUDENT_MODEL_PATH = 'student_model.h5'
+REPORT_PATH = 'cascade_report.json'
+
+def create_student_model(num_classes=5, alpha=0.35, weights='imagenet'):
+    """
+    Create a small MobileNetV2 classifier taking the same [0, 1] 224x224
+    input as the ResNet50V2 model. The final Dense layer ('logits') is
+    separate from the softmax so distillation can soften the logits.
+    """
+    base_model = MobileNetV2(
+        weights=weights,
+        include_top=False,
+        input_shape=(224, 224, 3),
+        alpha=alpha
+    )
+
+    inputs = layers.Input(shape=(224, 224, 3))
+    # MobileNetV2 expects [-1, 1]
+    x = layers.Rescaling(2.0, offset=-1.0)(inputs)
+    x = base_model(x)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.Dropout(0.2)(x)
+    logits = layers.Dense(num_classes, name='logits')(x)
+    outputs = layers.Softmax()(logits)
+    return models.Model(inputs, outputs)
+
+def distill(teacher, student, train_generator, val_generator, epochs=15,
+            temperature=4.0, alpha=0.3, learning_rate=0.001):
+    """
+    Train student to match teacher's softened outputs.
+
+    The loss is alpha * cross-entropy on the true labels plus
+    (1 - alpha) * T^2 * KL(teacher_T || student_T), where _T are the
+    distributions softened by temperature T.
+    """
+    logits_model = models.Model(student.inputs, student.get_layer('logits').output)
+    optimizer = Adam(learning_rate=learning_rate)
+    hard_loss = tf.keras.losses.CategoricalCrossentropy(from_logits=True)
+    kl = tf.keras.losses.KLDivergence()
+
+    @tf.function
+    def train_step(x, y, teacher_probs):
+        # softmax(log p / T) == softmax(logits / T) for the teacher's softmax output
+        soft_targets = tf.nn.softmax(tf.math.log(teacher_probs + 1e-8) / temperature)
+        with tf.GradientTape() as tape:
+            logits = logits_model(x, training=True)
+            loss = (alpha * hard_loss(y, logits)
+                    + (1 - alpha) * temperature ** 2 * kl(soft_targets, tf.nn.softmax(logits / temperature)))
+        grads = tape.gradient(loss, logits_model.trainable_variables)
+        optimizer.apply_gradients(zip(grads, logits_model.trainable_variables))
+        return loss
+
+    best_accuracy, best_weights = -1.0, None
+    for epoch in range(epochs):
+        losses = []
+        for step in range(len(train_generator)):
+            x, y = train_generator[step]
+            teacher_probs = teacher(x, training=False)
+            losses.append(float(train_step(x, y, teacher_probs)))
+        train_generator.on_epoch_end()
+
+        accuracy = evaluate_accuracy(student, val_generator)
+        print(f"Epoch {epoch + 1}/{epochs} - loss: {np.mean(losses):.4f} - val_accuracy: {accuracy:.4f}")
+        if accuracy > best_accuracy:
+            best_accuracy, best_weights = accuracy, student.get_weights()
+
+    student.set_weights(best_weights)
+    return student, best_accuracy
+
+def evaluate_accuracy(model, generator):
+    correct = total = 0
+    for step in range(len(generator)):
+        x, y = generator[step]
+        predictions = np.asarray(model(x, training=False))
+        correct += int(np.sum(np.argmax(predictions, axis=1) == np.argmax(y, axis=1)))
+        total += len(y)
+    return correct / max(total, 1)
+
+def cascade_report(teacher, student, val_generator, thresholds=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99),
+                   max_accuracy_drop=0.005):
+    """
+    Compare the teacher alone with the cascade at each threshold on the
+    validation set, one image at a time as served, and pick the lowest
+    threshold whose accuracy is within max_accuracy_drop of the teacher
+    """
+    images, labels = [], []
+    for step in range(len(val_generator)):
+        x, y = val_generator[step]
+        images.append(x)
+        labels.append(np.argmax(y, axis=1))
+    images, labels = np.concatenate(images), np.concatenate(labels)
+
+    def timed(model, batch):
+        start = time.perf_counter()
+        output = np.asarray(model(batch, training=False))
+        return output, time.perf_counter() - start
+
+    # Warm up both graphs before timing
+    timed(teacher, images[:1])
+    timed(student, images[:1])
+
+    teacher_probs, student_probs = [], []
+    teacher_seconds = student_seconds = 0.0
+    for image in images:
+        probs, seconds = timed(teacher, image[None])
+        teacher_probs.append(probs[0])
+        teacher_seconds += seconds
+        probs, seconds = timed(student, image[None])
+        student_probs.append(probs[0])
+        student_seconds += seconds
+    teacher_probs, student_probs = np.stack(teacher_probs), np.stack(student_probs)
+    teacher_ms = 1000 * teacher_seconds / len(images)
+    student_ms = 1000 * student_seconds / len(images)
+    teacher_accuracy = float(np.mean(np.argmax(teacher_probs, axis=1) == labels))
+
+    rows = []
+    for threshold in thresholds:
+        # Replay the cascade on the recorded outputs
+        probs, escalated = cascade_batch(
+            lambda batch: student_probs[batch], lambda batch: teacher_probs[batch],
+            np.arange(len(images)), threshold
+        )
+        escalation_rate = float(np.mean(escalated))
+        rows.append({
+            'threshold': threshold,
+            'accuracy': float(np.mean(np.argmax(probs, axis=1) == labels)),
+            'escalation_rate': escalation_rate,
+            'avg_latency_ms': student_ms + escalation_rate * teacher_ms,
+        })
+
+    acceptable = [r for r in rows if r['accuracy'] >= teacher_accuracy - max_accuracy_drop]
+    chosen = min(acceptable, key=lambda r: r['threshold']) if acceptable else rows[-1]
+
+    print(f"\nBaseline (ResNet50V2 only): accuracy {teacher_accuracy:.4f}, {teacher_ms:.1f} ms/image")
+    print(f"Student only:              accuracy {np.mean(np.argmax(student_probs, axis=1) == labels):.4f}, "
+          f"{student_ms:.1f} ms/image")
+    print(f"{'threshold':>10} {'accuracy':>9} {'escalated':>10} {'avg ms':>8}")
+    for r in rows:
+        marker = '  <- chosen' if r is chosen else ''
+        print(f"{r['threshold']:>10.2f} {r['accuracy']:>9.4f} {r['escalation_rate']:>10.1%} "
+              f"{r['avg_latency_ms']:>8.1f}{marker}")
+
+    return {
+        'threshold': chosen['threshold'],
+        'validation_images': int(len(images)),
+        'teacher': {'accuracy': teacher_accuracy, 'avg_latency_ms': teacher_ms},
+        'student': {'accuracy': float(np.mean(np.argmax(student_probs, axis=1) == labels)),
+                    'avg_latency_ms': student_ms},
+        'cascade': rows,
+    }
+
+if __name__ == "__main__":
+    # Needs the trained ResNet50V2 model and the same data/ directory
+    # train_model.py was trained on
+    data_dir = "data"
+
+    if not os.path.exists(TEACHER_MODEL_PATH) or not os.path.exists(data_dir):
+        print(f"Need '{TEACHER_MODEL_PATH}' and '{data_dir}/'. Train the large model first with:")
+        print("  python train_model.py")
+        exit(1)
+
+    print("Loading teacher model...")
+    teacher = tf.keras.models.load_model(TEACHER_MODEL_PATH)
+    train_generator, val_generator = create_data_generators(data_dir)
+
+    print("Distilling student model...")
+    student = create_student_model(num_classes=len(train_generator.class_indices))
+    student, accuracy = distill(teacher, student, train_generator, val_generator)
+    student.save(STUDENT_MODEL_PATH)
+    print(f"Student model saved as '{STUDENT_MODEL_PATH}' (val accuracy {accuracy*100:.2f}%)")
+
+    print("Measuring cascade latency and accuracy...")
+    report = cascade_report(teacher, student, val_generator)
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved as '{REPORT_PATH}'; app.py will escalate below confidence {report['threshold']}")
@@ -0,0 +1,42 @@
+from pymongo import ASCENDING, DESCENDING
+
+class Prediction:
+    def __init__(self, db):
+        self.collection = db["predictions"]
+
+    def ensure_indexes(self):
+        # history page: one user's newest predictions first
+        self.collection.create_index([("username", ASCENDING), ("created_at", DESCENDING)])
+        # retention and export scan by time
+        self.collection.create_index([("created_at", ASCENDING)])
+        self.collection.create_index([("image_hash", ASCENDING)])
+
+    def insert_many(self, records):
+        return self.collection.insert_many(records, ordered=False)
+
+    def history(self, username, limit=20, before=None):
+        query = {"username": username}
+        if before is not None:
+            query["created_at"] = {"$lt": before}
+        return list(self.collection.find(query, {"_id": 0})
+                    .sort("created_at", DESCENDING).limit(limit))
+
+    def owns_image(self, username, image_hash):
+        return self.collection.find_one({"username": username, "image_hash": image_hash}, {"_id": 1}) is not None
+
+    def image_hashes(self):
+        """Every image hash still referenced by a prediction"""
+        cursor = self.collection.find({}, {"image_hash": 1, "_id": 0})
+        return {record["image_hash"] for record in cursor if "image_hash" in record}
+
+    def delete_older_than(self, cutoff):
+        return self.collection.delete_many({"created_at": {"$lt": cutoff}}).deleted_count
+
+    def for_export(self, since=None, min_confidence=0.0):
+        """Predictions to label training images with, oldest first"""
+        query = {"confidence": {"$gte": min_confidence}}
+        if since is not None:
+            query["created_at"] = {"$gte": since}
+        projection = {"_id": 0, "image_hash": 1, "disease": 1, "confidence": 1,
+                      "model_version": 1, "created_at": 1}
+        return self.collection.find(query, projection).sort("created_at", ASCENDING)
@@ -0,0 +1,51 @@
+from pymongo import ASCENDING, UpdateOne
+
+# Per-user document holding all-time counts and the rollup version
+ALL_TIME = "all"
+
+def _field(name):
+    # disease names become keys of the diseases sub-document
+    return str(name).replace(".", "_").replace("$", "_")
+
+class PredictionStats:
+    def __init__(self, db):
+        self.collection = db["prediction_daily"]
+
+    def ensure_indexes(self):
+        self.collection.create_index([("username", ASCENDING), ("day", ASCENDING)], unique=True)
+
+    def apply(self, increments):
+        """
+        Add increments, a dict of (username, day) -> {"total", "confidence_sum",
+        "diseases": {name: count}}, to the daily documents and each user's
+        all-time document, whose version changes with every update
+        """
+        users = {}
+        operations = []
+        for (username, day), counts in increments.items():
+            totals = users.setdefault(username, {"total": 0, "confidence_sum": 0.0, "diseases": {}})
+            totals["total"] += counts["total"]
+            totals["confidence_sum"] += counts["confidence_sum"]
+            for name, n in counts["diseases"].items():
+                totals["diseases"][name] = totals["diseases"].get(name, 0) + n
+            operations.append(self._increment(username, day, counts))
+        for username, totals in users.items():
+            operations.append(self._increment(username, ALL_TIME, totals, version=True))
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def _increment(self, username, day, counts, version=False):
+        inc = {"total": counts["total"], "confidence_sum": counts["confidence_sum"]}
+        for name, n in counts["diseases"].items():
+            inc["diseases." + _field(name)] = n
+        if version:
+            inc["version"] = 1
+        return UpdateOne({"username": username, "day": day}, {"$inc": inc}, upsert=True)
+
+    def all_time(self, username):
+        return self.collection.find_one({"username": username, "day": ALL_TIME}, {"_id": 0})
+
+    def days(self, username, first_day, last_day):
+        """Daily documents between two ISO dates (inclusive); days without predictions are absent"""
+        return list(self.collection.find(
+            {"username": username, "day": {"$gte": first_day, "$lte": last_day}}, {"_id": 0}))
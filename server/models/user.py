@@ -1,18 +1,59 @@
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class User:
     def __init__(self, db):
         self.collection = db["users"]
+        self._indexes_ready = False
+
+    def ensure_indexes(self):
+        """
+        Create the unique username index once; False if it cannot be created.
+        The index is what makes registration atomic: two concurrent inserts of
+        one username cannot both succeed
+        """
+        if not self._indexes_ready:
+            try:
+                self.collection.create_index([("username", ASCENDING)], unique=True)
+                self._indexes_ready = True
+            except OperationFailure as e:
+                print(f"Cannot create the unique username index (duplicate users already stored?): {e}")
+        return self._indexes_ready
 
     def create_user(self, username, password):
+        """
+        Insert a new user in one round trip; False if the username is taken.
+        Raises RuntimeError while the unique username index is missing
+        """
+        if not self.ensure_indexes():
+            raise RuntimeError("Unique username index missing; registration is disabled")
         hashed = generate_password_hash(password)
-        return self.collection.insert_one({
-            "username": username,
-            "password": hashed
-        })
+        try:
+            self.collection.insert_one({
+                "username": username,
+                "password": hashed,
+                "token_version": 0
+            })
+        except DuplicateKeyError:
+            return False
+        return True
 
     def find_by_username(self, username):
         return self.collection.find_one({"username": username})
 
+    def find_credentials(self, username):
+        """Only the fields login needs: password hash and refresh token version"""
+        return self.collection.find_one({"username": username}, {"_id": 0, "password": 1, "token_version": 1})
+
+    def token_version(self, username):
+        """Current refresh token version, or None if the user does not exist"""
+        user = self.collection.find_one({"username": username}, {"_id": 0, "token_version": 1})
+        return None if user is None else user.get("token_version", 0)
+
+    def revoke_refresh_tokens(self, username):
+        """Invalidate every refresh token issued to the user so far"""
+        return self.collection.update_one({"username": username}, {"$inc": {"token_version": 1}}).modified_count > 0
+
     def verify_password(self, stored_password, provided_password):
         return check_password_hash(stored_password, provided_password)
@@ -0,0 +1,61 @@
+from flask import Blueprint, request, jsonify, send_file
+from PIL import Image
+from utils.active_learning import ActiveLearningQueue
+from utils.blob_store import image_format
+from utils.admin import require_admin
+from config import (ACTIVE_LEARNING_ENABLED, ACTIVE_LEARNING_PATH, ACTIVE_LEARNING_CAPACITY,
+                    ACTIVE_LEARNING_STRATEGY, ACTIVE_LEARNING_MIN_SCORE)
+
+active_learning = None
+if ACTIVE_LEARNING_ENABLED:
+    try:
+        active_learning = ActiveLearningQueue(ACTIVE_LEARNING_PATH, capacity=ACTIVE_LEARNING_CAPACITY,
+                                              strategy=ACTIVE_LEARNING_STRATEGY, min_score=ACTIVE_LEARNING_MIN_SCORE)
+    except Exception as e:
+        print(f"Active learning queue unavailable: {e}")
+
+active_learning_bp = Blueprint("active_learning", __name__)
+
+@active_learning_bp.route("/admin/active-learning", methods=["GET"])
+def labeling_queue():
+    """Unlabeled uncertain predictions, most informative first"""
+    require_admin()
+    if active_learning is None:
+        return jsonify({"error": "Active learning is disabled"}), 503
+    limit = min(request.args.get("limit", 50, type=int), 500)
+    items = active_learning.pending(limit)
+    for item in items:
+        item["image_url"] = f"/admin/active-learning/{item['id']}/image"
+    return jsonify({"stats": active_learning.stats(), "items": items})
+
+@active_learning_bp.route("/admin/active-learning/<item_id>/image", methods=["GET"])
+def labeling_image(item_id):
+    require_admin()
+    if active_learning is None or active_learning.get(item_id) is None:
+        return jsonify({"error": "Item not found"}), 404
+    path = active_learning.blobs.path(item_id)
+    fmt = image_format(path)
+    if fmt is None:
+        return jsonify({"error": "Item not found"}), 404
+    return send_file(path, mimetype=Image.MIME.get(fmt, "application/octet-stream"))
+
+@active_learning_bp.route("/admin/active-learning/<item_id>/label", methods=["POST"])
+def label_item(item_id):
+    """{"label": "<class>"} labels the image with one of the model's classes; {"label": null} discards it"""
+    require_admin()
+    if active_learning is None:
+        return jsonify({"error": "Active learning is disabled"}), 503
+    data = request.get_json(silent=True) or {}
+    if "label" not in data:
+        return jsonify({"error": "label is required (null discards the image)"}), 400
+    label = data["label"]
+    if label is not None and (not isinstance(label, str) or not label.strip()):
+        return jsonify({"error": "label must be a class name or null"}), 400
+    try:
+        found = active_learning.label(item_id, label.strip() if label else None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not found:
+        return jsonify({"error": "Item not found"}), 404
+    item = active_learning.get(item_id)
+    return jsonify({"id": item_id, "label": item["label"] if item else None})
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from models.user import User
-from utils.auth_utils import generate_token
+from utils.auth_utils import generate_token, generate_refresh_token, decode_refresh_token
 from pymongo import MongoClient
 from config import MONGO_URI, DB_NAME
 
@@ -10,38 +10,72 @@ user_model = User(db)
 
 auth_bp = Blueprint("auth", __name__)
 
+ACCESS_TOKEN_SECONDS = 3600  # lifetime of generate_token's tokens
+
 @auth_bp.route("/api/register", methods=["POST"])
 def register():
-    data = request.json
+    data = request.get_json(silent=True) or {}
     username = data.get("username")
     password = data.get("password")
 
-    if user_model.find_by_username(username):
-        return jsonify({"error": "User already exists"}), 409
+    if not username or not password:
+        return jsonify({"error": "Username and password required"}), 400
 
-    user_model.create_user(username, password)
+    # One insert against the unique username index; no lookup first
+    try:
+        created = user_model.create_user(username, password)
+    except RuntimeError as e:
+        print("Register error:", e)
+        return jsonify({"error": "Registration unavailable"}), 503
+    if not created:
+        return jsonify({"error": "User already exists"}), 409
     return jsonify({"message": "User registered successfully"}), 201
 
 @auth_bp.route("/api/login", methods=["POST"])
 def login():
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
         username = data.get("username")
         password = data.get("password")
 
         if not username or not password:
             return jsonify({"error": "Username and password required"}), 400
 
-        user = user_model.find_by_username(username)
+        user = user_model.find_credentials(username)
         if not user or not user_model.verify_password(user['password'], password):
             return jsonify({"error": "Invalid credentials"}), 401
 
-        token = generate_token(username)
-        return jsonify({"token": token})
+        return jsonify({
+            "token": generate_token(username),
+            "refresh_token": generate_refresh_token(username, user.get("token_version", 0)),
+            "expires_in": ACCESS_TOKEN_SECONDS
+        })
     except Exception as e:
         print("Login error:", e)
-        response = jsonify({"error": "Internal server error"})
-        response.status_code = 500
-        response.headers.add("Access-Control-Allow-Origin", "http://localhost:5173")
-        response.headers.add("Access-Control-Allow-Credentials", "true")
-        return response
+        return jsonify({"error": "Internal server error"}), 500
+
+@auth_bp.route("/api/token/refresh", methods=["POST"])
+def refresh_token():
+    """New access token for a refresh token from /api/login, without the password"""
+    data = request.get_json(silent=True) or {}
+    payload = decode_refresh_token(data.get("refresh_token") or "")
+    if not payload:
+        return jsonify({"error": "Invalid or expired refresh token"}), 401
+
+    username = payload["username"]
+    if user_model.token_version(username) != payload.get("ver"):
+        return jsonify({"error": "Refresh token revoked"}), 401
+    return jsonify({"token": generate_token(username), "expires_in": ACCESS_TOKEN_SECONDS})
+
+@auth_bp.route("/api/logout", methods=["POST"])
+def logout():
+    """Revoke every refresh token of the user the given refresh token belongs to"""
+    data = request.get_json(silent=True) or {}
+    payload = decode_refresh_token(data.get("refresh_token") or "")
+    if not payload:
+        return jsonify({"error": "Invalid or expired refresh token"}), 401
+
+    # Already revoked tokens cannot log the user out of newer sessions
+    if user_model.token_version(payload["username"]) == payload.get("ver"):
+        user_model.revoke_refresh_tokens(payload["username"])
+    return jsonify({"message": "Logged out"})
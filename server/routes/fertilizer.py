@@ -0,0 +1,68 @@
+from flask import Blueprint, request, jsonify
+from utils.fertilizer import FertilizerTables
+from utils.responses import cached_json, ndjson_response, wants_ndjson
+from config import FERTILIZER_RULES_PATH
+
+try:
+    fertilizer = FertilizerTables.load(FERTILIZER_RULES_PATH)
+except Exception as e:
+    print(f"Error loading fertilizer rules: {e}")
+    fertilizer = None
+
+fertilizer_bp = Blueprint("fertilizer", __name__)
+
+MAX_PLOTS = 10000
+MEASUREMENTS = ("n", "p2o5", "k2o", "ph", "area_ha")
+
+def _number(value):
+    return None if value in (None, "") else float(value)
+
+@fertilizer_bp.route("/api/fertilizer/options", methods=["GET"])
+def fertilizer_options():
+    if fertilizer is None:
+        return jsonify({"error": "Fertilizer rules not loaded"}), 503
+    return cached_json({"soil_types": fertilizer.soils, "crops": fertilizer.crops})
+
+@fertilizer_bp.route("/api/fertilizer/recommend", methods=["GET", "POST"])
+def recommend_fertilizer():
+    """
+    Doses for one plot: soil_type and crop, optional n/p2o5/k2o (kg/ha), ph
+    and area_ha, as a JSON body or (cacheable) GET query parameters
+    """
+    if fertilizer is None:
+        return jsonify({"error": "Fertilizer rules not loaded"}), 503
+    if request.method == "GET":
+        data = request.args
+    else:
+        data = request.get_json(force=True, silent=True) or {}
+    if not data.get("soil_type") or not data.get("crop"):
+        return jsonify({"error": "soil_type and crop required"}), 400
+    try:
+        values = {k: _number(data.get(k)) for k in MEASUREMENTS}
+        # the same rules and inputs always give the same doses
+        return cached_json(fertilizer.recommend(data["soil_type"], data["crop"], **values))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@fertilizer_bp.route("/api/fertilizer/bulk", methods=["POST"])
+def recommend_fertilizer_bulk():
+    """
+    Doses for many plots at once: {"plots": [{soil_type, crop, ...}, ...]}; unknown pairs give null.
+    With ?format=ndjson or Accept: application/x-ndjson, one result per line, streamed
+    """
+    if fertilizer is None:
+        return jsonify({"error": "Fertilizer rules not loaded"}), 503
+    plots = (request.get_json(force=True, silent=True) or {}).get("plots")
+    if not isinstance(plots, list):
+        return jsonify({"error": "plots must be a list"}), 400
+    if len(plots) > MAX_PLOTS:
+        return jsonify({"error": f"At most {MAX_PLOTS} plots per request"}), 400
+    try:
+        columns = {k: [_number(plot.get(k)) for plot in plots] for k in MEASUREMENTS}
+        batch = fertilizer.recommend_many([plot.get("soil_type") or "" for plot in plots],
+                                          [plot.get("crop") or "" for plot in plots], **columns)
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({"error": "Each plot needs soil_type, crop and numeric measurements"}), 400
+    if wants_ndjson():
+        return ndjson_response(fertilizer.iter_rows(batch))
+    return jsonify({"results": fertilizer.rows(batch)})
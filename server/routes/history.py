@@ -0,0 +1,83 @@
+from flask import Blueprint, request, jsonify, send_file
+from datetime import datetime
+from pymongo import MongoClient
+from models.prediction import Prediction
+from models.prediction_stats import PredictionStats
+from utils.auth_utils import decode_token
+from utils.blob_store import BlobStore
+from utils.history import PredictionHistory
+from utils.responses import ndjson_response, wants_ndjson
+from config import MONGO_URI, DB_NAME, HISTORY_ENABLED, BLOB_STORE_PATH, HISTORY_MAX_PENDING_MB
+
+history = None
+if HISTORY_ENABLED and MONGO_URI:
+    try:
+        client = MongoClient(MONGO_URI)
+        db = client[DB_NAME]
+        history = PredictionHistory(Prediction(db), BlobStore(BLOB_STORE_PATH), PredictionStats(db),
+                                    max_pending_bytes=HISTORY_MAX_PENDING_MB * 1024 * 1024)
+    except Exception as e:
+        print(f"Prediction history unavailable: {e}")
+
+history_bp = Blueprint("history", __name__)
+
+MAX_NDJSON_LIMIT = 5000
+
+def current_username():
+    """Username from an 'Authorization: Bearer <token>' header, or None"""
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return None
+    try:
+        payload = decode_token(header[len("Bearer "):])
+    except Exception:
+        return None
+    return payload.get("username") if payload else None
+
+@history_bp.route("/api/history", methods=["GET"])
+def prediction_history():
+    """
+    The signed-in user's predictions, newest first; ?before=<created_at> pages back.
+    ?format=ndjson streams one prediction per line, up to 5000
+    """
+    username = current_username()
+    if username is None:
+        return jsonify({"error": "Authentication required"}), 401
+    if history is None:
+        return jsonify({"error": "History not available"}), 503
+    before = request.args.get("before")
+    try:
+        before = datetime.fromisoformat(before) if before else None
+    except ValueError:
+        return jsonify({"error": "before must be an ISO timestamp"}), 400
+    # streamed pages can be larger; the client reads them line by line
+    # (Mongo treats limit 0 as no limit, so the floor is 1)
+    cap = MAX_NDJSON_LIMIT if wants_ndjson() else 100
+    limit = max(1, min(request.args.get("limit", 20, type=int), cap))
+
+    records = history.history(username, limit, before)
+    for record in records:
+        record["created_at"] = record["created_at"].isoformat()
+        record["thumbnail_url"] = f"/api/history/images/{record['image_hash']}/thumbnail"
+    if wants_ndjson():
+        return ndjson_response(records)
+    return jsonify({"predictions": records})
+
+@history_bp.route("/api/history/images/<image_hash>/thumbnail", methods=["GET"])
+def history_thumbnail(image_hash):
+    username = current_username()
+    if username is None:
+        return jsonify({"error": "Authentication required"}), 401
+    if history is None:
+        return jsonify({"error": "History not available"}), 503
+    try:
+        path = history.blobs.thumbnail_path(image_hash)
+    except ValueError:
+        return jsonify({"error": "Image not found"}), 404
+    if not history.predictions.owns_image(username, image_hash):
+        return jsonify({"error": "Image not found"}), 404
+    try:
+        # content-addressed, so the thumbnail for a hash never changes
+        return send_file(path, mimetype="image/jpeg", max_age=365 * 24 * 3600)
+    except FileNotFoundError:
+        return jsonify({"error": "Image not found"}), 404
@@ -0,0 +1,38 @@
+from flask import Blueprint, Response, request, jsonify
+from inference.remote import InferenceClient
+from utils.metrics import stage_timer
+from config import INFERENCE_POOL_SIZE, INFERENCE_TIMEOUT
+import http.client
+
+# Routes served by ml-backend/app.py's inference blueprint
+INFERENCE_ROUTES = ("/api/detect-disease", "/api/explain-disease", "/api/detect-soil")
+FORWARDED_HEADERS = ("Content-Type", "Authorization")
+# The gateway sets CORS, compression and framing headers itself
+RETURNED_HEADERS = ("content-type", "etag", "cache-control", "retry-after")
+
+def create_inference_proxy(url):
+    """Blueprint forwarding the inference routes to the service at url"""
+    client = InferenceClient(url, pool_size=INFERENCE_POOL_SIZE, timeout=INFERENCE_TIMEOUT)
+    inference_proxy_bp = Blueprint("inference_proxy", __name__)
+
+    def forward():
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        path = request.full_path if request.query_string else request.path
+        try:
+            with stage_timer("inference_proxy", "forward"):
+                status, upstream_headers, body = client.request(request.method, path, request.get_data(), headers)
+        except TimeoutError:
+            return jsonify({"error": "Inference service timed out"}), 504
+        except (OSError, http.client.HTTPException) as e:
+            print(f"Inference service {url} unavailable: {e!r}")
+            return jsonify({"error": "Inference service unavailable"}), 502
+        response = Response(body, status=status)
+        for name, value in upstream_headers:
+            if name.lower() in RETURNED_HEADERS:
+                response.headers[name] = value
+        return response
+
+    for path in INFERENCE_ROUTES:
+        inference_proxy_bp.add_url_rule(path, path.rsplit("/", 1)[-1], forward, methods=["POST"])
+    inference_proxy_bp.client = client
+    return inference_proxy_bp
@@ -0,0 +1,42 @@
+from flask import Blueprint, request, jsonify
+from utils.gazetteer import MAX_REVERSE_KM, Gazetteer, check_coordinates
+from config import GAZETTEER_PATH
+
+try:
+    gazetteer = Gazetteer.load(GAZETTEER_PATH)
+except Exception as e:
+    print(f"Error loading gazetteer: {e}")
+    gazetteer = None
+
+places_bp = Blueprint("places", __name__)
+
+@places_bp.route("/api/places/search", methods=["GET"])
+def search_place():
+    """Best gazetteer match for ?q=, tolerant of misspellings"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"message": "q required"}), 400
+    place = gazetteer.lookup(query) if gazetteer else None
+    if place is None:
+        return jsonify({"message": "Location not found"}), 404
+    return jsonify(place._asdict())
+
+@places_bp.route("/api/places/reverse", methods=["GET"])
+def reverse_place():
+    """Nearest gazetteer city to ?lat=&lon=, within ?max_km= (default 100, at most 500)"""
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    if lat is None or lon is None:
+        return jsonify({"message": "lat and lon required"}), 400
+    try:
+        lat, lon = check_coordinates(lat, lon)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    max_km = request.args.get("max_km", 100.0, type=float)
+    if not 0 < max_km <= MAX_REVERSE_KM:
+        return jsonify({"message": f"max_km must be between 0 and {MAX_REVERSE_KM:g}"}), 400
+    match = gazetteer.reverse(lat, lon, max_km) if gazetteer else None
+    if match is None:
+        return jsonify({"message": "No place nearby"}), 404
+    place, km = match
+    return jsonify(dict(place._asdict(), distance_km=round(km, 1)))
@@ -0,0 +1,298 @@
+from flask import Blueprint, request, jsonify
+from routes.weather import weather_proxy
+from routes.places import gazetteer
+from utils.climatology import Climatology
+from utils.gazetteer import check_coordinates
+from utils.metrics import STAGE_SECONDS
+from utils.responses import cached_json
+from utils.singleflight import SingleFlight, content_key
+from config import CLIMATOLOGY_PATH, WEATHER_CACHE_TTL
+from datetime import date
+import os
+import time
+
+recommendation_bp = Blueprint("recommendation", __name__)
+
+recommend_lookup_seconds = STAGE_SECONDS.labels('recommend_plants', 'lookup')
+
+climatology = None
+if os.path.exists(CLIMATOLOGY_PATH):
+    try:
+        climatology = Climatology.open(CLIMATOLOGY_PATH)
+    except Exception as e:
+        print(f"Error loading climatology: {e}")
+
+@recommendation_bp.route('/recommend', methods=['GET', 'POST'])
+def recommend():
+    data = request.args if request.method == 'GET' else request.json
+    soil = data.get('soil_type', 'Unknown')
+    pin = data.get('pin_code', '000000')
+    # Mock temperature and crop recommendation logic
+    temp = 25  # Example static temperature
+    crop_rules = {
+        'Loamy': ['Wheat', 'Sugarcane', 'Cotton'],
+        'Sandy': ['Peanut', 'Watermelon', 'Potato'],
+        'Clay': ['Rice', 'Soybean', 'Broccoli']
+    }
+    crops = crop_rules.get(soil, ['Maize', 'Barley'])
+    rule = {"crops": crops}
+    return cached_json({
+        "temperature": temp,
+        "soil": soil,
+        "recommended_crops": rule["crops"],
+        "source": "Generated by CropIQ"
+    })
+
+# Identical requests in flight at the same time share one lookup
+recommend_flight = SingleFlight("recommend_plants")
+
+def build_recommendation(data):
+    """Plant recommendations for a /api/recommend-plants request body"""
+    soil_type = data.get('soil_type', 'Loamy')
+    location = data.get('location', 'Unknown')
+    temperature = data.get('temperature', 25)
+    temperature_source = 'client'
+
+    month = data.get('month') or date.today().month
+    lat, lon = data.get('lat'), data.get('lon')
+    place = location if location not in ('Unknown', 'Current Location') else None
+    # Local gazetteer first; the weather API geocoder only for places it lacks
+    gazetteer_place = None
+    if gazetteer is not None:
+        if place:
+            gazetteer_place = gazetteer.lookup(place)
+        elif lat is not None and lon is not None:
+            match = gazetteer.reverse(float(lat), float(lon))
+            gazetteer_place = match[0] if match else None
+    if (lat is None or lon is None) and gazetteer_place is not None:
+        lat, lon = gazetteer_place.lat, gazetteer_place.lon
+    if (lat is None or lon is None) and place and weather_proxy.configured:
+        try:
+            places = weather_proxy.geocode(place)
+            if places:
+                lat, lon = places[0]['lat'], places[0]['lon']
+        except Exception as e:
+            print(f"Geocoding failed for {place}: {e}")
+
+    # Recommend for the month's normals when the climatology grid covers
+    # the location, then live weather, then whatever the client sent
+    normals = None
+    if climatology is not None and lat is not None and lon is not None:
+        normals = climatology.normals(float(lat), float(lon), month)
+    if normals is not None:
+        temperature = round(normals['temperature'])
+        temperature_source = 'climatology'
+    elif weather_proxy.configured and lat is not None and lon is not None:
+        # the place was geocoded above, so only coordinates are passed on
+        try:
+            live_temperature = weather_proxy.temperature_for(lat, lon)
+        except Exception as e:
+            print(f"Weather lookup failed, using client temperature: {e}")
+            live_temperature = None
+        if live_temperature is not None:
+            temperature = round(live_temperature)
+            temperature_source = 'weather'
+    
+    # Plant recommendation logic based on soil type, temperature, and location
+    recommendations = []
+    
+    # Define climate zones based on location (simplified)
+    def get_climate_zone(location_name):
+        location_lower = location_name.lower()
+        if any(zone in location_lower for zone in ['tropical', 'india', 'tamil nadu', 'tamilnadu', 'chennai', 'madurai', 'coimbatore', 'salem', 'trichy', 'vellore', 'brazil', 'thailand', 'indonesia', 'malaysia', 'kerala', 'karnataka', 'andhra pradesh', 'telangana', 'maharashtra', 'gujarat', 'rajasthan', 'delhi', 'punjab', 'haryana', 'uttar pradesh', 'bihar', 'west bengal', 'odisha', 'assam', 'nagaland', 'manipur', 'mizoram', 'tripura', 'meghalaya', 'arunachal pradesh', 'sikkim', 'himachal pradesh', 'uttarakhand', 'jharkhand', 'chhattisgarh', 'madhya pradesh']):
+            return 'tropical'
+        elif any(zone in location_lower for zone in ['subtropical', 'florida', 'california', 'australia', 'south africa']):
+            return 'subtropical'
+        elif any(zone in location_lower for zone in ['temperate', 'europe', 'north america', 'china', 'japan']):
+            return 'temperate'
+        elif any(zone in location_lower for zone in ['cold', 'canada', 'russia', 'scandinavia', 'alaska']):
+            return 'cold'
+        else:
+            return 'temperate'  # default
+    
+    lookup_start = time.perf_counter()
+    # The rules below match on state names, so use the gazetteer's full
+    # "city, state, country" form when we have it
+    if gazetteer_place is not None:
+        location_text = ', '.join(filter(None, (gazetteer_place.name, gazetteer_place.state, gazetteer_place.country))).lower()
+    else:
+        location_text = location.lower()
+    if normals:
+        climate_zone = normals['climate_zone']
+    elif gazetteer_place is not None:
+        climate_zone = gazetteer_place.climate_zone
+    else:
+        climate_zone = get_climate_zone(location)
+    
+    # Comprehensive plant recommendations based on soil type, temperature, and climate
+    if soil_type == 'Loamy':  
+        if climate_zone == 'tropical':
+            if temperature > 25:
+                # Tamil Nadu specific recommendations for hot weather
+                if 'tamil nadu' in location_text or 'tamilnadu' in location_text or any(city in location_text for city in ['chennai', 'madurai', 'coimbatore', 'salem', 'trichy', 'vellore']):
+                    recommendations = ['Rice', 'Sugarcane', 'Banana', 'Mango', 'Coconut', 'Tapioca', 'Groundnut', 'Pulses']
+                else:
+                    recommendations = ['Rice', 'Sugarcane', 'Banana', 'Mango', 'Papaya', 'Coconut']
+            else:
+                if 'tamil nadu' in location_text or 'tamilnadu' in location_text:
+                    recommendations = ['Rice', 'Wheat', 'Maize', 'Pulses', 'Groundnut', 'Sunflower', 'Cotton']
+                else:
+                    recommendations = ['Rice', 'Wheat', 'Corn', 'Soybeans', 'Peanuts']
+        elif climate_zone == 'subtropical':
+            if temperature > 20:
+                recommendations = ['Cotton', 'Sugarcane', 'Citrus', 'Avocado', 'Olives']
+            else:
+                recommendations = ['Wheat', 'Barley', 'Oats', 'Peas', 'Lentils']
+        elif climate_zone == 'temperate':
+            if temperature > 15:
+                recommendations = ['Wheat', 'Corn', 'Soybeans', 'Sunflowers', 'Potatoes']
+            else:
+                recommendations = ['Wheat', 'Barley', 'Oats', 'Rye', 'Peas']
+        else:  # cold
+            recommendations = ['Barley', 'Oats', 'Rye', 'Potatoes', 'Carrots']
+            
+    elif soil_type == 'Sandy':
+        if climate_zone == 'tropical':
+            if temperature > 25:
+                if 'tamil nadu' in location_text or 'tamilnadu' in location_text:
+                    recommendations = ['Groundnut', 'Tapioca', 'Sweet Potato', 'Onion', 'Garlic', 'Chilli', 'Tomato']
+                else:
+                    recommendations = ['Peanuts', 'Watermelon', 'Sweet Potatoes', 'Cassava', 'Pineapple']
+            else:
+                if 'tamil nadu' in location_text or 'tamilnadu' in location_text:
+                    recommendations = ['Groundnut', 'Potato', 'Onion', 'Garlic', 'Carrot', 'Radish']
+                else:
+                    recommendations = ['Peanuts', 'Potatoes', 'Carrots', 'Onions', 'Garlic']
+        elif climate_zone == 'subtropical':
+            if temperature > 20:
+                recommendations = ['Peanuts', 'Watermelon', 'Cantaloupe', 'Sweet Corn', 'Tomatoes']
+            else:
+                recommendations = ['Potatoes', 'Carrots', 'Radish', 'Turnips', 'Beets']
+        elif climate_zone == 'temperate':
+            if temperature > 15:
+                recommendations = ['Potatoes', 'Carrots', 'Onions', 'Garlic', 'Asparagus']
+            else:
+                recommendations = ['Potatoes', 'Carrots', 'Radish', 'Turnips', 'Parsnips']
+        else:  # cold
+            recommendations = ['Potatoes', 'Carrots', 'Parsnips', 'Turnips', 'Radish']
+            
+    elif soil_type == 'Clay':
+        if climate_zone == 'tropical':
+            if temperature > 25:
+                if 'tamil nadu' in location_text or 'tamilnadu' in location_text:
+                    recommendations = ['Rice', 'Sugarcane', 'Cotton', 'Pulses', 'Sunflower', 'Groundnut']
+                else:
+                    recommendations = ['Rice', 'Soybeans', 'Cabbage', 'Cauliflower', 'Broccoli']
+            else:
+                if 'tamil nadu' in location_text or 'tamilnadu' in location_text:
+                    recommendations = ['Rice', 'Wheat', 'Pulses', 'Mustard', 'Sunflower']
+                else:
+                    recommendations = ['Rice', 'Wheat', 'Barley', 'Mustard', 'Rapeseed']
+        elif climate_zone == 'subtropical':
+            if temperature > 20:
+                recommendations = ['Rice', 'Soybeans', 'Broccoli', 'Cabbage', 'Kale']
+            else:
+                recommendations = ['Rice', 'Wheat', 'Barley', 'Mustard', 'Spinach']
+        elif climate_zone == 'temperate':
+            if temperature > 15:
+                recommendations = ['Rice', 'Soybeans', 'Broccoli', 'Cabbage', 'Cauliflower']
+            else:
+                recommendations = ['Rice', 'Wheat', 'Barley', 'Mustard', 'Kale']
+        else:  # cold
+            recommendations = ['Rice', 'Wheat', 'Barley', 'Mustard', 'Spinach']
+            
+    elif soil_type == 'Silty':
+        if climate_zone == 'tropical':
+            if 'tamil nadu' in location_text or 'tamilnadu' in location_text:
+                recommendations = ['Rice', 'Maize', 'Pulses', 'Groundnut', 'Sunflower', 'Cotton']
+            else:
+                recommendations = ['Corn', 'Soybeans', 'Wheat', 'Alfalfa', 'Clover']
+        elif climate_zone == 'subtropical':
+            recommendations = ['Corn', 'Soybeans', 'Wheat', 'Alfalfa', 'Sunflowers']
+        elif climate_zone == 'temperate':
+            recommendations = ['Corn', 'Soybeans', 'Wheat', 'Alfalfa', 'Clover']
+        else:  # cold
+            recommendations = ['Wheat', 'Barley', 'Oats', 'Alfalfa', 'Clover']
+            
+    elif soil_type == 'Peaty':
+        if climate_zone == 'tropical':
+            if 'tamil nadu' in location_text or 'tamilnadu' in location_text:
+                recommendations = ['Rice', 'Vegetables', 'Potato', 'Carrot', 'Onion', 'Garlic']
+            else:
+                recommendations = ['Cranberries', 'Blueberries', 'Potatoes', 'Carrots', 'Celery']
+        elif climate_zone == 'subtropical':
+            recommendations = ['Blueberries', 'Strawberries', 'Potatoes', 'Carrots', 'Lettuce']
+        elif climate_zone == 'temperate':
+            recommendations = ['Cranberries', 'Blueberries', 'Potatoes', 'Carrots', 'Celery']
+        else:  # cold
+            recommendations = ['Cranberries', 'Blueberries', 'Potatoes', 'Carrots', 'Parsnips']
+            
+    elif soil_type == 'Chalky':
+        if climate_zone == 'tropical':
+            if 'tamil nadu' in location_text or 'tamilnadu' in location_text:
+                recommendations = ['Millets', 'Pulses', 'Oilseeds', 'Spices', 'Medicinal Plants']
+            else:
+                recommendations = ['Lavender', 'Rosemary', 'Sage', 'Thyme', 'Oregano']
+        elif climate_zone == 'subtropical':
+            recommendations = ['Lavender', 'Rosemary', 'Sage', 'Thyme', 'Basil']
+        elif climate_zone == 'temperate':
+            recommendations = ['Lavender', 'Rosemary', 'Sage', 'Thyme', 'Oregano']
+        else:  # cold
+            recommendations = ['Lavender', 'Rosemary', 'Sage', 'Thyme', 'Mint']
+    else:
+        # Default recommendations
+        if 'tamil nadu' in location_text or 'tamilnadu' in location_text:
+            recommendations = ['Rice', 'Wheat', 'Maize', 'Pulses', 'Groundnut', 'Sunflower']
+        else:
+            recommendations = ['Wheat', 'Barley', 'Oats', 'Corn', 'Soybeans']
+    recommend_lookup_seconds.observe(time.perf_counter() - lookup_start)
+    
+    return {
+        "recommendations": recommendations,
+        "soil_type": soil_type,
+        "location": location,
+        "resolved_location": gazetteer_place.name if gazetteer_place else None,
+        "climate_zone": climate_zone,
+        "temperature": temperature,
+        "temperature_source": temperature_source,
+        "month": month,
+        "season": normals['season'] if normals else None,
+        "rainfall": round(normals['rainfall'], 1) if normals else None,
+        "message": f"Recommended {len(recommendations)} plants for {soil_type} soil in {climate_zone} climate"
+    }
+
+def parse_month(value):
+    """Month 1-12 from a request value, None when absent; ValueError otherwise"""
+    if value in (None, ''):
+        return None
+    try:
+        month = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"month must be a number from 1 to 12, got {value!r}")
+    if not 1 <= month <= 12:
+        raise ValueError(f"month must be from 1 to 12, got {month}")
+    return month
+
+@recommendation_bp.route('/api/recommend-plants', methods=['GET', 'POST'])
+def recommend_plants():
+    """Get plant recommendations based on soil type, location, and temperature"""
+    # GET with query parameters is cacheable; the answer depends only on them
+    # and on the weather cache
+    if request.method == 'GET':
+        data = request.args.to_dict()
+        if 'temperature' in data:
+            data['temperature'] = request.args.get('temperature', 25, type=float)
+    else:
+        data = request.get_json(silent=True) or {}
+    try:
+        data = dict(data, month=parse_month(data.get('month')))
+        if data.get('lat') is not None or data.get('lon') is not None:
+            lat, lon = check_coordinates(data.get('lat'), data.get('lon'))
+            data.update(lat=lat, lon=lon)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        key = content_key({k: data.get(k) for k in ('soil_type', 'location', 'temperature', 'lat', 'lon', 'month')})
+        return cached_json(recommend_flight.do(key, build_recommendation, data)[0], max_age=WEATHER_CACHE_TTL)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
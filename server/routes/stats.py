@@ -0,0 +1,40 @@
+from flask import Blueprint, request, jsonify
+from routes.history import current_username, history
+from utils.singleflight import content_key
+from utils.stats import day_range, query_days, summarize
+
+stats_bp = Blueprint("stats", __name__)
+
+MAX_DAYS = 365
+
+@stats_bp.route("/api/stats/summary", methods=["GET"])
+def stats_summary():
+    """
+    Prediction totals, per-disease counts, daily series and trends for the
+    signed-in user over the last ?days= days (default 30), from the rollups
+    """
+    username = current_username()
+    if username is None:
+        return jsonify({"error": "Authentication required"}), 401
+    if history is None or history.stats is None:
+        return jsonify({"error": "Statistics not available"}), 503
+    days = request.args.get("days", 30, type=int)
+    if not 1 <= days <= MAX_DAYS:
+        return jsonify({"error": f"days must be between 1 and {MAX_DAYS}"}), 400
+
+    # the all-time document's version changes with every rollup update, so it
+    # identifies the response without reading the daily documents
+    all_time = history.stats.all_time(username)
+    first_day, last_day = day_range(query_days(days))
+    etag = content_key(username, (all_time or {}).get("version", 0), days, last_day)[:32]
+    # weak comparison: compressed responses carry the ETag as W/"..."
+    if request.if_none_match.contains_weak(etag):
+        response = jsonify()
+        response.status_code = 304
+    else:
+        daily = history.stats.days(username, first_day, last_day)
+        response = jsonify(summarize(daily, all_time, days))
+    response.set_etag(etag)
+    # per user, and must be revalidated since new predictions change it
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
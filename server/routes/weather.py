@@ -0,0 +1,54 @@
+from flask import Blueprint, request, jsonify
+from utils.weather import OpenWeatherUpstream, UpstreamError, WeatherProxy
+from utils.metrics import REGISTRY
+from config import (WEATHER_API_URL, WEATHER_API_KEY, WEATHER_CACHE_TTL,
+                    WEATHER_STALE_TTL, GEOCODE_CACHE_TTL)
+
+weather_proxy = WeatherProxy(
+    OpenWeatherUpstream(WEATHER_API_URL, WEATHER_API_KEY),
+    ttl=WEATHER_CACHE_TTL,
+    stale_ttl=WEATHER_STALE_TTL,
+    geocode_ttl=GEOCODE_CACHE_TTL,
+)
+
+REGISTRY.gauge(
+    "weather_proxy_events", "Weather proxy cache and upstream counters",
+    lambda: {(name,): value for name, value in weather_proxy.stats().items()},
+    ("event",),
+)
+
+weather_bp = Blueprint("weather", __name__)
+
+@weather_bp.route("/api/weather", methods=["GET"])
+def weather():
+    """Current weather for ?lat=&lon= or a place name in ?q="""
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    query = request.args.get("q", "").strip()
+
+    try:
+        if lat is None or lon is None:
+            if not query:
+                return jsonify({"message": "lat and lon or q required"}), 400
+            places = weather_proxy.geocode(query)
+            if not places:
+                return jsonify({"message": "Location not found"}), 404
+            lat, lon = places[0]["lat"], places[0]["lon"]
+        return jsonify(weather_proxy.current_weather(lat, lon))
+    except UpstreamError as e:
+        return jsonify({"message": e.message}), e.status
+
+@weather_bp.route("/api/geocode", methods=["GET"])
+def geocode():
+    """Coordinates for a place name, in the upstream geocoding format"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"message": "q required"}), 400
+    try:
+        return jsonify(weather_proxy.geocode(query))
+    except UpstreamError as e:
+        return jsonify({"message": e.message}), e.status
+
+@weather_bp.route("/api/weather/stats", methods=["GET"])
+def weather_stats():
+    return jsonify(weather_proxy.stats())
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The server code runs from server/ (python app.py), so import it from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# a key of the length PyJWT recommends for HS256, instead of the dev default
+os.environ.setdefault("JWT_SECRET", "test-secret-of-at-least-thirty-two-bytes")
@@ -0,0 +1,117 @@
+import csv
+import io
+import os
+
+import numpy as np
+import pytest
+from flask import Flask
+from PIL import Image
+
+from utils.active_learning import ActiveLearningQueue, class_directory, uncertainty
+
+CLASSES = ["Apple Scab", "Apple Rust", "Corn Blight", "Healthy", "Tomato Bacterial Spot"]
+UNSURE = [0.4, 0.35, 0.1, 0.1, 0.05]
+
+
+def image(fmt="JPEG", seed=0):
+    # random noise: distinct difference hashes for different seeds
+    pixels = np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    out = io.BytesIO()
+    Image.fromarray(pixels).save(out, format=fmt)
+    return out.getvalue()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = ActiveLearningQueue(str(tmp_path / "queue"), capacity=3, min_score=0.3)
+    queue.buffer.flush_interval = 0.01
+    return queue
+
+
+def offer(queue, data, probabilities=UNSURE):
+    queued = queue.offer(data, probabilities, CLASSES, model_version="v1")
+    assert queue.buffer.flush(5)
+    return queued
+
+
+def test_uncertainty_scores():
+    entropy, margin = uncertainty([0.5, 0.5])
+    assert entropy == pytest.approx(1.0) and margin == pytest.approx(0.0)
+    entropy, margin = uncertainty([1.0, 0.0])
+    assert entropy == pytest.approx(0.0, abs=1e-6) and margin == pytest.approx(1.0)
+
+
+def test_confident_predictions_are_not_queued(queue):
+    assert not offer(queue, image(), [0.97, 0.01, 0.01, 0.005, 0.005])
+    assert queue.pending() == []
+
+
+def test_duplicates_are_stored_once(queue):
+    data = image()
+    offer(queue, data)
+    offer(queue, data, [0.3, 0.3, 0.2, 0.1, 0.1])
+    items = queue.pending()
+    assert len(items) == 1
+    assert items[0]["uploads"] == 2 and items[0]["score"] == pytest.approx(1.0)
+
+
+def test_full_queue_keeps_the_most_informative(queue):
+    for seed, probabilities in enumerate([[0.6, 0.3, 0.1, 0, 0], [0.55, 0.3, 0.15, 0, 0], [0.5, 0.3, 0.2, 0, 0]]):
+        offer(queue, image(seed=seed), probabilities)
+    offer(queue, image(seed=10), [0.34, 0.33, 0.33, 0.0, 0.0])
+    scores = [item["score"] for item in queue.pending()]
+    assert len(scores) == 3 and scores[0] == pytest.approx(0.99)
+    offer(queue, image(seed=11), [0.9, 0.05, 0.05, 0.0, 0.0])
+    assert len(queue.pending()) == 3
+
+
+def test_labels_must_be_known_classes(queue):
+    offer(queue, image())
+    item_id = queue.pending()[0]["id"]
+    with pytest.raises(ValueError):
+        queue.label(item_id, "Banana Wilt")
+    assert queue.label(item_id, "  apple scab ")
+    assert queue.get(item_id)["label"] == "Apple Scab"
+    assert not queue.label("0" * 64, "Healthy")
+
+
+def test_export_keeps_the_image_format(queue, tmp_path):
+    offer(queue, image("PNG", seed=1))
+    offer(queue, image("JPEG", seed=2))
+    for item in queue.pending():
+        queue.label(item["id"], "Corn Blight")
+    out = tmp_path / "data"
+    assert queue.export(str(out)) == {"exported": 2, "skipped": 0, "missing": 0}
+
+    files = sorted(os.listdir(out / class_directory("Corn Blight")))
+    assert sorted(os.path.splitext(name)[1] for name in files) == [".jpg", ".png"]
+    for name in files:
+        with Image.open(out / "corn_blight" / name) as img:
+            assert {".png": "PNG", ".jpg": "JPEG"}[os.path.splitext(name)[1]] == img.format
+    with open(out / "active_learning_manifest.csv") as f:
+        assert len(list(csv.reader(f))) == 3
+    assert queue.stats()["labeled"] == 0
+
+
+def test_class_directory_is_safe():
+    assert class_directory("Tomato Bacterial Spot") == "tomato_bacterial_spot"
+    assert class_directory("../../etc") == "etc"
+    assert class_directory("..") == "unknown"
+
+
+def test_label_route_rejects_unknown_labels(monkeypatch, queue):
+    from routes import active_learning as route
+
+    monkeypatch.setattr(route, "active_learning", queue)
+    app = Flask(__name__)
+    app.register_blueprint(route.active_learning_bp)
+    client = app.test_client()
+    offer(queue, image("PNG"))
+    item_id = queue.pending()[0]["id"]
+
+    response = client.get(f"/admin/active-learning/{item_id}/image")
+    assert response.status_code == 200 and response.mimetype == "image/png"
+    response = client.post(f"/admin/active-learning/{item_id}/label", json={"label": "Banana Wilt"})
+    assert response.status_code == 400
+    response = client.post(f"/admin/active-learning/{item_id}/label", json={"label": "healthy"})
+    assert response.status_code == 200 and response.get_json()["label"] == "Healthy"
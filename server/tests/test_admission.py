@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from utils.admission import AdaptiveLimiter, Rejected, init_admission
+from utils.metrics import REGISTRY
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_limit_grows_additively_and_backs_off_multiplicatively():
+    clock = FakeClock()
+    limiter = AdaptiveLimiter("/t", initial_limit=4, max_limit=8, target_latency=1.0, backoff=0.5, clock=clock)
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(0.1)
+    assert limiter.limit == pytest.approx(5.0, abs=0.1)
+
+    limiter.acquire()
+    limiter.release(2.0)
+    halved = limiter.limit
+    assert halved == pytest.approx(2.5, abs=0.1)
+    # a second slow request within target_latency does not cut again
+    limiter.acquire()
+    limiter.release(2.0)
+    assert limiter.limit == halved
+    clock.now += 1.0
+    limiter.acquire()
+    limiter.release(2.0)
+    assert limiter.limit == pytest.approx(halved / 2, abs=0.01)
+
+
+def test_full_queue_is_rejected_immediately():
+    limiter = AdaptiveLimiter("/t", initial_limit=1, max_queue=0)
+    limiter.acquire()
+    with pytest.raises(Rejected) as e:
+        limiter.acquire()
+    assert e.value.reason == "queue_full" and e.value.retry_after >= 1
+
+
+def test_queued_request_times_out():
+    limiter = AdaptiveLimiter("/t", initial_limit=1, max_queue=1, queue_timeout=0.05)
+    limiter.acquire()
+    start = time.monotonic()
+    with pytest.raises(Rejected) as e:
+        limiter.acquire()
+    assert e.value.reason == "queue_timeout"
+    assert time.monotonic() - start >= 0.05
+    assert limiter.stats()["waiting"] == 0
+
+
+def test_queued_request_is_admitted_when_a_slot_frees():
+    limiter = AdaptiveLimiter("/t", initial_limit=1, max_queue=1, queue_timeout=5)
+    limiter.acquire()
+    admitted = threading.Event()
+
+    def wait_for_slot():
+        limiter.acquire()
+        admitted.set()
+
+    t = threading.Thread(target=wait_for_slot)
+    t.start()
+    while limiter.stats()["waiting"] == 0:
+        time.sleep(0.001)
+    limiter.release(0.01)
+    t.join(5)
+    assert admitted.is_set() and limiter.stats()["in_flight"] == 1
+
+
+def make_app(name, limit):
+    app = Flask(name)
+    release = threading.Event()
+
+    @app.route("/slow")
+    def slow():
+        release.wait(5)
+        return "done"
+
+    limiters = init_admission(app, {"/slow": limit}, enabled=True, max_queue=0)
+    return app, limiters, release
+
+
+def test_routes_over_the_limit_get_503_with_retry_after():
+    app, limiters, release = make_app("admission_503", 1)
+    client = app.test_client()
+    first = threading.Thread(target=client.get, args=("/slow",))
+    first.start()
+    while limiters["/slow"].stats()["in_flight"] == 0:
+        time.sleep(0.001)
+    response = app.test_client().get("/slow")
+    assert response.status_code == 503 and int(response.headers["Retry-After"]) >= 1
+    release.set()
+    first.join(5)
+    assert limiters["/slow"].stats()["in_flight"] == 0
+    assert 'admission_rejected_total{app="admission_503",route="/slow",reason="queue_full"} 1' in REGISTRY.render()
+
+
+def test_limiters_are_per_app():
+    first, first_limiters, _ = make_app("admission_a", 2)
+    second, second_limiters, _ = make_app("admission_b", 5)
+    assert first.extensions["admission"] is first_limiters
+    assert first_limiters["/slow"] is not second_limiters["/slow"]
+    text = REGISTRY.render()
+    assert 'admission_limit{app="admission_a",route="/slow"} 2' in text
+    assert 'admission_limit{app="admission_b",route="/slow"} 5' in text
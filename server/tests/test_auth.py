@@ -0,0 +1,86 @@
+import functools
+import os
+import sys
+
+import pytest
+from flask import Flask
+from pymongo.errors import OperationFailure
+from werkzeug.security import generate_password_hash
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from stubs import InMemoryCollection
+
+from models import user as user_module
+from routes import auth
+
+
+class NoIndexCollection(InMemoryCollection):
+    def create_index(self, keys, unique=False, **kwargs):
+        raise OperationFailure("E11000 duplicate key error building the index")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # cheap hashes keep the tests fast; the routes do not care which method is used
+    monkeypatch.setattr(user_module, "generate_password_hash",
+                        functools.partial(generate_password_hash, method="pbkdf2:sha256:1000"))
+    monkeypatch.setattr(auth, "user_model", user_module.User({"users": InMemoryCollection()}))
+    app = Flask(__name__)
+    app.register_blueprint(auth.auth_bp)
+    return app.test_client()
+
+
+def register(client, username="farmer", password="secret"):
+    return client.post("/api/register", json={"username": username, "password": password})
+
+
+def login(client, username="farmer", password="secret"):
+    return client.post("/api/login", json={"username": username, "password": password})
+
+
+def test_register_once_per_username(client):
+    assert register(client).status_code == 201
+    assert register(client).status_code == 409
+    assert register(client, password="").status_code == 400
+
+
+def test_login_checks_the_password(client):
+    register(client)
+    response = login(client)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["token"] and body["refresh_token"] and body["expires_in"] == auth.ACCESS_TOKEN_SECONDS
+    assert login(client, password="wrong").status_code == 401
+    assert login(client, username="nobody").status_code == 401
+
+
+def test_refresh_gives_a_new_access_token(client):
+    register(client)
+    tokens = login(client).get_json()
+    response = client.post("/api/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200 and response.get_json()["token"]
+    # an access token is not a refresh token
+    assert client.post("/api/token/refresh", json={"refresh_token": tokens["token"]}).status_code == 401
+    assert client.post("/api/token/refresh", json={"refresh_token": "garbage"}).status_code == 401
+
+
+def test_logout_revokes_every_refresh_token(client):
+    register(client)
+    first = login(client).get_json()["refresh_token"]
+    second = login(client).get_json()["refresh_token"]
+    assert client.post("/api/logout", json={"refresh_token": first}).status_code == 200
+    for token in (first, second):
+        response = client.post("/api/token/refresh", json={"refresh_token": token})
+        assert response.status_code == 401
+
+    # a revoked token cannot log the user out of a newer session
+    fresh = login(client).get_json()["refresh_token"]
+    client.post("/api/logout", json={"refresh_token": first})
+    assert client.post("/api/token/refresh", json={"refresh_token": fresh}).status_code == 200
+
+
+def test_registration_is_unavailable_without_the_unique_index(client, monkeypatch):
+    users = user_module.User({"users": NoIndexCollection()})
+    monkeypatch.setattr(auth, "user_model", users)
+    assert register(client).status_code == 503
+    assert users.collection._docs == []
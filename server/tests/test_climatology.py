@@ -0,0 +1,77 @@
+import csv
+
+import numpy as np
+import pytest
+
+from utils.climatology import Climatology, build_climatology, climate_zone, season
+
+
+def write_grid(tmp_path, lats, lons, temperature=28.0, skip_months=()):
+    csv_path = tmp_path / "climatology.csv"
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["lat", "lon", "month", "temperature", "rainfall"])
+        for lat in lats:
+            for lon in lons:
+                for month in range(1, 13):
+                    if month not in skip_months:
+                        writer.writerow([lat, lon, month, temperature + lon - lons[0], 100 + month])
+    out = tmp_path / "climatology.bin"
+    build_climatology(csv_path, out)
+    return Climatology.open(out)
+
+
+@pytest.fixture
+def regional(tmp_path):
+    # 10-12°N, 78-80°E, 1° cells: around Tamil Nadu
+    return write_grid(tmp_path, [10, 11, 12], [78, 79, 80])
+
+
+def test_values_inside_the_grid_are_interpolated(regional):
+    normals = regional.normals(11.0, 78.5, 5)
+    assert normals["temperature"] == pytest.approx(28.5)
+    assert normals["rainfall"] == pytest.approx(105)
+    assert normals["climate_zone"] == "tropical"
+
+
+def test_points_outside_a_regional_grid_have_no_normals(regional):
+    assert regional.normals(56.0, -106.0, 7) is None  # Canada
+    assert regional.normals(11.0, 81.0, 7) is None
+    assert regional.nearest(56.0, -106.0) is None
+
+
+def test_half_a_cell_beyond_the_edge_is_still_inside(regional):
+    assert regional.normals(12.4, 80.4, 1) is not None
+    assert regional.normals(12.6, 80.0, 1) is None
+
+
+def test_non_finite_points_have_no_normals(regional):
+    assert regional.normals(float("nan"), 79.0, 1) is None
+    assert regional.normals(11.0, float("inf"), 1) is None
+
+
+def test_a_month_missing_from_the_csv_has_no_normals(tmp_path):
+    grid = write_grid(tmp_path, [10, 11], [78, 79], skip_months=(3,))
+    assert grid.normals(10.5, 78.5, 3) is None
+    normals = grid.normals(10.5, 78.5, 4)
+    assert normals["temperature"] == pytest.approx(28.5)
+    assert np.isfinite(normals["annual_rainfall"])
+
+
+def test_global_grids_wrap_around_the_antimeridian(tmp_path):
+    lons = list(range(-180, 180, 60))
+    grid = write_grid(tmp_path, [-30, 0, 30], lons)
+    assert grid.wraps
+    # halfway between the last column (120°E, +300) and the first (180°W, +0)
+    assert grid.normals(0.0, 150.0, 1)["temperature"] == pytest.approx(28.0 + 150)
+    assert grid.normals(0.0, -210.0, 1)["temperature"] == pytest.approx(28.0 + 150)
+
+
+def test_zones_and_seasons():
+    assert climate_zone(np.full(12, 25.0)) == "tropical"
+    assert climate_zone(np.array([-20.0] * 6 + [5.0] * 6)) == "cold"
+    assert season(50.0, 7, "temperate", np.ones(12)) == "summer"
+    assert season(-35.0, 7, "temperate", np.ones(12)) == "winter"
+    rainfall = np.array([10.0] * 6 + [200.0] * 6)
+    assert season(11.0, 8, "tropical", rainfall) == "wet"
+    assert season(11.0, 2, "tropical", rainfall) == "dry"
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from config import FERTILIZER_RULES_PATH
+from utils.fertilizer import FertilizerTables
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return FertilizerTables.load(FERTILIZER_RULES_PATH)
+
+
+def test_guideline_dose_overrides_the_table(tables):
+    result = tables.recommend("Loamy", "Rice")
+    assert result["source"] == "guideline"
+    assert result["dose_kg_ha"] == {"n": 120.0, "p2o5": 60.0, "k2o": 40.0}
+    assert tables.recommend("Loamy", "Maize")["source"] == "table"
+
+
+def test_names_are_normalized_and_aliases_resolved(tables):
+    assert tables.recommend("loamy", "paddy") == tables.recommend("Loamy", "Rice")
+    assert tables.recommend("  Red-Soil ", "Peanuts")["crop"] == "Groundnut"
+    with pytest.raises(ValueError):
+        tables.recommend("Moon Dust", "Rice")
+    with pytest.raises(ValueError):
+        tables.recommend("Loamy", "Kale")
+
+
+def test_soil_test_ratings_scale_the_dose(tables):
+    medium = tables.recommend("Loamy", "Maize")["dose_kg_ha"]
+    result = tables.recommend("Loamy", "Maize", n=200, p2o5=40, k2o=300)
+    assert result["soil_test"] == {"n": "low", "p2o5": "medium", "k2o": "high"}
+    assert result["dose_kg_ha"]["n"] == pytest.approx(medium["n"] * 1.25)
+    assert result["dose_kg_ha"]["p2o5"] == pytest.approx(medium["p2o5"])
+    assert result["dose_kg_ha"]["k2o"] == pytest.approx(medium["k2o"] * 0.75)
+
+
+def test_acid_soil_gets_lime_and_sodic_soil_gypsum(tables):
+    acid = tables.recommend("Loamy", "Wheat", ph=5.0)
+    assert acid["lime_t_ha"] > 0 and acid["gypsum_t_ha"] == 0
+    sodic = tables.recommend("Loamy", "Wheat", ph=9.0)
+    assert sodic["gypsum_t_ha"] > 0 and sodic["lime_t_ha"] == 0
+
+
+def test_legumes_get_phosphate_from_ssp(tables):
+    products = tables.recommend("Clay", "Soybean")["products_kg_ha"]
+    assert products["dap"] == 0 and products["ssp"] > 0
+    products = tables.recommend("Loamy", "Rice")["products_kg_ha"]
+    assert products["dap"] > 0 and products["ssp"] == 0
+
+
+def test_area_gives_totals(tables):
+    result = tables.recommend("Clay", "Cotton", area_ha=2.0)
+    assert result["products_kg"]["urea"] == pytest.approx(result["products_kg_ha"]["urea"] * 2, abs=0.1)
+
+
+def test_recommend_many_matches_recommend(tables):
+    plots = [
+        ("Loamy", "Rice", 200, 40, 300, 5.0, 1.5),
+        ("Sandy", "Peanut", None, 60, None, 9.0, None),
+        ("Black Soil", "Cotton", 600, None, 100, None, 0.5),
+        ("Moon Dust", "Rice", None, None, None, None, None),
+        ("Clay", "Kale", None, None, None, None, None),
+    ]
+    soils, crops, n, p2o5, k2o, ph, area = (list(column) for column in zip(*plots))
+    batch = tables.recommend_many(soils, crops, n=n, p2o5=p2o5, k2o=k2o, ph=ph, area_ha=area)
+    assert batch["known"].tolist() == [True, True, True, False, False]
+    assert np.isnan(batch["dose"][3]).all()
+
+    rows = tables.rows(batch)
+    for plot, row in zip(plots, rows):
+        soil, crop, n_, p_, k_, ph_, area_ = plot
+        if row is None:
+            continue
+        assert row == tables.recommend(soil, crop, n=n_, p2o5=p_, k2o=k_, ph=ph_, area_ha=area_)
+    assert rows[3] is None and rows[4] is None
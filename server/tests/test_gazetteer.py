@@ -0,0 +1,108 @@
+import pytest
+from flask import Flask
+
+from utils.gazetteer import MAX_REVERSE_KM, Gazetteer, Place, check_coordinates, haversine_km, normalize_name
+
+
+def entry(name, kind, state, country, lat, lon, zone="tropical", alternates=()):
+    place = Place(name, kind, state, country, lat, lon, zone)
+    return place, {normalize_name(n) for n in (name,) + tuple(alternates)}
+
+
+@pytest.fixture
+def gazetteer():
+    return Gazetteer([
+        entry("India", "country", "", "India", 20.59, 78.96),
+        entry("Tamil Nadu", "state", "Tamil Nadu", "India", 11.13, 78.66),
+        entry("Chennai", "city", "Tamil Nadu", "India", 13.08, 80.27, alternates=("Madras",)),
+        entry("Tiruchirappalli", "city", "Tamil Nadu", "India", 10.80, 78.69, alternates=("Trichy",)),
+        entry("Aurangabad", "city", "Maharashtra", "India", 19.88, 75.34),
+        entry("Aurangabad", "city", "Bihar", "India", 24.75, 84.37),
+        entry("Suva", "city", "Central", "Fiji", -18.14, 178.44, alternates=("Suva City",)),
+        entry("Apia", "city", "Tuamasaga", "Samoa", -13.83, -171.76),
+    ])
+
+
+def test_lookup_by_name_and_alternate_name(gazetteer):
+    assert gazetteer.lookup("Chennai").name == "Chennai"
+    assert gazetteer.lookup("madras").name == "Chennai"
+    assert gazetteer.lookup("Trichy, Tamil Nadu").name == "Tiruchirappalli"
+
+
+def test_lookup_tolerates_misspellings(gazetteer):
+    assert gazetteer.lookup("Chenai").name == "Chennai"
+    assert gazetteer.lookup("Xyzzyq") is None
+
+
+def test_qualifiers_narrow_ambiguous_names(gazetteer):
+    assert gazetteer.lookup("Aurangabad, Bihar").state == "Bihar"
+    assert gazetteer.lookup("Aurangabad, Maharashtra").state == "Maharashtra"
+    assert gazetteer.lookup("Some Village, Tamil Nadu").kind == "state"
+
+
+def test_reverse_finds_the_nearest_city(gazetteer):
+    place, km = gazetteer.reverse(13.0, 80.2)
+    assert place.name == "Chennai"
+    assert km < 15
+    assert gazetteer.reverse(16.0, 70.0) is None
+
+
+def test_reverse_wraps_at_the_antimeridian(gazetteer):
+    # Suva (178.44°E) is closer to 179.9°W than Apia (171.76°W) is
+    place, east_km = gazetteer.reverse(-18.0, 179.9, max_km=300)
+    assert place.name == "Suva"
+    place, west_km = gazetteer.reverse(-18.0, -179.9, max_km=300)
+    assert place.name == "Suva"
+    assert east_km < west_km < 200
+
+
+def test_reverse_clamps_max_km(gazetteer):
+    # the Bay of Bengal point is about 900 km from the nearest city
+    assert gazetteer.reverse(19.0, 75.0, max_km=10_000) == gazetteer.reverse(19.0, 75.0, max_km=MAX_REVERSE_KM)
+    assert gazetteer.reverse(17.0, 88.0, max_km=10_000) is None
+    assert gazetteer.reverse(13.0, 80.2, max_km=0) is None
+
+
+def test_reverse_ring_walk_matches_a_full_scan(gazetteer):
+    cities = [place for place, _ in gazetteer.places if place.kind == "city"]
+    for lat, lon in [(13.0, 80.2), (11.5, 79.0), (22.0, 80.0), (-15.0, -175.0), (-18.0, 179.0)]:
+        match = gazetteer.reverse(lat, lon, max_km=MAX_REVERSE_KM)
+        nearest = min(cities, key=lambda p: haversine_km(lat, lon, p.lat, p.lon))
+        if haversine_km(lat, lon, nearest.lat, nearest.lon) <= MAX_REVERSE_KM:
+            assert match[0] == nearest
+        else:
+            assert match is None
+
+
+@pytest.mark.parametrize("lat, lon", [("nan", 80), (13, "inf"), (91, 80), (13, -181), ("north", 80), (None, 80)])
+def test_invalid_coordinates_are_rejected(gazetteer, lat, lon):
+    with pytest.raises(ValueError):
+        check_coordinates(lat, lon)
+    with pytest.raises(ValueError):
+        gazetteer.reverse(lat, lon)
+
+
+def test_reverse_route_rejects_bad_coordinates(monkeypatch, gazetteer):
+    from routes import places
+    monkeypatch.setattr(places, "gazetteer", gazetteer)
+    app = Flask(__name__)
+    app.register_blueprint(places.places_bp)
+    client = app.test_client()
+    assert client.get("/api/places/reverse?lat=nan&lon=80").status_code == 400
+    assert client.get("/api/places/reverse?lat=13&lon=200").status_code == 400
+    assert client.get("/api/places/reverse?lat=13&lon=80.2&max_km=5000").status_code == 400
+    response = client.get("/api/places/reverse?lat=13&lon=80.2")
+    assert response.status_code == 200
+    assert response.get_json()["name"] == "Chennai"
+
+
+def test_recommend_plants_rejects_bad_coordinates(monkeypatch, gazetteer):
+    from routes import recommendation
+    monkeypatch.setattr(recommendation, "gazetteer", gazetteer)
+    app = Flask(__name__)
+    app.register_blueprint(recommendation.recommendation_bp)
+    client = app.test_client()
+    response = client.post("/api/recommend-plants", json={"soil_type": "Red", "lat": "nan", "lon": 80})
+    assert response.status_code == 400
+    response = client.get("/api/recommend-plants?soil_type=Red&lat=13&lon=-999")
+    assert response.status_code == 400
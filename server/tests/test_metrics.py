@@ -0,0 +1,46 @@
+from flask import Flask
+
+from utils.metrics import REGISTRY, Registry, init_metrics
+
+
+def make_app(registry):
+    app = Flask(__name__)
+    init_metrics(app, registry)
+
+    @app.route("/ping")
+    def ping():
+        return "pong"
+
+    @app.route("/boom")
+    def boom():
+        raise ValueError("boom")
+
+    return app
+
+
+def test_requests_are_recorded_in_the_given_registry():
+    registry = Registry()
+    client = make_app(registry).test_client()
+    client.get("/ping")
+    client.get("/ping")
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'http_requests_total{route="/ping",method="GET",status="200"} 2' in text
+    assert 'http_request_duration_seconds_count{route="/ping",method="GET"} 2' in text
+    assert 'route="/ping"' not in REGISTRY.render()
+
+
+def test_exceptions_are_counted():
+    registry = Registry()
+    client = make_app(registry).test_client()
+    assert client.get("/boom").status_code == 500
+    assert 'http_exceptions_total{route="/boom",exception="ValueError"} 1' in registry.render()
+
+
+def test_two_apps_can_share_a_registry():
+    registry = Registry()
+    make_app(registry).test_client().get("/ping")
+    make_app(registry).test_client().get("/ping")
+    text = registry.render()
+    assert text.count("# TYPE http_requests_total counter") == 1
+    assert 'http_requests_total{route="/ping",method="GET",status="200"} 2' in text
@@ -0,0 +1,43 @@
+import collections
+import time
+
+from utils.profiling import SamplingProfiler, SlowRequestRecorder
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_tracked_thread_is_sampled_after_the_profiler_went_idle():
+    profiler = SamplingProfiler(interval=0.001).start()
+    for _ in range(10):
+        time.sleep(0.002)  # let the sampler go back to waiting
+        samples = profiler.track()
+        # long enough for the sampler to get the GIL when other threads compete
+        busy(0.05)
+        profiler.untrack()
+        assert sum(samples.values()) > 0
+
+
+def test_process_wide_stacks_are_capped():
+    profiler = SamplingProfiler(max_stacks=10)
+    samples = collections.Counter()
+    for _ in range(5):
+        profiler._record(samples, ("app.py:hot:1",))
+    for i in range(100):
+        profiler._record(samples, (f"app.py:cold:{i}",))
+    assert len(profiler._totals) <= 10
+    assert profiler._totals[("app.py:hot:1",)] == 5
+    assert len(samples) == 101  # the request's own samples are not trimmed
+
+
+def test_slow_request_recorder_is_bounded():
+    recorder = SlowRequestRecorder(threshold_ms=1, capacity=3)
+    for i in range(5):
+        recorder.record(10.0 + i, {"i": i}, {("a",): 1}, 0.005)
+    records = recorder.list()
+    assert [r["metadata"]["i"] for r in records] == [2, 3, 4]
+    assert recorder.get(records[0]["id"]) is records[0]
+    assert recorder.get(1) is None
@@ -0,0 +1,69 @@
+import threading
+
+import numpy as np
+import pytest
+
+from inference.runtime import BatchingRuntime
+
+
+@pytest.fixture
+def runtime():
+    runtime = BatchingRuntime(workers=2, max_batch_size=4, max_wait_ms=20)
+    yield runtime
+    runtime.close()
+
+
+def test_concurrent_requests_are_batched_in_order(runtime):
+    batch_sizes = []
+
+    def double(batch):
+        batch_sizes.append(len(batch))
+        return batch * 2
+
+    runtime.register("double", double)
+    futures = [runtime.submit("double", np.array([i])) for i in range(8)]
+    assert [int(f.result(timeout=5)[0]) for f in futures] == [2 * i for i in range(8)]
+    assert max(batch_sizes) > 1
+    assert max(batch_sizes) <= 4
+
+
+def test_model_errors_reach_every_request_of_the_batch(runtime):
+    def fail(batch):
+        raise ValueError("bad model")
+
+    runtime.register("fail", fail)
+    futures = [runtime.submit("fail", np.zeros(1)) for _ in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError, match="bad model"):
+            future.result(timeout=5)
+
+
+def test_short_output_fails_the_batch_instead_of_hanging(runtime):
+    runtime.register("short", lambda batch: batch[:1])
+    futures = [runtime.submit("short", np.zeros(1)) for _ in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="outputs"):
+            future.result(timeout=5)
+
+
+def test_lanes_share_the_workers(runtime):
+    runtime.register("a", lambda batch: batch + 1)
+    runtime.register("b", lambda batch: batch - 1)
+    results = {}
+
+    def call(name, value):
+        results[(name, value)] = float(runtime.predict(name, np.array([value]), timeout=5)[0])
+
+    threads = [threading.Thread(target=call, args=(name, v)) for name in "ab" for v in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {**{("a", v): v + 1.0 for v in range(5)}, **{("b", v): v - 1.0 for v in range(5)}}
+
+
+def test_submit_after_close_raises():
+    runtime = BatchingRuntime(workers=1)
+    runtime.close()
+    with pytest.raises(RuntimeError):
+        runtime.submit("any", np.zeros(1))
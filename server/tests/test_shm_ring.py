@@ -0,0 +1,100 @@
+import threading
+import time
+from multiprocessing import get_context
+
+import numpy as np
+import pytest
+
+from inference import shm_ring
+from inference.shm_ring import FREE, MAX_OUTPUTS, Ring, RingClient
+
+
+def ok(batch):
+    return np.tile(np.array([0.1, 0.9], np.float32), (len(batch), 1))
+
+
+def broken(batch):
+    raise ValueError("boom")
+
+
+LANES = {
+    "ok": ok,
+    "broken": broken,
+    "flat": lambda batch: np.zeros(len(batch), np.float32),
+    "short": lambda batch: ok(batch)[:-1],
+    "wide": lambda batch: np.zeros((len(batch), MAX_OUTPUTS + 1), np.float32),
+    "slow": lambda batch: (time.sleep(0.3), ok(batch))[1],
+}
+
+
+@pytest.fixture
+def ring(monkeypatch):
+    monkeypatch.setattr(shm_ring, "load_lanes", lambda lanes: LANES)
+    ring = Ring(slots=4, lanes=list(LANES), context=get_context("fork"))
+    owner = threading.Thread(target=shm_ring.serve, args=(ring, {}), kwargs={"max_wait_ms": 1.0}, daemon=True)
+    owner.start()
+    assert ring.ready.wait(5)
+    yield ring
+    ring.stopping.set()
+    owner.join(5)
+    ring.close(unlink=True)
+
+
+def all_free(ring, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with ring.lock:
+            if (ring.layout.states == FREE).all():
+                return True
+        time.sleep(0.01)
+    return False
+
+
+def test_batch_round_trip(ring):
+    client = RingClient(ring, timeout=5)
+    outputs = client.predict_many("ok", np.zeros((3,) + shm_ring.IMAGE_SHAPE, np.uint8))
+    assert outputs.shape == (3, 2)
+    np.testing.assert_allclose(outputs[0], [0.1, 0.9])
+    assert client.predict("ok", np.zeros(shm_ring.IMAGE_SHAPE, np.float32)).shape == (2,)
+    assert all_free(ring)
+
+
+@pytest.mark.parametrize("lane", ["broken", "flat", "short", "wide"])
+def test_failed_or_misshapen_outputs_raise_and_free_the_slots(ring, lane):
+    client = RingClient(ring, timeout=5)
+    with pytest.raises(RuntimeError):
+        client.predict_many(lane, np.zeros((2,) + shm_ring.IMAGE_SHAPE, np.uint8))
+    assert all_free(ring)
+    # the ring still works afterwards
+    assert client.predict_many("ok", np.zeros((4,) + shm_ring.IMAGE_SHAPE, np.uint8)).shape == (4, 2)
+
+
+def test_timed_out_slots_are_reclaimed(ring):
+    client = RingClient(ring, timeout=0.05)
+    with pytest.raises(TimeoutError):
+        client.predict("slow", np.zeros(shm_ring.IMAGE_SHAPE, np.uint8))
+    assert all_free(ring)
+
+
+def test_dead_owner_fails_fast():
+    # no serve() loop: the owner never answers
+    ring = Ring(slots=2, lanes=["ok"], context=get_context("fork"))
+    alive = threading.Event()
+    alive.set()
+    client = RingClient(ring, timeout=30, alive=alive.is_set)
+    threading.Timer(0.2, alive.clear).start()
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="not running"):
+        client.predict("ok", np.zeros(shm_ring.IMAGE_SHAPE, np.uint8))
+    assert time.monotonic() - start < 2 * shm_ring.LIVENESS_INTERVAL + 0.5
+    with pytest.raises(RuntimeError, match="not running"):
+        client.predict("ok", np.zeros(shm_ring.IMAGE_SHAPE, np.uint8))
+    ring.close(unlink=True)
+
+
+def test_pid_liveness():
+    process = get_context("fork").Process(target=time.sleep, args=(0,))
+    process.start()
+    assert shm_ring._pid_alive(process.pid) or process.exitcode is not None
+    process.join(5)
+    assert not shm_ring._pid_alive(process.pid)
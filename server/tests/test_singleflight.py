@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from utils.singleflight import SingleFlight, content_key
+
+
+def test_content_key_is_canonical():
+    assert content_key({"a": 1, "b": 2}) == content_key({"b": 2, "a": 1})
+    assert content_key(b"abc") != content_key("abc")
+    # parts are length-prefixed, so boundaries matter
+    assert content_key(b"ab", b"c") != content_key(b"a", b"bc")
+
+
+def run_concurrently(flight, key, fn, callers):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        release.wait(5)
+        return {"answer": 42}
+
+    threads, results, errors = run_concurrently(flight, "k", work, 8)
+    while flight.stats()["executed"] + flight.stats()["coalesced"] < 8:
+        time.sleep(0.001)
+    assert flight.in_flight("k")
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert runs == [1] and errors == []
+    assert [r[0] for r in results] == [{"answer": 42}] * 8
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert flight.stats() == {"executed": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def work():
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    threads, results, errors = run_concurrently(flight, "k", work, 4)
+    while flight.stats()["executed"] + flight.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert results == []
+    assert len(errors) == 4 and all(isinstance(e, ValueError) for e in errors)
+    assert not flight.in_flight("k")
+
+
+def test_later_calls_run_again():
+    flight = SingleFlight()
+    assert flight.do("k", lambda: 1) == (1, False)
+    assert flight.do("k", lambda: 2) == (2, False)
+    with pytest.raises(KeyError):
+        flight.do("k", lambda: {}["missing"])
+    assert flight.do("k", lambda: 3) == (3, False)
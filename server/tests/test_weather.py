@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from utils.cache import FRESH, MISS, STALE, TTLCache
+from utils.weather import OpenWeatherUpstream, UpstreamError, WeatherProxy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeUpstream:
+    configured = True
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.weather_calls = []
+        self.geocode_calls = []
+
+    def current_weather(self, lat, lon):
+        self.weather_calls.append((lat, lon))
+        time.sleep(self.delay)
+        if self.fail:
+            raise UpstreamError(502, "down")
+        return {"main": {"temp": 21.5}, "coord": {"lat": lat, "lon": lon}}
+
+    def geocode(self, query):
+        self.geocode_calls.append(query)
+        return [{"name": query, "lat": 13.08, "lon": 80.27}]
+
+
+def test_ttl_cache_fresh_stale_and_expired():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, stale_ttl=5, clock=clock)
+    cache.set("k", 1)
+    assert cache.get("k") == (1, FRESH)
+    clock.now = 12
+    assert cache.get("k") == (1, STALE)
+    clock.now = 16
+    assert cache.get("k") == (None, MISS)
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl=10, max_entries=2, clock=FakeClock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") == (None, MISS)
+    assert cache.get("a") == (1, FRESH)
+
+
+def test_nearby_coordinates_share_a_cache_entry():
+    upstream = FakeUpstream()
+    proxy = WeatherProxy(upstream, precision=2)
+    proxy.current_weather(13.0812, 80.2714)
+    proxy.current_weather(13.0788, 80.2689)
+    assert upstream.weather_calls == [(13.08, 80.27)]
+    assert proxy.stats()["fresh_hits"] == 1
+
+
+def test_concurrent_misses_are_coalesced():
+    upstream = FakeUpstream(delay=0.1)
+    proxy = WeatherProxy(upstream)
+    threads = [threading.Thread(target=proxy.current_weather, args=(10.0, 78.0)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(upstream.weather_calls) == 1
+    assert proxy.stats()["coalesced"] == 7
+
+
+def test_place_names_are_normalized_for_geocoding():
+    upstream = FakeUpstream()
+    proxy = WeatherProxy(upstream)
+    proxy.geocode("Chennai , Tamil  Nadu")
+    proxy.geocode("chennai,tamil nadu")
+    assert upstream.geocode_calls == ["chennai,tamil nadu"]
+
+
+def test_upstream_errors_are_not_cached():
+    upstream = FakeUpstream(fail=True)
+    proxy = WeatherProxy(upstream)
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            proxy.current_weather(1, 2)
+    assert len(upstream.weather_calls) == 2
+    assert proxy.stats()["upstream_errors"] == 2
+
+
+def test_temperature_for_coordinates_does_not_geocode():
+    upstream = FakeUpstream()
+    proxy = WeatherProxy(upstream)
+    assert proxy.temperature_for(13.08, 80.27) == 21.5
+    assert upstream.geocode_calls == []
+
+
+def test_missing_api_key_answers_503_without_calling_upstream():
+    upstream = OpenWeatherUpstream("http://127.0.0.1:9", None)
+    proxy = WeatherProxy(upstream)
+    assert not proxy.configured
+    with pytest.raises(UpstreamError) as error:
+        proxy.current_weather(1, 2)
+    assert error.value.status == 503
+
+
+def test_recommend_plants_skips_weather_without_a_key(monkeypatch, capsys):
+    from routes import recommendation
+
+    upstream = FakeUpstream()
+    upstream.configured = False
+    monkeypatch.setattr(recommendation.weather_proxy, "upstream", upstream)
+    app = Flask(__name__)
+    app.register_blueprint(recommendation.recommendation_bp)
+    response = app.test_client().post("/api/recommend-plants", json={
+        "soil_type": "Loamy", "location": "Nowhere Village", "temperature": 22})
+    assert response.status_code == 200
+    assert response.get_json()["temperature_source"] == "client"
+    assert upstream.geocode_calls == [] and upstream.weather_calls == []
+    assert "failed" not in capsys.readouterr().out
+
+
+def test_recommend_plants_geocodes_a_place_once(monkeypatch):
+    from routes import recommendation
+
+    upstream = FakeUpstream()
+    monkeypatch.setattr(recommendation.weather_proxy, "upstream", upstream)
+    monkeypatch.setattr(recommendation, "gazetteer", None)
+    monkeypatch.setattr(recommendation, "climatology", None)
+    app = Flask(__name__)
+    app.register_blueprint(recommendation.recommendation_bp)
+    response = app.test_client().post("/api/recommend-plants", json={
+        "soil_type": "Loamy", "location": "Somewhere Unique 31", "temperature": 22})
+    body = response.get_json()
+    assert body["temperature_source"] == "weather"
+    assert upstream.geocode_calls == ["somewhere unique 31"]
+    assert len(upstream.weather_calls) == 1
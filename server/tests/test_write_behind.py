@@ -0,0 +1,112 @@
+import io
+import threading
+
+from PIL import Image
+
+from utils.blob_store import BlobStore
+from utils.history import PredictionHistory
+from utils.write_behind import WriteBehindBuffer
+
+
+class Recorder:
+    def __init__(self, fail_times=0):
+        self.batches = []
+        self.fail_times = fail_times
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, batch):
+        self.release.wait(5)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("database down")
+        self.batches.append(list(batch))
+
+
+def test_items_are_written_in_batches():
+    writer = Recorder()
+    buffer = WriteBehindBuffer("test_batches", writer, max_batch=3, flush_interval=0.01)
+    for i in range(7):
+        assert buffer.put(i)
+    assert buffer.flush(5)
+    assert [item for batch in writer.batches for item in batch] == list(range(7))
+    assert max(len(batch) for batch in writer.batches) <= 3
+    assert buffer.stats()["written"] == 7
+
+
+def test_failed_batches_are_retried():
+    writer = Recorder(fail_times=2)
+    buffer = WriteBehindBuffer("test_retry", writer, flush_interval=0.01, max_backoff=0.02)
+    buffer.put("a")
+    assert buffer.flush(5)
+    assert writer.batches == [["a"]]
+    assert buffer.stats()["failed_batches"] == 2
+
+
+def test_items_beyond_max_pending_are_dropped():
+    writer = Recorder()
+    writer.release.clear()
+    buffer = WriteBehindBuffer("test_count", writer, max_batch=1, flush_interval=0.01, max_pending=2)
+    results = [buffer.put(i) for i in range(5)]
+    assert results[:2] == [True, True] and not all(results)
+    writer.release.set()
+    assert buffer.flush(5)
+    assert buffer.stats()["dropped"] == results.count(False)
+
+
+def test_pending_bytes_are_bounded():
+    writer = Recorder()
+    writer.release.clear()
+    buffer = WriteBehindBuffer("test_bytes", writer, max_batch=10, flush_interval=0.01,
+                               max_pending_bytes=250, size_fn=len)
+    assert buffer.put(b"x" * 100)
+    assert buffer.put(b"x" * 100)
+    assert not buffer.put(b"x" * 100)
+    assert buffer.put(b"x" * 50)
+    assert buffer.stats()["pending_bytes"] == 250
+    writer.release.set()
+    assert buffer.flush(5)
+    # written items no longer count against the bound
+    assert buffer.stats()["pending_bytes"] == 0
+    assert buffer.put(b"x" * 200)
+    assert buffer.flush(5)
+
+
+class FakePredictions:
+    def __init__(self):
+        self.records = []
+
+    def ensure_indexes(self):
+        pass
+
+    def insert_many(self, records):
+        self.records.extend(records)
+
+
+def jpeg(color):
+    out = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(out, format="JPEG")
+    return out.getvalue()
+
+
+def test_history_stores_each_image_once(tmp_path):
+    predictions = FakePredictions()
+    history = PredictionHistory(predictions, BlobStore(str(tmp_path)), flush_interval=0.01)
+    image = jpeg("green")
+    for _ in range(3):
+        assert history.record(image, "farmer", "/api/detect-disease", {"disease": "Leaf Blight", "confidence": 91.0})
+    assert history.record(jpeg("red"), None, "/api/detect-disease", {"disease": "Healthy", "confidence": 99.0})
+    assert history.buffer.flush(5)
+
+    assert len(predictions.records) == 4
+    assert len({r["image_hash"] for r in predictions.records}) == 2
+    assert all(r["image_bytes"] > 0 for r in predictions.records)
+    assert history.blobs.stats()["blobs"] == 2
+
+
+def test_history_drops_uploads_beyond_the_byte_bound(tmp_path):
+    predictions = FakePredictions()
+    history = PredictionHistory(predictions, BlobStore(str(tmp_path)), flush_interval=0.01,
+                                max_pending_bytes=1000)
+    assert not history.record(b"x" * 2000, "farmer", "/api/detect-disease", {"disease": "Healthy"})
+    assert history.buffer.stats()["dropped"] == 1
@@ -0,0 +1,365 @@
+"""
+Active learning: keep the field images the disease model is least sure about.
+
+offer() is called on the request path with the prediction's probabilities.
+It scores the prediction and, if the score reaches min_score, appends the
+upload to a write-behind buffer. It never blocks. Scores are in [0, 1]:
+
+    margin   1 - (top probability - second probability)   (default)
+    entropy  entropy of the probabilities / log(number of classes)
+
+The buffer's thread de-duplicates and stores the candidates. Exact copies
+(same SHA-256) and near-duplicates (64-bit difference hash within
+dedup_distance bits, e.g. the same leaf photographed twice) are stored
+once, keeping the higher score. Each candidate is kept in a bounded priority
+queue of `capacity` unlabeled images; once the queue is full, a new image
+replaces the least informative one only if it scores higher.
+
+Images live in a BlobStore under root/blobs and each item is a small JSON
+file under root/items, so the queue survives restarts and every worker
+process sees the same items. Every read-modify-write of an item file holds
+the store lock (a thread lock plus an flock on root/items.lock, so request
+threads, the buffer's thread and other workers do not overwrite each other's
+changes). Each process enforces capacity only for the items it knows about.
+
+Items remember the model's class names; label() only accepts one of them.
+Labeled items are never evicted. export() moves them into the data/<class>/
+layout that collect_data.py and train_model.py use, keeping the upload's
+format (.jpg, .png...).
+"""
+
+import csv
+import heapq
+import io
+import json
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock only covers this process
+    fcntl = None
+
+import numpy as np
+from PIL import Image
+
+from utils.blob_store import BlobStore, _atomic_write, blob_hash, image_extension, image_format
+from utils.write_behind import WriteBehindBuffer
+
+STRATEGIES = ("margin", "entropy")
+HASH_BANDS = 8  # near-duplicates within HASH_BANDS - 1 bits always share a band
+
+
+def uncertainty(probabilities):
+    """(normalized entropy, margin between the two most likely classes)"""
+    p = np.clip(np.asarray(probabilities, dtype=np.float64), 1e-12, None)
+    p = p / p.sum()
+    entropy = float(-(p * np.log(p)).sum() / np.log(len(p))) if len(p) > 1 else 0.0
+    top = np.sort(p)[::-1]
+    margin = float(top[0] - top[1]) if len(p) > 1 else 1.0
+    return entropy, margin
+
+
+def dhash(data, size=8):
+    """64-bit difference hash of image bytes: which neighbouring pixels get brighter"""
+    img = Image.open(io.BytesIO(data))
+    img.draft("L", (4 * size, 4 * size))  # JPEGs decode at reduced size
+    pixels = np.asarray(img.convert("L").resize((size + 1, size), Image.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def _bands(value):
+    return [(band, (value >> (8 * band)) & 0xFF) for band in range(HASH_BANDS)]
+
+
+def class_directory(label):
+    """Directory name for a label: lowercase, underscores, no path separators or dots"""
+    name = re.sub(r"[^\w-]+", "_", label.strip().lower()).strip("_")
+    return name or "unknown"
+
+
+class ActiveLearningQueue:
+    def __init__(self, root, capacity=1000, strategy="margin", min_score=0.3, dedup_distance=6,
+                 max_pending=200):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}; use one of {STRATEGIES}")
+        self.root = root
+        self.capacity = capacity
+        self.strategy = strategy
+        self.min_score = min_score
+        self.dedup_distance = min(dedup_distance, HASH_BANDS - 1)
+        self.blobs = BlobStore(os.path.join(root, "blobs"))
+        self.items_dir = os.path.join(root, "items")
+        self._lock = threading.Lock()
+        self._store_lock = threading.RLock()
+        self._store_depth = 0
+        os.makedirs(root, exist_ok=True)
+        self._lock_file = open(os.path.join(root, "items.lock"), "ab") if fcntl else None
+        self._scores = {}  # unlabeled item id -> score
+        self._heap = []  # (score, id), entries of replaced items are skipped
+        self._hashes = {}  # item id -> dhash
+        self._band_index = {}  # (band, byte) -> item ids
+        for item in self.items():
+            if item["label"] is None:
+                self._track(item)
+        self.buffer = WriteBehindBuffer("active_learning", self._process, max_batch=32,
+                                        flush_interval=1.0, max_pending=max_pending)
+
+    def score(self, probabilities):
+        entropy, margin = uncertainty(probabilities)
+        return entropy if self.strategy == "entropy" else 1.0 - margin
+
+    def offer(self, data, probabilities, class_names, model_version=None, username=None):
+        """Queue a prediction for labeling if it is uncertain enough; returns True if queued"""
+        score = self.score(probabilities)
+        if score < self.min_score:
+            return False
+        top = np.argsort(probabilities)[::-1][:3]
+        return self.buffer.put((data, {
+            "score": round(score, 4),
+            "strategy": self.strategy,
+            "predictions": [{"class": class_names[i], "probability": round(float(probabilities[i]), 4)} for i in top],
+            "classes": list(class_names),
+            "model_version": model_version,
+            "username": username,
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        }))
+
+    @contextmanager
+    def _locked(self):
+        """Store lock around a read-modify-write of item files; reentrant within a thread"""
+        with self._store_lock:
+            self._store_depth += 1
+            try:
+                if self._store_depth == 1 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                yield
+            finally:
+                if self._store_depth == 1 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                self._store_depth -= 1
+
+    def _process(self, batch):
+        for data, record in batch:
+            digest = blob_hash(data)
+            try:
+                value = dhash(data)
+            except Exception as e:
+                print(f"Active learning: cannot read image {digest}: {e}")
+                continue
+            with self._locked():
+                self._store(data, record, digest, value)
+
+    def _store(self, data, record, digest, value):
+        existing = self.get(digest)
+        if existing is not None:
+            # exact re-upload: count it and keep the higher score
+            existing["uploads"] += 1
+            if existing["label"] is None and record["score"] > existing["score"]:
+                existing.update(record, uploads=existing["uploads"])
+                self._track(existing)
+            self._save(existing)
+            return
+        duplicate = self._near_duplicate(value)
+        if duplicate is not None:
+            if record["score"] <= self._scores[duplicate]:
+                self._bump(duplicate)
+                return
+            self._remove(duplicate)
+        if len(self._scores) >= self.capacity and not self._make_room(record["score"]):
+            return
+        self.blobs.put(data, digest)
+        self.blobs.put_thumbnail(digest, data)
+        item = dict(record, id=digest, dhash=format(value, "016x"), uploads=1, label=None, labeled_at=None)
+        self._save(item)
+        self._track(item)
+
+    def _track(self, item):
+        with self._lock:
+            value = int(item["dhash"], 16)
+            self._scores[item["id"]] = item["score"]
+            self._hashes[item["id"]] = value
+            heapq.heappush(self._heap, (item["score"], item["id"]))
+            for key in _bands(value):
+                self._band_index.setdefault(key, set()).add(item["id"])
+            if len(self._heap) > 2 * max(self.capacity, len(self._scores)):
+                self._heap = [(score, item_id) for item_id, score in self._scores.items()]
+                heapq.heapify(self._heap)
+
+    def _untrack(self, item_id):
+        with self._lock:
+            self._scores.pop(item_id, None)
+            value = self._hashes.pop(item_id, None)
+            if value is not None:
+                for key in _bands(value):
+                    self._band_index.get(key, set()).discard(item_id)
+
+    def _near_duplicate(self, value):
+        """Closest tracked item within dedup_distance bits, or None"""
+        with self._lock:
+            candidates = set()
+            for key in _bands(value):
+                candidates |= self._band_index.get(key, set())
+            best, best_distance = None, self.dedup_distance + 1
+            for item_id in candidates:
+                distance = (self._hashes[item_id] ^ value).bit_count()
+                if distance < best_distance:
+                    best, best_distance = item_id, distance
+            return best
+
+    def _make_room(self, score):
+        """Evict the lowest-scoring unlabeled item if score beats it; False if the queue keeps it"""
+        while self._heap:
+            lowest, item_id = self._heap[0]
+            if self._scores.get(item_id) != lowest:
+                heapq.heappop(self._heap)  # replaced or removed
+                continue
+            item = self.get(item_id)
+            if item is None or item["label"] is not None:
+                # labeled or exported by another worker: not an eviction candidate
+                heapq.heappop(self._heap)
+                self._untrack(item_id)
+                continue
+            if score <= lowest:
+                return False
+            heapq.heappop(self._heap)
+            self._remove(item_id)
+            return True
+        return True
+
+    def _bump(self, item_id):
+        item = self.get(item_id)
+        if item is not None:
+            item["uploads"] += 1
+            self._save(item)
+
+    def _remove(self, item_id):
+        self._untrack(item_id)
+        try:
+            os.remove(self._item_path(item_id))
+        except (FileNotFoundError, ValueError):
+            pass
+        self.blobs.delete(item_id)
+
+    def _item_path(self, item_id):
+        return os.path.join(self.items_dir, os.path.basename(self.blobs.path(item_id)) + ".json")
+
+    def _save(self, item):
+        _atomic_write(self._item_path(item["id"]), json.dumps(item).encode())
+
+    def get(self, item_id):
+        try:
+            with open(self._item_path(item_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def items(self):
+        if not os.path.isdir(self.items_dir):
+            return []
+        items = []
+        for name in os.listdir(self.items_dir):
+            if name.endswith(".json"):
+                item = self.get(name[:-len(".json")])
+                if item is not None:
+                    items.append(item)
+        return items
+
+    def pending(self, limit=50):
+        """Unlabeled items, most informative first"""
+        items = [item for item in self.items() if item["label"] is None]
+        return sorted(items, key=lambda item: (-item["score"], item["created_at"]))[:limit]
+
+    def label(self, item_id, label):
+        """
+        Set an item's label; None discards the item. Returns False if it does
+        not exist; ValueError unless label is one of the item's class names
+        (case-insensitive)
+        """
+        with self._locked():
+            item = self.get(item_id)
+            if item is None:
+                return False
+            if label is None:
+                self._remove(item_id)
+                return True
+            label = self._class_name(item, label)
+            item.update(label=label, labeled_at=datetime.utcnow().isoformat(timespec="seconds"))
+            self._save(item)
+        self._untrack(item_id)
+        return True
+
+    @staticmethod
+    def _class_name(item, label):
+        classes = item.get("classes")
+        if classes is None:
+            # queued before class names were recorded
+            return label
+        matches = [name for name in classes if name.lower() == label.strip().lower()]
+        if not matches:
+            raise ValueError(f"Unknown label {label!r}; expected one of {', '.join(classes)}")
+        return matches[0]
+
+    def export(self, out_dir, class_dir=None):
+        """
+        Move labeled images into out_dir/<class>/<hash>.<ext> (.jpg, .png... as
+        uploaded) and append them to
+        out_dir/active_learning_manifest.csv; exported items leave the queue
+        """
+        class_dir = class_dir or class_directory
+        counts = {"exported": 0, "skipped": 0, "missing": 0}
+        manifest_path = os.path.join(out_dir, "active_learning_manifest.csv")
+        os.makedirs(out_dir, exist_ok=True)
+        new_manifest = not os.path.exists(manifest_path)
+        with open(manifest_path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_manifest:
+                writer.writerow(["image_hash", "label", "predicted", "score", "strategy", "model_version",
+                                 "created_at", "labeled_at", "path"])
+            for item in self.items():
+                if item["label"] is not None:
+                    with self._locked():
+                        self._export_item(item["id"], out_dir, class_dir, writer, counts)
+        return counts
+
+    def _export_item(self, item_id, out_dir, class_dir, writer, counts):
+        item = self.get(item_id)  # re-read under the lock
+        if item is None or item["label"] is None:
+            return
+        source = self.blobs.path(item["id"])
+        fmt = image_format(source)
+        if fmt is None:
+            counts["missing"] += 1
+            return
+        target_dir = os.path.join(out_dir, class_dir(item["label"]))
+        target = os.path.join(target_dir, item["id"] + image_extension(fmt))
+        if os.path.exists(target):
+            counts["skipped"] += 1
+        else:
+            os.makedirs(target_dir, exist_ok=True)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copyfile(source, target)
+            writer.writerow([item["id"], item["label"], item["predictions"][0]["class"], item["score"],
+                             item["strategy"], item.get("model_version"), item["created_at"],
+                             item["labeled_at"], target])
+            counts["exported"] += 1
+        self._remove(item["id"])
+
+    def stats(self):
+        items = self.items()
+        labeled = sum(item["label"] is not None for item in items)
+        return {
+            "unlabeled": len(items) - labeled,
+            "labeled": labeled,
+            "capacity": self.capacity,
+            "strategy": self.strategy,
+            "min_score": self.min_score,
+            "buffer": self.buffer.stats(),
+        }
@@ -0,0 +1,22 @@
+"""
+Access check for the /admin endpoints (profiling, admission control, active
+learning).
+"""
+
+import os
+
+from flask import abort, request
+
+
+def require_admin():
+    """
+    abort(403) unless the request carries X-Admin-Token matching ADMIN_TOKEN,
+    or, when no token is configured, comes from localhost
+    """
+    token = os.getenv("ADMIN_TOKEN")
+    if token:
+        if request.headers.get("X-Admin-Token") != token:
+            abort(403)
+    elif request.remote_addr not in ("127.0.0.1", "::1"):
+        # without a token the admin endpoints are only reachable locally
+        abort(403)
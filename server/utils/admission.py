@@ -0,0 +1,177 @@
+"""
+Admission control and load shedding for expensive routes.
+
+Each limited route gets an AdaptiveLimiter: at most `limit` requests run at
+once, up to `max_queue` more wait for a slot for at most `queue_timeout`
+seconds, and everything beyond that is rejected straight away with 503 and a
+Retry-After header. Routes without a limiter are never queued, so cheap
+endpoints stay fast while the model is saturated.
+
+The limit adapts AIMD-style to the observed latency of the route: every
+request that finishes within `target_latency` raises it by 1/limit (about +1
+per limit's worth of requests), a slower one cuts it by `backoff`, at most
+once per `target_latency` so one burst of slow requests is not punished
+repeatedly.
+
+Limiters belong to the app they were installed on (app.extensions["admission"]);
+the admission_* gauges are labelled by app name and route.
+"""
+
+import math
+import os
+import threading
+import time
+import weakref
+
+from flask import g, jsonify, request
+
+from utils.metrics import REGISTRY
+from utils.admin import require_admin
+
+ADMISSION_REJECTED = REGISTRY.counter(
+    "admission_rejected_total", "Requests shed by admission control", ("app", "route", "reason"))
+
+_apps = weakref.WeakSet()
+
+
+class Rejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    def __init__(self, name, initial_limit=4, min_limit=1, max_limit=64, max_queue=16,
+                 queue_timeout=2.0, target_latency=1.0, backoff=0.75, clock=time.monotonic):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self._clock = clock
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self._last_decrease = float("-inf")
+        self._avg_latency = target_latency
+
+    def acquire(self):
+        """Block until a slot is free; raises Rejected when the queue is full or the wait times out"""
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            if self.waiting >= self.max_queue:
+                raise Rejected("queue_full", self._retry_after())
+            self.waiting += 1
+            try:
+                deadline = self._clock() + self.queue_timeout
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        raise Rejected("queue_timeout", self._retry_after())
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self, latency):
+        """Free a slot and adapt the limit to the request's latency in seconds"""
+        with self._cond:
+            self.in_flight -= 1
+            self._avg_latency += 0.1 * (latency - self._avg_latency)
+            if latency <= self.target_latency:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            else:
+                now = self._clock()
+                if now - self._last_decrease >= self.target_latency:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_decrease = now
+            self._cond.notify_all()
+
+    def load(self):
+        """Admitted plus queued requests per slot of the current limit; above 1 means requests wait"""
+        with self._cond:
+            return (self.in_flight + self.waiting) / max(int(self.limit), 1)
+
+    def stats(self):
+        with self._cond:
+            return {"limit": round(self.limit, 2), "in_flight": self.in_flight, "waiting": self.waiting,
+                    "avg_latency_ms": round(self._avg_latency * 1000.0, 1)}
+
+    def _retry_after(self):
+        # time for the current queue to drain at the current concurrency
+        drain = self._avg_latency * (self.waiting + self.in_flight + 1) / max(int(self.limit), 1)
+        return max(1, math.ceil(drain))
+
+
+def _limiter_gauge(field):
+    return lambda: {(app.name, limiter.name): limiter.stats()[field]
+                    for app in list(_apps) for limiter in app.extensions.get("admission", {}).values()}
+
+
+REGISTRY.gauge("admission_limit", "Current adaptive concurrency limit", _limiter_gauge("limit"), ("app", "route"))
+REGISTRY.gauge("admission_in_flight", "Admitted requests running", _limiter_gauge("in_flight"), ("app", "route"))
+REGISTRY.gauge("admission_waiting", "Requests queued for a slot", _limiter_gauge("waiting"), ("app", "route"))
+
+
+def init_admission(app, routes, enabled=None, target_ms=None, max_queue=None, queue_timeout_ms=None):
+    """
+    Put an AdaptiveLimiter in front of each route path in routes, a dict of
+    path -> initial limit. Defaults come from ADMISSION_ENABLED (on),
+    ADMISSION_TARGET_MS (1000), ADMISSION_MAX_QUEUE (16) and
+    ADMISSION_QUEUE_TIMEOUT_MS (2000).
+    """
+    if enabled is None:
+        enabled = os.getenv("ADMISSION_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+    if not enabled:
+        return {}
+    if target_ms is None:
+        target_ms = float(os.getenv("ADMISSION_TARGET_MS", "1000"))
+    if max_queue is None:
+        max_queue = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+    if queue_timeout_ms is None:
+        queue_timeout_ms = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000"))
+
+    limiters = {
+        path: AdaptiveLimiter(path, initial_limit=limit, max_queue=max_queue,
+                              queue_timeout=queue_timeout_ms / 1000.0, target_latency=target_ms / 1000.0)
+        for path, limit in routes.items()
+    }
+
+    @app.before_request
+    def _admit():
+        rule = request.url_rule
+        limiter = limiters.get(rule.rule) if rule is not None else None
+        if limiter is None or request.method == "OPTIONS":
+            return None
+        try:
+            limiter.acquire()
+        except Rejected as e:
+            ADMISSION_REJECTED.labels(app.name, limiter.name, e.reason).inc()
+            response = jsonify({"error": "Server is busy, please retry shortly"})
+            response.status_code = 503
+            response.headers["Retry-After"] = str(e.retry_after)
+            return response
+        g._admission = (limiter, time.perf_counter())
+        return None
+
+    @app.teardown_request
+    def _release(exc):
+        admitted = g.pop("_admission", None)
+        if admitted is not None:
+            limiter, start = admitted
+            limiter.release(time.perf_counter() - start)
+
+    def admission_stats():
+        require_admin()
+        return jsonify({path: limiter.stats() for path, limiter in limiters.items()})
+
+    app.add_url_rule("/admin/admission", "admission_stats", admission_stats, methods=["GET"])
+    app.extensions["admission"] = limiters
+    _apps.add(app)
+    return limiters
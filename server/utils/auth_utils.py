@@ -1,6 +1,6 @@
 import jwt
 from datetime import datetime, timedelta
-from config import JWT_SECRET
+from config import JWT_SECRET, REFRESH_TOKEN_DAYS
 
 def generate_token(username):
     payload = {
@@ -11,6 +11,29 @@ def generate_token(username):
 
 def decode_token(token):
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
     except jwt.ExpiredSignatureError:
         return None
+    # a refresh token is not an access token
+    return None if payload.get("type") == "refresh" else payload
+
+def generate_refresh_token(username, version):
+    """
+    Long-lived token for /api/token/refresh. version is the user's
+    token_version; incrementing it revokes every refresh token issued before
+    """
+    payload = {
+        "username": username,
+        "type": "refresh",
+        "ver": version,
+        "exp": datetime.utcnow() + timedelta(days=REFRESH_TOKEN_DAYS)
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+
+def decode_refresh_token(token):
+    """Payload of a valid, unexpired refresh token, or None"""
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        return None
+    return payload if payload.get("type") == "refresh" else None
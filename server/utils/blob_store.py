@@ -0,0 +1,176 @@
+"""
+Content-addressed store for uploaded images.
+
+Every blob is stored once under the SHA-256 of its bytes, in two levels of
+shard directories (objects/ab/cd/abcd...), so re-uploads of the same photo
+take no extra space and no directory grows past a few hundred entries. A
+small JPEG thumbnail is kept next to it under thumbs/ for the history UI.
+
+Writes go to a temporary file in the target directory and are renamed into
+place, so readers never see partial blobs and concurrent writers of the same
+content are harmless.
+"""
+
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+
+from PIL import Image
+
+THUMB_SIZE = 256
+THUMB_QUALITY = 80
+IMAGE_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif", "BMP": ".bmp", "TIFF": ".tif"}
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+def blob_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def image_format(path):
+    """Pillow format of the image file at path ("JPEG", "PNG"...), or None if it is not a readable image"""
+    try:
+        with Image.open(path) as img:  # reads the header only
+            return img.format
+    except Exception:
+        return None
+
+
+def image_extension(image_format):
+    return IMAGE_EXTENSIONS.get(image_format, "." + image_format.lower())
+
+
+class BlobStore:
+    def __init__(self, root, thumb_size=THUMB_SIZE):
+        self.root = root
+        self.thumb_size = thumb_size
+
+    def _path(self, kind, digest, suffix=""):
+        if not _DIGEST.match(digest):
+            raise ValueError(f"Invalid blob hash: {digest!r}")
+        return os.path.join(self.root, kind, digest[:2], digest[2:4], digest + suffix)
+
+    def path(self, digest):
+        return self._path("objects", digest)
+
+    def thumbnail_path(self, digest):
+        return self._path("thumbs", digest, ".jpg")
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def get(self, digest):
+        try:
+            with open(self.path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, data, digest=None):
+        """Store data unless already present; returns (hash, newly stored)"""
+        digest = digest or blob_hash(data)
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest, False
+        _atomic_write(path, data)
+        return digest, True
+
+    def put_thumbnail(self, digest, data):
+        """Write a JPEG thumbnail of image bytes; False if it is not a readable image"""
+        path = self.thumbnail_path(digest)
+        if os.path.exists(path):
+            return True
+        try:
+            img = Image.open(io.BytesIO(data))
+            # decode JPEGs at reduced size instead of full resolution
+            img.draft("RGB", (self.thumb_size, self.thumb_size))
+            img = img.convert("RGB")
+            img.thumbnail((self.thumb_size, self.thumb_size))
+        except Exception as e:
+            print(f"Cannot thumbnail blob {digest}: {e}")
+            return False
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=THUMB_QUALITY, optimize=True)
+        _atomic_write(path, buffer.getvalue())
+        return True
+
+    def delete(self, digest):
+        """Remove a blob and its thumbnail; returns the bytes freed"""
+        freed = 0
+        for path in (self.path(digest), self.thumbnail_path(digest)):
+            try:
+                freed += os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return freed
+
+    def __iter__(self):
+        """Hashes of all stored blobs"""
+        objects = os.path.join(self.root, "objects")
+        for directory, _, files in os.walk(objects):
+            for name in files:
+                if _DIGEST.match(name):
+                    yield name
+
+    def compact(self, referenced, grace_seconds=3600):
+        """
+        Delete blobs whose hash is not in referenced, plus thumbnails without
+        a blob and leftover temporary files. Anything modified in the last
+        grace_seconds is kept, so images whose history record is still in
+        the write-behind buffer survive. Returns counts and bytes freed.
+        """
+        cutoff = time.time() - grace_seconds
+        removed = freed = 0
+        for kind in ("objects", "thumbs"):
+            top = os.path.join(self.root, kind)
+            for directory, _, files in os.walk(top, topdown=False):
+                for name in files:
+                    path = os.path.join(directory, name)
+                    digest = name.split(".", 1)[0]
+                    if not _DIGEST.match(digest):
+                        orphan = True  # temporary file of an interrupted write
+                    elif kind == "objects":
+                        orphan = digest not in referenced
+                    else:
+                        orphan = not os.path.exists(self.path(digest))
+                    try:
+                        if orphan and os.path.getmtime(path) < cutoff:
+                            freed += os.path.getsize(path)
+                            os.remove(path)
+                            removed += kind == "objects" and name == digest
+                    except FileNotFoundError:
+                        pass
+                if directory != top and not os.listdir(directory):
+                    try:
+                        os.rmdir(directory)
+                    except OSError:
+                        pass  # a writer just created a file in it
+        return {"removed": removed, "bytes_freed": freed}
+
+    def stats(self):
+        count = size = 0
+        for digest in self:
+            count += 1
+            size += os.path.getsize(self.path(digest))
+        return {"blobs": count, "bytes": size}
+
+
+def _atomic_write(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,50 @@
+"""
+Bounded TTL cache with a stale window for stale-while-revalidate.
+
+An entry is fresh for `ttl` seconds after it is stored and may still be served
+as stale for a further `stale_ttl` seconds while a refresh runs. Least
+recently used entries are evicted once `max_entries` is reached.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class TTLCache:
+    def __init__(self, ttl, stale_ttl=0, max_entries=10000, clock=time.monotonic):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (value, FRESH | STALE | MISS)"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, MISS
+            value, stored_at = entry
+            age = now - stored_at
+            if age > self.ttl + self.stale_ttl:
+                del self._entries[key]
+                return None, MISS
+            self._entries.move_to_end(key)
+            return value, FRESH if age <= self.ttl else STALE
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,220 @@
+"""
+Offline monthly climatology (mean temperature and rainfall) on a lat/lon grid.
+
+The grid is stored as a small fixed header followed by a float32 array laid
+out [lat, lon, variable, month], so the twelve monthly values of one cell
+are contiguous. Opening maps the file read-only with np.memmap: nothing is
+read up front and worker processes share the same page cache.
+
+Build the file from a CSV with columns lat, lon, month, temperature, rainfall
+(one row per cell and month, cell centres on a regular grid):
+
+    python -m utils.climatology data/climatology.csv data/climatology.bin
+
+Cells missing from the CSV (e.g. over the ocean) are stored as NaN.
+"""
+
+import csv
+import math
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"CLIM"
+VERSION = 1
+VARIABLES = ("temperature", "rainfall")
+MONTHS = 12
+# magic, version, n_lat, n_lon, lat0, lon0, lat_step, lon_step
+HEADER = struct.Struct("<4sIIIdddd")
+HEADER_SIZE = 64
+
+
+class Climatology:
+    def __init__(self, data, lat0, lon0, lat_step, lon_step):
+        self.data = data
+        self.n_lat, self.n_lon = data.shape[:2]
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.lat_step = lat_step
+        self.lon_step = lon_step
+        # global grids wrap around the antimeridian; regional ones cover their
+        # extent plus half a cell and have no data outside it
+        self.wraps = abs(self.n_lon * lon_step - 360.0) < 1e-6
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        magic, version, n_lat, n_lon, lat0, lon0, lat_step, lon_step = HEADER.unpack_from(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} climatology file")
+        data = np.memmap(path, dtype="<f4", mode="r", offset=HEADER_SIZE,
+                         shape=(n_lat, n_lon, len(VARIABLES), MONTHS))
+        return cls(data, lat0, lon0, lat_step, lon_step)
+
+    def contains(self, lat, lon):
+        """Whether the point lies within the grid's extent (plus half a cell)"""
+        if not (math.isfinite(lat) and math.isfinite(lon)):
+            return False
+        y = (lat - self.lat0) / self.lat_step
+        if not -0.5 <= y <= self.n_lat - 0.5:
+            return False
+        if self.wraps:
+            return True
+        x = self._lon_offset(lon) / self.lon_step
+        return -0.5 <= x <= self.n_lon - 0.5
+
+    def nearest(self, lat, lon):
+        """
+        (temperature[12], rainfall[12]) of the nearest cell, or None outside
+        the grid or over missing cells
+        """
+        if not self.contains(lat, lon):
+            return None
+        i = min(max(int(round((lat - self.lat0) / self.lat_step)), 0), self.n_lat - 1)
+        j = self._lon_index(int(round(self._lon_offset(lon) / self.lon_step)))
+        cell = np.array(self.data[i, j], dtype=np.float64)
+        if np.isnan(cell).all():
+            return None
+        return cell[0], cell[1]
+
+    def interpolate(self, lat, lon):
+        """
+        Bilinear interpolation between the four surrounding cells; missing
+        cells are left out and the remaining weights renormalized. None
+        outside the grid
+        """
+        if not self.contains(lat, lon):
+            return None
+        if self.n_lat < 2 or self.n_lon < 2:
+            return self.nearest(lat, lon)
+
+        y = min(max((lat - self.lat0) / self.lat_step, 0.0), self.n_lat - 1.0)
+        i = min(int(y), self.n_lat - 2)
+        ty = y - i
+
+        x = self._lon_offset(lon) / self.lon_step
+        if not self.wraps:
+            x = min(max(x, 0.0), self.n_lon - 1.0)
+        j = math.floor(x)
+        tx = x - j
+        j0, j1 = self._lon_index(j), self._lon_index(j + 1)
+        if j0 == j1:  # clamped at the eastern edge
+            j0, tx = j0 - 1, 1.0
+
+        cells = np.array([self.data[i, j0], self.data[i, j1],
+                          self.data[i + 1, j0], self.data[i + 1, j1]], dtype=np.float64)
+        weights = np.array([(1 - ty) * (1 - tx), (1 - ty) * tx, ty * (1 - tx), ty * tx])
+        weights = np.broadcast_to(weights[:, None, None], cells.shape).copy()
+        missing = np.isnan(cells)
+        weights[missing] = 0.0
+        total = weights.sum(axis=0)
+        if not total.any():
+            return None
+        with np.errstate(invalid="ignore"):
+            values = (np.where(missing, 0.0, cells) * weights).sum(axis=0) / total
+        return values[0], values[1]
+
+    def normals(self, lat, lon, month):
+        """
+        Monthly normals at a point for the recommendation engine, or None
+        if the point is outside the data or the month has no value
+        """
+        cell = self.interpolate(lat, lon)
+        if cell is None:
+            return None
+        temperatures, rainfall = cell
+        if np.isnan(temperatures[month - 1]) or np.isnan(rainfall[month - 1]):
+            return None
+        zone = climate_zone(temperatures)
+        return {
+            "temperature": float(temperatures[month - 1]),
+            "rainfall": float(rainfall[month - 1]),
+            "annual_mean_temperature": float(np.nanmean(temperatures)),
+            # months missing from the source CSV count as their average
+            "annual_rainfall": float(np.nanmean(rainfall) * MONTHS),
+            "climate_zone": zone,
+            "season": season(lat, month, zone, rainfall),
+        }
+
+    def _lon_offset(self, lon):
+        offset = lon - self.lon0
+        return offset % 360.0 if self.wraps else offset
+
+    def _lon_index(self, j):
+        if self.wraps:
+            return j % self.n_lon
+        return min(max(j, 0), self.n_lon - 1)
+
+
+def climate_zone(temperatures):
+    """
+    Zone names used by the recommendation rules, from monthly mean
+    temperatures (loosely after Köppen: tropical when even the coldest month
+    averages 18°C or more)
+    """
+    coldest = float(np.nanmin(temperatures))
+    warmest = float(np.nanmax(temperatures))
+    if coldest >= 18:
+        return "tropical"
+    if float(np.nanmean(temperatures)) >= 15:
+        return "subtropical"
+    if coldest >= -10 and warmest >= 10:
+        return "temperate"
+    return "cold"
+
+
+def season(lat, month, zone, rainfall):
+    """
+    Wet/dry season in the tropics (by the month's share of annual rain),
+    otherwise the meteorological season for the hemisphere
+    """
+    if zone == "tropical":
+        return "wet" if rainfall[month - 1] >= np.nanmean(rainfall) else "dry"
+    seasons = ("winter", "spring", "summer", "autumn")
+    index = (month % 12) // 3
+    if lat < 0:
+        index = (index + 2) % 4
+    return seasons[index]
+
+
+def build_climatology(csv_path, out_path):
+    """Grid a lat, lon, month, temperature, rainfall CSV into a climatology file"""
+    rows = []
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            rows.append((float(row["lat"]), float(row["lon"]), int(row["month"]),
+                         float(row["temperature"]), float(row["rainfall"])))
+    if not rows:
+        raise ValueError(f"{csv_path} has no rows")
+    table = np.array(rows)
+
+    lats = np.unique(table[:, 0])
+    lons = np.unique(table[:, 1])
+    lat_step = float(np.min(np.diff(lats))) if len(lats) > 1 else 1.0
+    lon_step = float(np.min(np.diff(lons))) if len(lons) > 1 else 1.0
+    lat0, lon0 = float(lats[0]), float(lons[0])
+    n_lat = int(round((lats[-1] - lat0) / lat_step)) + 1
+    n_lon = int(round((lons[-1] - lon0) / lon_step)) + 1
+
+    grid = np.full((n_lat, n_lon, len(VARIABLES), MONTHS), np.nan, dtype="<f4")
+    i = np.rint((table[:, 0] - lat0) / lat_step).astype(int)
+    j = np.rint((table[:, 1] - lon0) / lon_step).astype(int)
+    month = table[:, 2].astype(int) - 1
+    grid[i, j, 0, month] = table[:, 3]
+    grid[i, j, 1, month] = table[:, 4]
+
+    with open(out_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, n_lat, n_lon, lat0, lon0, lat_step, lon_step)
+                .ljust(HEADER_SIZE, b"\0"))
+        grid.tofile(f)
+    return grid.shape
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m utils.climatology <input.csv> <output.bin>")
+        sys.exit(1)
+    shape = build_climatology(sys.argv[1], sys.argv[2])
+    print(f"Wrote {sys.argv[2]}: {shape[0]} x {shape[1]} cells")
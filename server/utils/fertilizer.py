@@ -0,0 +1,224 @@
+"""
+Fertilizer dose recommendations from a soil x crop table.
+
+The rules in data/fertilizer.json are compiled once at startup into NumPy
+arrays: dose[soil, crop, nutrient] (kg/ha of N, P2O5 and K2O; the crop's
+base dose times the soil factors, or a guideline dose for that pair), the
+crop pH ranges and the soil lime requirements. Per query, each nutrient's
+dose is then scaled by the soil test rating (low/medium/high) of the
+measured value, pH outside the crop's range adds lime or gypsum, and the
+nutrient doses are converted into urea, DAP (or SSP) and MOP.
+
+recommend() answers one plot with plain Python over lists extracted from the
+same arrays, in a few microseconds. recommend_many() answers many plots with
+array operations, so its cost grows linearly with the number of plots.
+"""
+
+import json
+import re
+from bisect import bisect_right
+
+import numpy as np
+
+NUTRIENTS = ("n", "p2o5", "k2o")
+RATINGS = ("low", "medium", "high")
+MEDIUM = 1
+
+
+def _key(name):
+    return " ".join(re.sub(r"[^a-z0-9]", " ", str(name).lower()).split())
+
+
+class FertilizerTables:
+    def __init__(self, rules):
+        self.soils = list(rules["soils"])
+        self.crops = list(rules["crops"])
+        self._soil_index = {_key(name): i for i, name in enumerate(self.soils)}
+        self._crop_index = {_key(name): i for i, name in enumerate(self.crops)}
+        for alias, name in rules.get("crop_aliases", {}).items():
+            self._crop_index[_key(alias)] = self.crops.index(name)
+        # exact spellings skip normalization
+        self._soil_index.update({name: i for i, name in enumerate(self.soils)})
+        self._crop_index.update({name: i for i, name in enumerate(self.crops)})
+        self._crop_index.update({alias: self.crops.index(name) for alias, name in rules.get("crop_aliases", {}).items()})
+
+        base = np.array([[rules["crops"][c][k] for k in NUTRIENTS] for c in self.crops], dtype=np.float64)
+        factors = np.array([[rules["soils"][s][k] for k in NUTRIENTS] for s in self.soils], dtype=np.float64)
+        self.dose = factors[:, None, :] * base[None, :, :]
+        self.guideline = np.zeros((len(self.soils), len(self.crops)), dtype=bool)
+        for soil, crops in rules.get("guidelines", {}).items():
+            for crop, dose in crops.items():
+                s, c = self.soils.index(soil), self.crops.index(crop)
+                self.dose[s, c] = dose
+                self.guideline[s, c] = True
+
+        self.ph_range = np.array([[rules["crops"][c]["ph_min"], rules["crops"][c]["ph_max"]] for c in self.crops])
+        self.lime_per_ph = np.array([rules["soils"][s]["lime_per_ph"] for s in self.soils])
+        soil_test = rules["soil_test"]
+        self.thresholds = np.array([soil_test[k] for k in NUTRIENTS], dtype=np.float64)
+        self.rating_factors = np.array(soil_test["factors"], dtype=np.float64)
+        self.sodic_ph = float(rules["sodic_ph"])
+        self.gypsum_per_ph = float(rules["gypsum_per_ph"])
+        self.products = dict(rules["products"])
+
+        # plain Python copies for the single-plot path
+        self._dose_rows = self.dose.tolist()
+        self._guideline_rows = self.guideline.tolist()
+        self._ph_rows = self.ph_range.tolist()
+        self._lime_list = self.lime_per_ph.tolist()
+        self._threshold_rows = self.thresholds.tolist()
+        self._factor_list = self.rating_factors.tolist()
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def soil_index(self, name):
+        index = self._soil_index.get(name)
+        return index if index is not None else self._soil_index.get(_key(name))
+
+    def crop_index(self, name):
+        index = self._crop_index.get(name)
+        return index if index is not None else self._crop_index.get(_key(name))
+
+    def recommend(self, soil_type, crop, n=None, p2o5=None, k2o=None, ph=None, area_ha=None):
+        """Recommendation for one plot; soil test values in kg/ha, or None if not measured"""
+        s, c = self.soil_index(soil_type), self.crop_index(crop)
+        if s is None:
+            raise ValueError(f"Unknown soil type: {soil_type}")
+        if c is None:
+            raise ValueError(f"Unknown crop: {crop}")
+
+        dose = list(self._dose_rows[s][c])
+        ratings = {}
+        for j, value in enumerate((n, p2o5, k2o)):
+            if value is not None:
+                level = bisect_right(self._threshold_rows[j], value)
+                dose[j] *= self._factor_list[level]
+                ratings[NUTRIENTS[j]] = RATINGS[level]
+
+        ph_min, ph_max = self._ph_rows[c]
+        lime = gypsum = 0.0
+        if ph is not None:
+            if ph < ph_min:
+                lime = (min(ph_min + 0.5, ph_max) - ph) * self._lime_list[s]
+            elif ph > self.sodic_ph:
+                gypsum = (ph - self.sodic_ph) * self.gypsum_per_ph
+
+        urea, dap, ssp, mop = self._to_products(*dose)
+        return self._result(self.soils[s], self.crops[c], self._guideline_rows[s][c], dose,
+                            (urea, dap, ssp, mop), lime, gypsum, (ph_min, ph_max), ratings, area_ha)
+
+    def _to_products(self, n, p2o5, k2o):
+        products = self.products
+        dap = p2o5 / products["dap_p2o5"]
+        ssp = 0.0
+        if dap * products["dap_n"] > n:
+            # DAP would over-supply N (legumes): phosphate from SSP instead
+            dap, ssp = 0.0, p2o5 / products["ssp_p2o5"]
+        urea = (n - dap * products["dap_n"]) / products["urea_n"]
+        return urea, dap, ssp, k2o / products["mop_k2o"]
+
+    def recommend_many(self, soil_types, crops, n=None, p2o5=None, k2o=None, ph=None, area_ha=None):
+        """
+        Recommendations for many plots as arrays. Soil test values, ph and
+        area_ha are sequences with NaN (or None) where not measured. Rows with
+        an unknown soil type or crop have known=False and NaN doses.
+        """
+        count = len(soil_types)
+        s = self._indices(soil_types, self.soil_index)
+        c = self._indices(crops, self.crop_index)
+        known = (s >= 0) & (c >= 0)
+        s, c = np.where(known, s, 0), np.where(known, c, 0)
+
+        dose = self.dose[s, c].copy()
+        measured = np.column_stack([_column(values, count) for values in (n, p2o5, k2o)])
+        levels = np.empty((count, len(NUTRIENTS)), dtype=np.intp)
+        for j in range(len(NUTRIENTS)):
+            levels[:, j] = np.searchsorted(self.thresholds[j], measured[:, j], side="right")
+        levels[np.isnan(measured)] = MEDIUM
+        dose *= self.rating_factors[levels]
+
+        ph = _column(ph, count)
+        ph_min, ph_max = self.ph_range[c, 0], self.ph_range[c, 1]
+        with np.errstate(invalid="ignore"):
+            lime = np.where(ph < ph_min, (np.minimum(ph_min + 0.5, ph_max) - ph) * self.lime_per_ph[s], 0.0)
+            gypsum = np.where(ph > self.sodic_ph, (ph - self.sodic_ph) * self.gypsum_per_ph, 0.0)
+
+        products = self.products
+        dap = dose[:, 1] / products["dap_p2o5"]
+        use_ssp = dap * products["dap_n"] > dose[:, 0]
+        ssp = np.where(use_ssp, dose[:, 1] / products["ssp_p2o5"], 0.0)
+        dap = np.where(use_ssp, 0.0, dap)
+        urea = (dose[:, 0] - dap * products["dap_n"]) / products["urea_n"]
+        mop = dose[:, 2] / products["mop_k2o"]
+
+        dose[~known] = np.nan
+        return {
+            "known": known,
+            "soil_index": s,
+            "crop_index": c,
+            "guideline": self.guideline[s, c] & known,
+            "dose": dose,
+            "products": np.where(known[:, None], np.column_stack([urea, dap, ssp, mop]), np.nan),
+            "lime": lime,
+            "gypsum": gypsum,
+            "levels": np.where(np.isnan(measured), -1, levels),
+            "area_ha": _column(area_ha, count),
+        }
+
+    def rows(self, batch):
+        """recommend_many() output as one recommend()-style dict (or None if unknown) per plot"""
+        return list(self.iter_rows(batch))
+
+    def iter_rows(self, batch):
+        """rows() one plot at a time, for streaming large batches"""
+        for i in range(len(batch["known"])):
+            if not batch["known"][i]:
+                yield None
+                continue
+            c = int(batch["crop_index"][i])
+            ratings = {NUTRIENTS[j]: RATINGS[level] for j, level in enumerate(batch["levels"][i]) if level >= 0}
+            area = batch["area_ha"][i]
+            yield self._result(
+                self.soils[batch["soil_index"][i]], self.crops[c], bool(batch["guideline"][i]),
+                batch["dose"][i].tolist(), batch["products"][i].tolist(), float(batch["lime"][i]),
+                float(batch["gypsum"][i]), self._ph_rows[c], ratings, None if np.isnan(area) else float(area))
+
+    def _result(self, soil, crop, guideline, dose, products, lime, gypsum, ph_range, ratings, area_ha):
+        result = {
+            "soil_type": soil,
+            "crop": crop,
+            "source": "guideline" if guideline else "table",
+            "dose_kg_ha": {k: round(v, 1) for k, v in zip(NUTRIENTS, dose)},
+            "products_kg_ha": {k: round(v, 1) for k, v in zip(("urea", "dap", "ssp", "mop"), products)},
+            "lime_t_ha": round(lime, 2),
+            "gypsum_t_ha": round(gypsum, 2),
+            "ph_range": list(ph_range),
+            "soil_test": ratings,
+        }
+        if area_ha is not None:
+            result["area_ha"] = area_ha
+            result["products_kg"] = {k: round(v * area_ha, 1) for k, v in result["products_kg_ha"].items()}
+        return result
+
+    @staticmethod
+    def _indices(names, lookup):
+        # one dict probe per plot; each distinct name is looked up once
+        seen = {}
+
+        def index(name):
+            i = seen.get(name)
+            if i is None:
+                i = seen[name] = -1 if lookup(name) is None else lookup(name)
+            return i
+
+        return np.fromiter((index(name) for name in names), dtype=np.intp, count=len(names))
+
+
+def _column(values, count):
+    """float64 array of count values, NaN where missing"""
+    if values is None:
+        return np.full(count, np.nan)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
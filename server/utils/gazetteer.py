@@ -0,0 +1,186 @@
+"""
+Local gazetteer for turning location strings into coordinates and climate
+zones, and coordinates back into places.
+
+Loaded from a TSV with columns name, alternate_names (comma separated), kind
+(city/state/country), state, country, lat, lon and climate_zone. Names and
+alternate names go into a dict keyed by normalized name; misspellings fall
+back to a trigram index ranked by edit distance. Reverse lookups use a grid
+of 1° cells over the cities, wrapping at the antimeridian, and search at
+most MAX_REVERSE_KM around the point.
+"""
+
+import csv
+import heapq
+import math
+import re
+import unicodedata
+from collections import namedtuple
+
+Place = namedtuple("Place", "name kind state country lat lon climate_zone")
+
+KIND_RANK = {"city": 0, "state": 1, "country": 2}
+EARTH_RADIUS_KM = 6371.0
+MAX_REVERSE_KM = 500.0
+
+
+def normalize_name(name):
+    """Lowercase ASCII name without punctuation or repeated spaces"""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^a-z0-9 ]", " ", name.lower()).split())
+
+
+def trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, or limit + 1 once it is known to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def check_coordinates(lat, lon):
+    """(lat, lon) as floats; ValueError unless both are finite and in range"""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        raise ValueError("lat and lon must be numbers")
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        raise ValueError("lat and lon must be finite")
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError("lat must be within ±90 and lon within ±180")
+    return lat, lon
+
+
+class Gazetteer:
+    def __init__(self, places, cell_degrees=1.0):
+        self.places = places
+        self.cell_degrees = cell_degrees
+        self.lon_cells = int(round(360.0 / cell_degrees))
+        self.by_name = {}
+        self.by_trigram = {}
+        self.grid = {}
+        for place, names in places:
+            for name in names:
+                self.by_name.setdefault(name, []).append(place)
+                for gram in trigrams(name):
+                    self.by_trigram.setdefault(gram, set()).add(name)
+            if place.kind == "city":
+                self.grid.setdefault(self._cell(place.lat, place.lon), []).append(place)
+        for candidates in self.by_name.values():
+            candidates.sort(key=lambda p: KIND_RANK.get(p.kind, len(KIND_RANK)))
+
+    @classmethod
+    def load(cls, path):
+        places = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f, delimiter="\t"):
+                place = Place(row["name"], row["kind"], row["state"], row["country"],
+                              float(row["lat"]), float(row["lon"]), row["climate_zone"])
+                names = [row["name"]] + [n for n in row["alternate_names"].split(",") if n.strip()]
+                places.append((place, {normalize_name(n) for n in names}))
+        return cls(places)
+
+    def lookup(self, query):
+        """
+        Best place for a free-text location such as "Madurai",
+        "Trichy, Tamil Nadu" or "Chenai", or None. Extra comma-separated
+        parts narrow down ambiguous names by state or country; if the first
+        part is unknown the next ones are tried, so "Some Village, Kerala"
+        still resolves to the state.
+        """
+        parts = [normalize_name(p) for p in query.split(",")]
+        parts = [p for p in parts if p]
+        if not parts:
+            return None
+        whole = " ".join(parts)
+        if whole in self.by_name:
+            return self.by_name[whole][0]
+
+        for index, part in enumerate(parts):
+            candidates = self.by_name.get(part) or self._fuzzy(part)
+            if candidates:
+                return self._narrow(candidates, parts[index + 1:])
+        return None
+
+    def reverse(self, lat, lon, max_km=100.0):
+        """
+        (nearest city, distance in km) within max_km (at most MAX_REVERSE_KM)
+        of the point, or None. ValueError for invalid coordinates
+        """
+        lat, lon = check_coordinates(lat, lon)
+        max_km = min(max_km, MAX_REVERSE_KM)
+        if not max_km > 0:
+            return None
+        ci, cj = self._cell(lat, lon)
+        km_per_cell = self.cell_degrees * 111.0 * max(math.cos(math.radians(min(abs(lat), 89.0))), 0.1)
+        max_ring = min(int(max_km / km_per_cell) + 1, self.lon_cells // 2)
+        best, best_km = None, float("inf")
+        for ring in range(max_ring + 1):
+            # every city beyond this ring is at least (ring - 1) cells away
+            if best is not None and (ring - 1) * km_per_cell > best_km:
+                break
+            for i, j in self._ring(ci, cj, ring):
+                for place in self.grid.get((i, j), ()):
+                    km = haversine_km(lat, lon, place.lat, place.lon)
+                    if km < best_km:
+                        best, best_km = place, km
+        if best is None or best_km > max_km:
+            return None
+        return best, best_km
+
+    def _fuzzy(self, name, max_candidates=50):
+        if len(name) < 4:
+            return None
+        counts = {}
+        for gram in trigrams(name):
+            for candidate in self.by_trigram.get(gram, ()):
+                counts[candidate] = counts.get(candidate, 0) + 1
+        limit = max(1, len(name) // 4)
+        best, best_distance = None, limit + 1
+        for candidate in heapq.nlargest(max_candidates, counts, key=counts.get):
+            distance = edit_distance(name, candidate, limit)
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+        return self.by_name[best] if best else None
+
+    def _narrow(self, candidates, qualifiers):
+        for qualifier in qualifiers:
+            matching = [p for p in candidates
+                        if qualifier in (normalize_name(p.state), normalize_name(p.country))]
+            if matching:
+                candidates = matching
+        return candidates[0]
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees) % self.lon_cells
+
+    def _ring(self, ci, cj, ring):
+        """Cells on the perimeter of the square `ring` cells around (ci, cj)"""
+        if ring == 0:
+            yield ci, cj
+            return
+        for j in range(cj - ring, cj + ring + 1):
+            yield ci - ring, j % self.lon_cells
+            yield ci + ring, j % self.lon_cells
+        for i in range(ci - ring + 1, ci + ring):
+            yield i, (cj - ring) % self.lon_cells
+            yield i, (cj + ring) % self.lon_cells
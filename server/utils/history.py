@@ -0,0 +1,160 @@
+"""
+Prediction history: every uploaded leaf image with what the model said.
+
+record() is called on the request path and only appends to a write-behind
+buffer, which holds at most max_pending uploads and max_pending_bytes of
+image data; beyond that predictions are dropped from the history. The buffer's thread hashes the upload, stores it (and a thumbnail)
+in the content-addressed BlobStore and inserts the history documents into
+the predictions collection in batches. Documents reference images by hash,
+so an image uploaded many times is stored once.
+
+With a PredictionStats model, each batch also updates the per-user daily
+rollups the statistics dashboard reads (utils/stats.py). Documents get their
+_id when recorded, so a retried batch does not insert duplicates.
+
+Retention deletes predictions older than the retention period and then
+compacts the blob store, removing images no remaining prediction refers to:
+
+    python -m utils.history prune --days 365
+    python -m utils.history stats
+"""
+
+import argparse
+import csv
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from utils.blob_store import image_extension, image_format
+from utils.stats import rollup_increments
+from utils.write_behind import WriteBehindBuffer
+
+DUPLICATE_KEY = 11000
+
+
+class PredictionHistory:
+    def __init__(self, predictions, blobs, stats=None, max_batch=100, flush_interval=1.0, max_pending=2000,
+                 max_pending_bytes=64 * 1024 * 1024):
+        self.predictions = predictions
+        self.blobs = blobs
+        self.stats = stats
+        self._indexes_ready = False
+        # pending items hold the upload bytes: bound them by size, not just count
+        self.buffer = WriteBehindBuffer("prediction_history", self._write, max_batch=max_batch,
+                                        flush_interval=flush_interval, max_pending=max_pending,
+                                        max_pending_bytes=max_pending_bytes, size_fn=lambda item: len(item[0]))
+
+    def record(self, data, username, endpoint, result, model_version=None):
+        """Queue one prediction; returns False if the buffer is full"""
+        return self.buffer.put((data, {
+            "_id": ObjectId(),
+            "username": username,
+            "endpoint": endpoint,
+            "disease": result.get("disease"),
+            "confidence": result.get("confidence"),
+            "mode": result.get("mode", "single"),
+            "model_version": model_version,
+            "created_at": datetime.utcnow(),
+        }))
+
+    def _write(self, batch):
+        if not self._indexes_ready:
+            self.predictions.ensure_indexes()
+            if self.stats is not None:
+                self.stats.ensure_indexes()
+            self._indexes_ready = True
+        records = []
+        for data, record in batch:
+            digest, created = self.blobs.put(data)
+            if created:
+                self.blobs.put_thumbnail(digest, data)
+            records.append(dict(record, image_hash=digest, image_bytes=len(data)))
+        # a retried batch may re-store blobs (put() skips existing ones) and
+        # re-insert records that made it the first time
+        try:
+            self.predictions.insert_many(records)
+        except BulkWriteError as e:
+            if any(error["code"] != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+        if self.stats is not None:
+            self.stats.apply(rollup_increments(records))
+
+    def history(self, username, limit=20, before=None):
+        return self.predictions.history(username, limit, before)
+
+    def prune(self, retention_days, grace_seconds=3600):
+        """Delete predictions older than retention_days, then unreferenced images"""
+        deleted = self.predictions.delete_older_than(datetime.utcnow() - timedelta(days=retention_days))
+        compacted = self.blobs.compact(self.predictions.image_hashes(), grace_seconds)
+        return dict(compacted, predictions_deleted=deleted)
+
+    def export(self, out_dir, since=None, min_confidence=0.0, class_dir=None):
+        """
+        Copy stored images into out_dir/<class>/<hash>.<ext> (.jpg, .png... as
+        uploaded), labelled with the predicted disease, for retraining, and append them to
+        out_dir/history_manifest.csv. Each image is exported once (under its
+        most recent label); files already present are skipped.
+        """
+        class_dir = class_dir or (lambda name: name.lower().replace(" ", "_"))
+        latest = {}
+        for record in self.predictions.for_export(since, min_confidence):
+            if record.get("disease"):
+                latest[record["image_hash"]] = record
+
+        counts = {"exported": 0, "skipped": 0, "missing": 0}
+        manifest_path = os.path.join(out_dir, "history_manifest.csv")
+        os.makedirs(out_dir, exist_ok=True)
+        new_manifest = not os.path.exists(manifest_path)
+        with open(manifest_path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_manifest:
+                writer.writerow(["image_hash", "label", "confidence", "model_version", "created_at", "path"])
+            for digest, record in latest.items():
+                source = self.blobs.path(digest)
+                fmt = image_format(source)
+                if fmt is None:
+                    counts["missing"] += 1
+                    continue
+                target_dir = os.path.join(out_dir, class_dir(record["disease"]))
+                target = os.path.join(target_dir, digest + image_extension(fmt))
+                if os.path.exists(target):
+                    counts["skipped"] += 1
+                    continue
+                os.makedirs(target_dir, exist_ok=True)
+                try:
+                    os.link(source, target)  # same filesystem: no copy
+                except OSError:
+                    shutil.copyfile(source, target)
+                writer.writerow([digest, record["disease"], record.get("confidence"),
+                                 record.get("model_version"), record["created_at"].isoformat(), target])
+                counts["exported"] += 1
+        return counts
+
+
+def main():
+    from routes.history import history
+    from config import HISTORY_RETENTION_DAYS
+
+    parser = argparse.ArgumentParser(description="Prediction history maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    prune = sub.add_parser("prune", help="Apply retention and compact the blob store")
+    prune.add_argument("--days", type=int, default=HISTORY_RETENTION_DAYS)
+    prune.add_argument("--grace", type=int, default=3600, help="Keep blobs written in the last N seconds")
+    sub.add_parser("stats", help="Blob store size")
+    args = parser.parse_args()
+
+    if history is None:
+        print("Prediction history is disabled (set MONGO_URI, HISTORY_ENABLED=1)")
+        return 1
+    if args.command == "prune":
+        print(history.prune(args.days, args.grace))
+    else:
+        print(history.blobs.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
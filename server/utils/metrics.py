@@ -0,0 +1,307 @@
+"""
+Prometheus-style metrics for the Flask apps.
+
+Counters and histograms record into per-thread shards so the request path
+never takes a lock; the shards are only summed when /metrics is scraped.
+Shards of finished threads are folded into a retired total so the werkzeug
+thread-per-request server does not grow the shard list without bound.
+"""
+
+import bisect
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from flask import Response, g, got_request_exception, request
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _ShardHolder:
+    """Lives in thread-local storage; its finalizer retires the shard"""
+
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self, shard):
+        self.shard = shard
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._local = threading.local()
+        # re-entrant: a shard finalizer may run while collect() holds the lock
+        self._lock = threading.RLock()
+        self._live = {}
+        self._retired = {}
+        self._next_shard = 0
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(self, name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, help, labelnames, buckets))
+
+    def gauge(self, name, help, callback, labelnames=()):
+        """
+        Register a gauge whose value is read from callback() at scrape time.
+        The callback returns a number, or a dict of label-value tuples to
+        numbers when labelnames are given.
+        """
+        return self._register(Gauge(self, name, help, labelnames, callback))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def shard(self):
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            shard = {}
+            holder = _ShardHolder(shard)
+            with self._lock:
+                shard_id = self._next_shard
+                self._next_shard += 1
+                self._live[shard_id] = shard
+            weakref.finalize(holder, self._retire, shard_id)
+            self._local.holder = holder
+        return holder.shard
+
+    def _retire(self, shard_id):
+        with self._lock:
+            shard = self._live.pop(shard_id, None)
+            if shard:
+                _merge(self._retired, shard)
+
+    def collect(self):
+        """Sum all shards into a single {key: value} mapping"""
+        with self._lock:
+            totals = {}
+            _merge(totals, self._retired)
+            for shard in list(self._live.values()):
+                _merge(totals, shard)
+        return totals
+
+    def render(self):
+        totals = self.collect()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(totals))
+        return "\n".join(lines) + "\n"
+
+
+def _merge(target, shard):
+    for key, value in list(shard.items()):
+        if isinstance(value, list):
+            current = target.get(key)
+            if current is None:
+                target[key] = list(value)
+            else:
+                for i, v in enumerate(value):
+                    current[i] += v
+        else:
+            target[key] = target.get(key, 0) + value
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, registry, name, help, labelnames):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def labels(self, *labelvalues):
+        """Return a child bound to fixed label values; cache it on hot paths"""
+        labelvalues = tuple(str(v) for v in labelvalues)
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(labelvalues)
+        if child is None:
+            child = self._children.setdefault(labelvalues, self._make_child(labelvalues))
+        return child
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class _CounterChild:
+    __slots__ = ("registry", "key")
+
+    def __init__(self, registry, key):
+        self.registry = registry
+        self.key = key
+
+    def inc(self, amount=1):
+        shard = self.registry.shard()
+        shard[self.key] = shard.get(self.key, 0) + amount
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _make_child(self, labelvalues):
+        return _CounterChild(self.registry, (self.name, labelvalues))
+
+    def render(self, totals):
+        lines = self._header()
+        for (name, labelvalues), value in sorted(totals.items(), key=lambda item: item[0][1]):
+            if name == self.name:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class _HistogramChild:
+    __slots__ = ("registry", "key", "buckets")
+
+    def __init__(self, registry, key, buckets):
+        self.registry = registry
+        self.key = key
+        self.buckets = buckets
+
+    def observe(self, value):
+        shard = self.registry.shard()
+        state = shard.get(self.key)
+        if state is None:
+            # per-bucket counts followed by sum and count
+            state = shard[self.key] = [0] * (len(self.buckets) + 3)
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, registry, name, help, labelnames, buckets):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _make_child(self, labelvalues):
+        return _HistogramChild(self.registry, (self.name, labelvalues), self.buckets)
+
+    def render(self, totals):
+        lines = self._header()
+        for (name, labelvalues), state in sorted(totals.items(), key=lambda item: item[0][1]):
+            if name != self.name:
+                continue
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-2]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, registry, name, help, labelnames, callback):
+        super().__init__(registry, name, help, labelnames)
+        self.callback = callback
+
+    def render(self, totals):
+        lines = self._header()
+        value = self.callback()
+        if isinstance(value, dict):
+            for labelvalues, v in sorted(value.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(v)}")
+        else:
+            lines.append(f"{self.name} {_format_value(value)}")
+        return lines
+
+
+def _request_metrics(registry):
+    """The request counter, latency histogram and exception counter of registry, created once"""
+    metrics = getattr(registry, "_request_metrics", None)
+    if metrics is None:
+        metrics = registry._request_metrics = (
+            registry.counter(
+                "http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status")),
+            registry.histogram(
+                "http_request_duration_seconds", "HTTP request latency by route", ("route", "method")),
+            registry.counter(
+                "http_exceptions_total", "Unhandled exceptions raised by views", ("route", "exception")),
+        )
+    return metrics
+
+
+REGISTRY = Registry()
+
+REQUESTS_TOTAL, REQUEST_SECONDS, EXCEPTIONS_TOTAL = _request_metrics(REGISTRY)
+STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each stage of a request pipeline", ("pipeline", "stage"))
+
+
+def stage_timer(pipeline, stage):
+    """
+    Context manager timing one stage of a pipeline, e.g.
+    with stage_timer("detect_disease", "decode"): ...
+    """
+    return STAGE_SECONDS.labels(pipeline, stage).time()
+
+
+def _route_label():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def init_metrics(app, registry=REGISTRY):
+    """Record per-route request metrics for app in registry and expose them on /metrics"""
+    requests_total, request_seconds, exceptions_total = _request_metrics(registry)
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            route = _route_label()
+            request_seconds.labels(route, request.method).observe(time.perf_counter() - start)
+            requests_total.labels(route, request.method, response.status_code).inc()
+        return response
+
+    def _record_exception(sender, exception, **extra):
+        exceptions_total.labels(_route_label(), type(exception).__name__).inc()
+
+    got_request_exception.connect(_record_exception, app, weak=False)
+
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule("/metrics", "metrics", metrics, methods=["GET"])
+    return registry
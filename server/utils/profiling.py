@@ -0,0 +1,219 @@
+"""
+Opt-in sampling profiler and slow request recorder for the Flask apps.
+
+When profiling is enabled a background thread samples the Python stacks of
+the threads currently serving requests every few milliseconds. Requests
+slower than the threshold are kept, together with their sampled stacks and
+any metadata the view attached via annotate_request(), in a bounded ring
+buffer that the /admin endpoints expose. Without profiling the recorder still
+captures slow request metadata, just without stacks.
+"""
+
+import collections
+import itertools
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import abort, g, jsonify, request
+
+from utils.admin import require_admin
+
+MAX_STACK_DEPTH = 64
+MAX_TOTAL_STACKS = 5000  # distinct stacks kept process-wide before the rarest are dropped
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """Samples the stacks of registered threads from a daemon thread"""
+
+    def __init__(self, interval=0.005, max_stacks=MAX_TOTAL_STACKS):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self._active = {}
+        self._wake = threading.Event()
+        self._totals = collections.Counter()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def track(self):
+        """Start sampling the calling thread; returns the Counter of its stacks"""
+        samples = collections.Counter()
+        self._active[threading.get_ident()] = samples
+        self._wake.set()
+        return samples
+
+    def untrack(self):
+        self._active.pop(threading.get_ident(), None)
+
+    def collapsed(self, limit=200):
+        """Process-wide stacks in collapsed (flame graph) format"""
+        return _collapse(self._totals, limit)
+
+    def _run(self):
+        while True:
+            if not self._active:
+                # clear before the second check: a track() in between sets
+                # _active before the event, so its wakeup is never lost
+                self._wake.clear()
+                if not self._active:
+                    self._wake.wait()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for thread_id, samples in list(self._active.items()):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self._record(samples, tuple(reversed(stack)))
+            del frames
+
+    def _record(self, samples, stack):
+        samples[stack] += 1
+        self._totals[stack] += 1
+        if len(self._totals) > self.max_stacks:
+            # keep the most frequent half instead of growing for the life of the process
+            self._totals = collections.Counter(dict(self._totals.most_common(self.max_stacks // 2)))
+
+
+def _collapse(samples, limit):
+    # copy first: the sampler thread may still be adding to the counter
+    samples = collections.Counter(samples)
+    return [f"{';'.join(stack)} {count}" for stack, count in samples.most_common(limit)]
+
+
+class SlowRequestRecorder:
+    """Bounded ring buffer of slow request records"""
+
+    def __init__(self, threshold_ms=1000.0, capacity=50):
+        self.threshold_ms = threshold_ms
+        self._records = collections.deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+
+    def record(self, latency_ms, metadata, samples, interval):
+        samples = collections.Counter(samples or {})
+        entry = {
+            "id": next(self._ids),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "latency_ms": round(latency_ms, 2),
+            "metadata": metadata,
+            "sample_interval_ms": interval * 1000,
+            "samples": sum(samples.values()),
+            "stacks": _collapse(samples, 100),
+        }
+        self._records.append(entry)
+        return entry
+
+    def list(self):
+        return list(self._records)
+
+    def get(self, record_id):
+        for entry in list(self._records):
+            if entry["id"] == record_id:
+                return entry
+        return None
+
+
+def annotate_request(**metadata):
+    """Attach metadata (image size, mode, model version...) to the current request"""
+    g.setdefault("_profile_meta", {}).update(metadata)
+
+
+def _env_flag(name, default=False):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def init_profiling(app, enabled=None, slow_threshold_ms=None, capacity=None, interval_ms=None):
+    """
+    Install the slow request recorder (and, if enabled, the sampling profiler)
+    on app. Defaults come from PROFILING_ENABLED, SLOW_REQUEST_MS,
+    SLOW_REQUEST_BUFFER and PROFILE_INTERVAL_MS.
+    """
+    if enabled is None:
+        enabled = _env_flag("PROFILING_ENABLED")
+    if slow_threshold_ms is None:
+        slow_threshold_ms = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+    if capacity is None:
+        capacity = int(os.getenv("SLOW_REQUEST_BUFFER", "50"))
+    if interval_ms is None:
+        interval_ms = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+    profiler = SamplingProfiler(interval_ms / 1000.0).start() if enabled else None
+    recorder = SlowRequestRecorder(slow_threshold_ms, capacity)
+
+    @app.before_request
+    def _begin_profile():
+        g._profile_start = time.perf_counter()
+        if profiler is not None:
+            g._profile_samples = profiler.track()
+
+    @app.after_request
+    def _remember_status(response):
+        g._profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _end_profile(exc):
+        start = g.pop("_profile_start", None)
+        if start is None:
+            return
+        if profiler is not None:
+            profiler.untrack()
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        if latency_ms < recorder.threshold_ms:
+            return
+        metadata = {
+            "method": request.method,
+            "path": request.path,
+            "route": request.url_rule.rule if request.url_rule is not None else None,
+            "status": g.get("_profile_status", 500),
+            "content_length": request.content_length,
+        }
+        metadata.update(g.get("_profile_meta", {}))
+        recorder.record(latency_ms, metadata, g.get("_profile_samples"), profiler.interval if profiler else 0)
+
+    def slow_requests():
+        require_admin()
+        summary = [{k: v for k, v in entry.items() if k != "stacks"} for entry in recorder.list()]
+        return jsonify({
+            "profiling_enabled": profiler is not None,
+            "threshold_ms": recorder.threshold_ms,
+            "requests": summary,
+        })
+
+    def slow_request_detail(record_id):
+        require_admin()
+        entry = recorder.get(record_id)
+        if entry is None:
+            abort(404)
+        return jsonify(entry)
+
+    def profile():
+        require_admin()
+        if profiler is None:
+            return jsonify({"error": "Profiling is disabled; set PROFILING_ENABLED=1"}), 404
+        return jsonify({"interval_ms": interval_ms, "stacks": profiler.collapsed()})
+
+    app.add_url_rule("/admin/slow-requests", "slow_requests", slow_requests, methods=["GET"])
+    app.add_url_rule("/admin/slow-requests/<int:record_id>", "slow_request_detail",
+                     slow_request_detail, methods=["GET"])
+    app.add_url_rule("/admin/profile", "profile", profile, methods=["GET"])
+    return recorder
@@ -0,0 +1,222 @@
+"""
+JSON encoding and compression for the Flask apps.
+
+init_responses() swaps Flask's JSON provider for one backed by orjson when
+it is installed (stdlib json otherwise), so every jsonify() in the app gets
+the faster encoder. Both encoders take NumPy arrays and scalars, datetimes
+and sets, so model outputs can be returned without tolist()/float() copies.
+
+It also compresses finished responses: JSON, NDJSON and text bodies of at
+least COMPRESS_MIN_BYTES are sent with brotli when the brotli package is
+installed and the client accepts br, with gzip otherwise. The bytes then
+depend on the encoding, so a strong ETag set by the route becomes weak.
+
+init_errors() makes every error a JSON {"error": ...} body.
+
+ndjson_response() streams large results one JSON document per line,
+compressing chunk by chunk. cached_json() gives a deterministic response an
+ETag and Cache-Control and answers a matching If-None-Match with 304.
+"""
+
+import datetime
+import decimal
+import gzip
+import hashlib
+import json
+import os
+import uuid
+import zlib
+
+import numpy as np
+from flask import current_app, jsonify, request
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import HTTPException
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+COMPRESSIBLE = ("application/json", NDJSON_MIMETYPE, "text/", "image/svg+xml")
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """Types neither encoder handles natively"""
+    if isinstance(obj, np.ndarray):
+        # orjson only takes C-contiguous arrays of plain dtypes; NaN is null like orjson writes it
+        if obj.dtype.kind == "f" and np.isnan(obj).any():
+            obj = np.where(np.isnan(obj), None, obj)
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider using dumps()/loads(); keys keep their insertion order"""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def accepted_encoding():
+    """'br', 'gzip' or None, by what the client accepts and what is installed"""
+    accept = request.accept_encodings
+    if brotli is not None and accept["br"]:
+        return "br"
+    if accept["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compressible(response):
+    return response.mimetype is not None and response.mimetype.startswith(COMPRESSIBLE)
+
+
+def ndjson_response(rows, chunk_rows=500):
+    """
+    Stream rows, an iterable of JSON-serializable objects, one per line.
+    Rows are consumed after the view returns, so they must not need the
+    request context.
+    """
+    level = current_app.config["COMPRESS_LEVEL"]
+    encoding = accepted_encoding()
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=current_app.config["COMPRESS_BROTLI_QUALITY"])
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    elif encoding == "gzip":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        compress, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def generate():
+        lines = []
+        for row in rows:
+            lines.append(dumps(row))
+            if len(lines) >= chunk_rows:
+                chunk = b"\n".join(lines) + b"\n"
+                lines = []
+                # flush so each chunk reaches the client as soon as it is encoded
+                yield compress(chunk) + flush() if encoding else chunk
+        chunk = b"\n".join(lines) + b"\n" if lines else b""
+        yield compress(chunk) + finish() if encoding else chunk
+
+    response = current_app.response_class(generate(), mimetype=NDJSON_MIMETYPE)
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def wants_ndjson():
+    """True when the client asked for NDJSON with ?format=ndjson or the Accept header"""
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def cached_json(obj, max_age=3600, private=False):
+    """
+    JSON response for a result that depends only on the request, with an
+    ETag of the body; GET/HEAD requests with a matching If-None-Match get 304
+    """
+    response = current_app.json.response(obj)
+    response.set_etag(hashlib.blake2b(response.get_data(), digest_size=16).hexdigest())
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+
+def init_responses(app, min_bytes=None, level=None, brotli_quality=None):
+    """
+    Use the fast JSON provider and compress responses. Defaults come from
+    COMPRESS_MIN_BYTES (1024), COMPRESS_LEVEL (6, gzip) and
+    COMPRESS_BROTLI_QUALITY (5).
+    """
+    if min_bytes is None:
+        min_bytes = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    if level is None:
+        level = int(os.getenv("COMPRESS_LEVEL", "6"))
+    if brotli_quality is None:
+        brotli_quality = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+    app.config["COMPRESS_LEVEL"] = level
+    app.config["COMPRESS_BROTLI_QUALITY"] = brotli_quality
+    app.json = FastJSONProvider(app)
+
+    @app.after_request
+    def _compress(response):
+        if (response.direct_passthrough or response.is_streamed or not _compressible(response)
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or "Content-Encoding" in response.headers):
+            return response
+        response.vary.add("Accept-Encoding")
+        if response.content_length is not None and response.content_length < min_bytes:
+            return response
+        encoding = accepted_encoding()
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < min_bytes:
+            return response
+        if encoding == "br":
+            response.set_data(brotli.compress(body, quality=brotli_quality))
+        else:
+            response.set_data(gzip.compress(body, compresslevel=level, mtime=0))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def init_errors(app):
+    """JSON bodies for errors: HTTP errors keep their status, anything else is logged and becomes a 500"""
+
+    @app.errorhandler(Exception)
+    def handle_exception(e):
+        if isinstance(e, HTTPException):
+            if e.response is not None:  # abort(response)
+                return e.response
+            return jsonify({"error": e.description}), e.code
+        print(f"Unhandled error in {request.path}: {e!r}")
+        return jsonify({"error": str(e)}), 500
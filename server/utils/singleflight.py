@@ -0,0 +1,95 @@
+"""
+Request coalescing: concurrent calls with the same key share one execution.
+
+The first caller for a key (the leader) runs the function; callers arriving
+while it is in flight (followers) wait for and receive the leader's result or
+exception instead of repeating the work. Results are shared, not copied, so
+callers must not mutate them.
+
+Named groups count executed and coalesced calls in
+singleflight_calls_total{group, result} on /metrics.
+"""
+
+import hashlib
+import json
+import threading
+
+from utils.metrics import REGISTRY
+
+SINGLEFLIGHT_CALLS = REGISTRY.counter(
+    "singleflight_calls_total", "Calls per coalescing group that ran (executed) or waited on another (coalesced)",
+    ("group", "result"))
+
+
+def content_key(*parts):
+    """
+    SHA-256 hex digest identifying a request by content: bytes are hashed
+    as-is, anything else as canonical JSON
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, (bytes, bytearray, memoryview)):
+            part = json.dumps(part, sort_keys=True, default=str).encode()
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name=None):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+        if name is not None:
+            self._executed_counter = SINGLEFLIGHT_CALLS.labels(name, "executed")
+            self._coalesced_counter = SINGLEFLIGHT_CALLS.labels(name, "coalesced")
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once per in-flight key; returns (result, shared)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if self.name is not None:
+            (self._executed_counter if leader else self._coalesced_counter).inc()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def stats(self):
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced,
+                    "in_flight": len(self._calls)}
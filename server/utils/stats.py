@@ -0,0 +1,93 @@
+"""
+Incremental prediction rollups for the farm statistics dashboard.
+
+The history writer folds each batch of predictions into per-user, per-day
+counts (rollup_increments) and applies them as $inc upserts
+(models/prediction_stats.py). A dashboard query then reads one document per
+day requested plus the user's all-time document, however long the history
+is; summarize() turns those into totals, a zero-filled daily series, a
+rolling 7-day average and the week-over-week trend.
+
+Days are UTC dates. Rollups are applied at least once: a batch whose
+$inc partially succeeded before a failure is counted again when retried.
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+HEALTHY = "Healthy"
+WINDOW = 7
+
+
+def rollup_increments(records):
+    """(username, day) -> total, confidence sum and per-disease counts for a batch"""
+    increments = {}
+    for record in records:
+        if not record.get("username") or not record.get("disease"):
+            continue
+        key = (record["username"], record["created_at"].date().isoformat())
+        counts = increments.setdefault(key, {"total": 0, "confidence_sum": 0.0, "diseases": {}})
+        counts["total"] += 1
+        counts["confidence_sum"] += float(record.get("confidence") or 0.0)
+        counts["diseases"][record["disease"]] = counts["diseases"].get(record["disease"], 0) + 1
+    return increments
+
+
+def day_range(days, today=None):
+    """ISO (first day, last day) of the `days` days ending today (UTC)"""
+    today = today or datetime.utcnow().date()
+    return (today - timedelta(days=days - 1)).isoformat(), today.isoformat()
+
+
+def query_days(days):
+    """Days of rollups summarize() needs: the window, plus enough before it for the rolling average and trend"""
+    return max(days, 2 * WINDOW) + WINDOW - 1
+
+
+def summarize(daily_docs, all_time, days, today=None):
+    """Dashboard summary from the daily rollup documents of the last query_days(days) days"""
+    span = query_days(days)
+    first_day, _ = day_range(span, today)
+    start = date.fromisoformat(first_day)
+    index = {doc["day"]: doc for doc in daily_docs}
+
+    totals = np.zeros(span)
+    for i in range(span):
+        totals[i] = index.get((start + timedelta(days=i)).isoformat(), {}).get("total", 0)
+    cumulative = np.concatenate(([0.0], np.cumsum(totals)))
+    rolling = (cumulative[WINDOW:] - cumulative[:-WINDOW]) / WINDOW  # mean of the 7 days ending on each day
+
+    series = []
+    diseases = {}
+    confidence_sum = 0.0
+    for i in range(span - days, span):
+        day = (start + timedelta(days=i)).isoformat()
+        doc = index.get(day, {})
+        confidence_sum += doc.get("confidence_sum", 0.0)
+        for name, n in doc.get("diseases", {}).items():
+            diseases[name] = diseases.get(name, 0) + n
+        series.append({"day": day, "total": int(totals[i]), "diseases": doc.get("diseases", {})})
+
+    total = int(totals[-days:].sum())
+    diseased = {name: n for name, n in diseases.items() if name != HEALTHY}
+    return {
+        "days": days,
+        "start": series[0]["day"],
+        "end": series[-1]["day"],
+        "total": total,
+        "diseases": diseases,
+        "healthy_fraction": round(diseases.get(HEALTHY, 0) / total, 3) if total else None,
+        "most_common_disease": max(diseased, key=diseased.get) if diseased else None,
+        "average_confidence": round(confidence_sum / total, 2) if total else None,
+        "daily": series,
+        "rolling_7d": [round(float(v), 2) for v in rolling[-days:]],
+        "trend": {
+            "last_7d": int(totals[-WINDOW:].sum()),
+            "previous_7d": int(totals[-2 * WINDOW:-WINDOW].sum()),
+        },
+        "all_time": {
+            "total": (all_time or {}).get("total", 0),
+            "diseases": (all_time or {}).get("diseases", {}),
+        },
+    }
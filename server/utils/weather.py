@@ -0,0 +1,163 @@
+"""
+Caching proxy for the OpenWeatherMap current weather and geocoding APIs.
+
+Weather is cached per coordinate rounded to `precision` decimals (about 1 km
+at the default of 2) and geocoding results per normalized place name.
+Concurrent misses for the same key are coalesced into one upstream call, and
+stale entries are served immediately while a background refresh runs. The
+upstream is any object with current_weather(lat, lon) and geocode(query)
+methods, so tests can point OpenWeatherUpstream at a local stub server or
+swap in their own implementation.
+"""
+
+import re
+import threading
+
+import requests
+
+from utils.cache import FRESH, STALE, TTLCache
+from utils.singleflight import SingleFlight
+
+
+class UpstreamError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class OpenWeatherUpstream:
+    def __init__(self, base_url, api_key, timeout=5.0):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()  # keep-alive connections to the API
+
+    @property
+    def configured(self):
+        return bool(self.api_key)
+
+    def current_weather(self, lat, lon):
+        return self._get("/data/2.5/weather", {"lat": lat, "lon": lon, "units": "metric"})
+
+    def geocode(self, query, limit=1):
+        return self._get("/geo/1.0/direct", {"q": query, "limit": limit})
+
+    def _get(self, path, params):
+        if not self.api_key:
+            raise UpstreamError(503, "Weather service not configured: WEATHER_API_KEY is not set")
+        params = dict(params, appid=self.api_key)
+        try:
+            response = self.session.get(self.base_url + path, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise UpstreamError(502, f"Weather service unreachable: {e}")
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if response.status_code != 200:
+            message = data.get("message") if isinstance(data, dict) else response.text
+            raise UpstreamError(response.status_code, message or "Weather service error")
+        return data
+
+
+def normalize_place(name):
+    """Case, whitespace and comma-spacing insensitive cache key for a place name"""
+    name = " ".join(name.lower().split())
+    return re.sub(r"\s*,\s*", ",", name)
+
+
+class WeatherProxy:
+    STAT_NAMES = ("fresh_hits", "stale_hits", "misses", "coalesced",
+                  "upstream_calls", "upstream_errors", "refresh_failures")
+
+    def __init__(self, upstream, ttl=600, stale_ttl=3600, geocode_ttl=86400,
+                 precision=2, max_entries=10000):
+        self.upstream = upstream
+        self.precision = precision
+        self.weather_cache = TTLCache(ttl, stale_ttl, max_entries)
+        self.geocode_cache = TTLCache(geocode_ttl, geocode_ttl, max_entries)
+        self.flight = SingleFlight("weather")
+        self._stats = dict.fromkeys(self.STAT_NAMES, 0)
+        self._stats_lock = threading.Lock()
+
+    def current_weather(self, lat, lon):
+        """Upstream current weather payload for the rounded coordinates"""
+        lat = round(float(lat), self.precision)
+        lon = round(float(lon), self.precision)
+        return self._lookup(self.weather_cache, ("weather", lat, lon),
+                            self.upstream.current_weather, lat, lon)
+
+    def geocode(self, query):
+        """Upstream geocoding results (a possibly empty list) for a place name"""
+        place = normalize_place(query)
+        return self._lookup(self.geocode_cache, ("geocode", place), self.upstream.geocode, place)
+
+    @property
+    def configured(self):
+        """False when the upstream has no API key, so every lookup would fail"""
+        return getattr(self.upstream, "configured", True)
+
+    def temperature_for(self, lat=None, lon=None, location=None):
+        """Current temperature in °C for coordinates or a place name, or None"""
+        if lat is None or lon is None:
+            if not location:
+                return None
+            places = self.geocode(location)
+            if not places:
+                return None
+            lat, lon = places[0]["lat"], places[0]["lon"]
+        temperature = self.current_weather(lat, lon).get("main", {}).get("temp")
+        return float(temperature) if temperature is not None else None
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["fresh_hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["fresh_hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        stats["weather_entries"] = len(self.weather_cache)
+        stats["geocode_entries"] = len(self.geocode_cache)
+        return stats
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _lookup(self, cache, key, fetch, *args):
+        value, state = cache.get(key)
+        if state == FRESH:
+            self._count("fresh_hits")
+            return value
+        if state == STALE:
+            self._count("stale_hits")
+            self._refresh_in_background(cache, key, fetch, args)
+            return value
+        self._count("misses")
+        value, shared = self.flight.do(key, self._fetch, cache, key, fetch, args)
+        if shared:
+            self._count("coalesced")
+        return value
+
+    def _fetch(self, cache, key, fetch, args):
+        self._count("upstream_calls")
+        try:
+            value = fetch(*args)
+        except UpstreamError:
+            self._count("upstream_errors")
+            raise
+        cache.set(key, value)
+        return value
+
+    def _refresh_in_background(self, cache, key, fetch, args):
+        if self.flight.in_flight(key):
+            return
+
+        def refresh():
+            try:
+                self.flight.do(key, self._fetch, cache, key, fetch, args)
+            except Exception as e:
+                # keep serving the stale value until it expires
+                self._count("refresh_failures")
+                print(f"Weather refresh failed for {key}: {e}")
+
+        threading.Thread(target=refresh, daemon=True).start()
@@ -0,0 +1,149 @@
+"""
+Write-behind buffer: the request path appends, a background thread writes.
+
+put() only appends to an in-memory deque and never blocks or touches disk or
+the database. A daemon thread takes up to `max_batch` items at a time, at
+least every `flush_interval` seconds, and hands them to flush_fn. A failed
+batch is put back and retried with exponential backoff, so a short database
+outage delays history rather than losing it. Once `max_pending` items are
+waiting, or, with a `size_fn`, `max_pending_bytes` of them are held
+(including a batch being written), new items are dropped and counted instead
+of growing memory.
+
+Items still pending at interpreter exit are flushed for up to
+`exit_timeout` seconds.
+
+write_behind_items_total{buffer, result} and write_behind_pending{buffer}
+are exported on /metrics.
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+
+from utils.metrics import REGISTRY
+
+WRITE_BEHIND_ITEMS = REGISTRY.counter(
+    "write_behind_items_total", "Items per write-behind buffer that were written, dropped or retried",
+    ("buffer", "result"))
+
+_buffers = []
+
+REGISTRY.gauge("write_behind_pending", "Items waiting in a write-behind buffer",
+               lambda: {(buffer.name,): len(buffer._pending) for buffer in _buffers}, ("buffer",))
+REGISTRY.gauge("write_behind_pending_bytes", "Bytes held by a write-behind buffer, as measured by its size_fn",
+               lambda: {(buffer.name,): buffer._pending_bytes for buffer in _buffers if buffer.size_fn}, ("buffer",))
+
+
+class WriteBehindBuffer:
+    def __init__(self, name, flush_fn, max_batch=100, flush_interval=1.0, max_pending=10000,
+                 max_pending_bytes=None, size_fn=None, max_backoff=60.0, exit_timeout=5.0):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_pending_bytes = max_pending_bytes
+        self.size_fn = size_fn
+        self.max_backoff = max_backoff
+        self.exit_timeout = exit_timeout
+        self._pending = deque()
+        self._in_progress = 0
+        self._pending_bytes = 0  # pending and in-progress items, by size_fn
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.written = self.dropped = self.failed = 0
+        self._written_counter = WRITE_BEHIND_ITEMS.labels(name, "written")
+        self._dropped_counter = WRITE_BEHIND_ITEMS.labels(name, "dropped")
+        self._retried_counter = WRITE_BEHIND_ITEMS.labels(name, "retried")
+        _buffers.append(self)
+
+    def put(self, item):
+        """Queue item for writing; False if it was dropped because the buffer is full"""
+        size = self._size(item)
+        with self._cond:
+            if (self._closed or len(self._pending) >= self.max_pending
+                    or (self.max_pending_bytes is not None and self._pending_bytes + size > self.max_pending_bytes)):
+                self.dropped += 1
+                self._dropped_counter.inc()
+                return False
+            self._pending.append(item)
+            self._pending_bytes += size
+            if self._thread is None:
+                # started lazily so forked worker processes each get their own
+                self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far has been written; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify()
+            while self._pending or self._in_progress:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        """Stop accepting items and flush the rest (bounded by exit_timeout)"""
+        with self._cond:
+            self._closed = True
+        if self._thread is not None:
+            self.flush(self.exit_timeout)
+
+    def stats(self):
+        with self._cond:
+            return {"pending": len(self._pending), "pending_bytes": self._pending_bytes, "written": self.written,
+                    "dropped": self.dropped, "failed_batches": self.failed}
+
+    def _run(self):
+        backoff = 0.0
+        while True:
+            with self._cond:
+                if backoff:
+                    # on close, give up retrying once the exit timeout is spent
+                    self._cond.wait(backoff if not self._closed else min(backoff, 0.1))
+                elif len(self._pending) < self.max_batch:
+                    self._cond.wait(self.flush_interval)
+                if not self._pending:
+                    continue
+                batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+                self._in_progress = len(batch)
+
+            try:
+                self.flush_fn(batch)
+            except Exception as e:
+                print(f"Write-behind buffer {self.name!r}: batch of {len(batch)} failed: {e}")
+                with self._cond:
+                    self.failed += 1
+                    # back to the front, keeping the newest items if over capacity
+                    self._pending.extendleft(reversed(batch))
+                    while len(self._pending) > self.max_pending or (
+                            self.max_pending_bytes is not None and self._pending_bytes > self.max_pending_bytes):
+                        self._pending_bytes -= self._size(self._pending.popleft())
+                        self.dropped += 1
+                        self._dropped_counter.inc()
+                    self._in_progress = 0
+                    self._cond.notify_all()
+                self._retried_counter.inc(len(batch))
+                backoff = min(max(2 * backoff, self.flush_interval), self.max_backoff)
+                continue
+
+            backoff = 0.0
+            with self._cond:
+                self.written += len(batch)
+                self._pending_bytes -= sum(self._size(item) for item in batch)
+                self._in_progress = 0
+                self._cond.notify_all()
+            self._written_counter.inc(len(batch))
+
+    def _size(self, item):
+        return self.size_fn(item) if self.size_fn else 0